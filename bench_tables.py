@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the moveset table: DataFrame pipeline vs. the core structured-array tables.
+
+Both build the same table (see `tests/test_tables.py`).
+"""
+
+from __future__ import print_function, division
+
+import tracemalloc
+import argparse
+import timeit
+import os
+
+from pogokit import formulas
+from pogokit import tables
+from pogokit import pogo
+from pogokit import data
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the moveset table construction.')
+    parser.add_argument('--game-master', default=os.path.join(data.get_data_dir(), 'GAME_MASTER.json'))
+    parser.add_argument('-n', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+    return args
+
+def frames_pipeline(game_master_path):
+    fast_df, charge_df, pok_df = pogo.process_game_master(game_master_path)
+    fast_df = pogo.calc_fast_attack_stats(fast_df)
+    charge_df = pogo.calc_charged_attack_stats(charge_df)
+    return pogo.build_mon_table(fast_df, charge_df, pok_df)
+
+def tables_pipeline(game_master_path):
+    fast_table, charged_table, species_table = tables.load_game_master_tables(game_master_path)
+    return tables.calc_mon_table(species_table, fast_table, charged_table), (fast_table, charged_table, species_table)
+
+def measure(name, func, repeat):
+    seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{:<28} {:>9.1f} ms {:>9.1f} MiB peak'.format(name, seconds*1000, peak/1024**2))
+
+def main(args):
+    measure('DataFrames', lambda: frames_pipeline(args.game_master), args.repeat)
+    measure('Core tables', lambda: tables_pipeline(args.game_master), args.repeat)
+    measure('Core tables + to_frame', lambda: pogo.get_mon_table(argparse.Namespace(
+        game_master=args.game_master, leagues=formulas.LEAGUE_CAPS, no_cache=True)), args.repeat)
+
+    mon_table = frames_pipeline(args.game_master)
+    columns, (fast_table, charged_table, species_table) = tables_pipeline(args.game_master)
+    core_bytes = sum(c.nbytes for c in columns.values()) + fast_table.records.nbytes + charged_table.records.nbytes + species_table.records.nbytes
+    print('Moveset table size: {:.1f} MiB as a DataFrame, {:.1f} MiB as core tables.'.format(
+        mon_table.memory_usage(deep=True).sum()/1024**2, core_bytes/1024**2))
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
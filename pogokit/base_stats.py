@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Derive Pokémon GO base stats from the main series ones (veekun's pokedex CSVs)
+and cross-validate them against the game master and gamepress.
+
+The veekun files can be downloaded with `get_data.sh`:
+ - pokemon.csv: id,identifier,species_id,height,weight,base_experience,order,is_default
+ - pokemon_stats.csv: pokemon_id,stat_id,base_stat,effort
+ - stats.csv: id,damage_class_id,identifier,is_battle_only,game_index
+"""
+
+from __future__ import print_function, division
+
+import pandas as pd
+import numpy as np
+import html
+import json
+import os
+import re
+
+from pogokit import formulas
+
+MAIN_SERIES_STATS = ['hp', 'attack', 'defense', 'special-attack', 'special-defense', 'speed']
+GO_STATS = ['attack', 'defense', 'stamina', 'max_cp']
+REPORT_COLUMNS = ['identifier', 'dex', 'source', 'stat', 'calc', 'expected']
+VEEKUN_FILES = ['pokemon.csv', 'pokemon_stats.csv', 'stats.csv']
+# The veekun files shipped with the repository.
+BUNDLED_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+def missing_veekun_files(veekun_dir):
+    return [name for name in VEEKUN_FILES if not os.path.isfile(os.path.join(veekun_dir, name))]
+
+def load_veekun_stats(veekun_dir):
+    """One row per veekun pokémon (forms included), one column per main series stat."""
+    pokemon_df = pd.read_csv(os.path.join(veekun_dir, 'pokemon.csv'), index_col='id')
+    pokemon_stats_df = pd.read_csv(os.path.join(veekun_dir, 'pokemon_stats.csv'))
+    stats_df = pd.read_csv(os.path.join(veekun_dir, 'stats.csv'), index_col='id')
+
+    stats = pokemon_stats_df.pivot(index='pokemon_id', columns='stat_id', values='base_stat')
+    stats = stats.rename(columns=stats_df['identifier'])[MAIN_SERIES_STATS]
+    veekun_df = pokemon_df[['identifier', 'species_id', 'is_default']].join(stats, how='inner')
+    return veekun_df.rename(columns={'species_id': 'dex'})
+
+def derive_go_stats(veekun_df):
+    """Add Pokémon GO attack, defense, stamina and max CP (level 40, perfect IV)."""
+    go_df = veekun_df[['identifier', 'dex', 'is_default']].copy()
+    go_df['attack'], go_df['defense'], go_df['stamina'] = formulas.calc_go_base_stats(
+        veekun_df['hp'], veekun_df['attack'], veekun_df['defense'],
+        veekun_df['special-attack'], veekun_df['special-defense'], veekun_df['speed'])
+    go_df['max_cp'] = formulas.calc_cp(go_df['attack']+15, go_df['defense']+15, go_df['stamina']+15, lvl=40)
+    go_df['form_key'] = veekun_form_keys(go_df)
+    return go_df
+
+def veekun_form_keys(go_df):
+    """Form of each non-default veekun pokémon (e.g. "alola" for "raichu-alola")."""
+    default_identifiers = go_df.loc[go_df['is_default']==1].set_index('dex')['identifier']
+    keys = []
+    for identifier, dex, is_default in zip(go_df['identifier'], go_df['dex'], go_df['is_default']):
+        if is_default or dex not in default_identifiers:
+            keys.append(None)
+            continue
+        # Drop what the identifier shares with the default form, "deoxys-normal" for "deoxys-attack".
+        default_parts = default_identifiers[dex].split('-')
+        parts = identifier.split('-')
+        n_common = 0
+        while n_common < min(len(parts), len(default_parts)) and parts[n_common] == default_parts[n_common]:
+            n_common += 1
+        keys.append('-'.join(parts[n_common:]))
+    return keys
+
+def game_master_stats(pok_df):
+    """Base stats from the processed game master (see `pogo.process_game_master`)."""
+    gm_df = pok_df[['dex', 'name', 'form', 'attack', 'defense', 'stamina']].copy()
+    gm_df['form_key'] = [
+        None if pd.isnull(form) else re.sub(r'^{}_'.format(re.escape(name.upper().replace(' ', '_'))), '', form).lower().replace('_', '-')
+        for name, form in zip(gm_df['name'], gm_df['form'])
+    ]
+    gm_df['max_cp'] = formulas.calc_cp(gm_df['attack']+15, gm_df['defense']+15, gm_df['stamina']+15, lvl=40)
+    return gm_df
+
+def gamepress_stats(gamepress_json_path):
+    """Base stats from gamepress' aggregated JSON."""
+    with open(gamepress_json_path, 'r') as f:
+        gamepress_data = json.load(f)
+    gp_df = pd.DataFrame(gamepress_data)[['number', 'title_1', 'atk', 'def', 'sta', 'cp']]
+    gp_df.columns = ['dex', 'name', 'attack', 'defense', 'stamina', 'max_cp']
+    gp_df = gp_df.astype({'dex': int, 'attack': int, 'defense': int, 'stamina': int, 'max_cp': int})
+    gp_df['name'] = gp_df['name'].map(html.unescape)
+    form_keys = []
+    for name in gp_df['name']:
+        alolan_match = re.match(r'^Alolan ', name)
+        forme_match = re.match(r'^.+ \((\w+) Forme\)$', name)
+        if alolan_match:
+            form_keys.append('alola')
+        elif forme_match:
+            form_keys.append(forme_match.group(1).lower())
+        else:
+            form_keys.append(None)
+    gp_df['form_key'] = form_keys
+    return gp_df
+
+def match_forms(go_df, other_df):
+    """Row in `other_df` for each row of `go_df` (-1 when there is none).
+
+    Non-default forms are matched by dex and form. Default forms get the first
+    row left for their dex, preferring rows without a form or a "normal" form.
+    """
+    other_df = other_df.reset_index(drop=True)
+    by_form = dict(((dex, key), i) for i, (dex, key) in enumerate(zip(other_df['dex'], other_df['form_key'])) if not pd.isnull(key))
+    matches = np.full(len(go_df), -1)
+    used = set()
+    for r, (dex, key) in enumerate(zip(go_df['dex'], go_df['form_key'])):
+        if not pd.isnull(key) and (dex, key) in by_form:
+            matches[r] = by_form[(dex, key)]
+            used.add(matches[r])
+    preference = other_df['form_key'].isnull() | (other_df['form_key']=='normal')
+    leftovers = other_df.loc[~other_df.index.isin(used)].assign(preference=preference).sort_values(by='preference', ascending=False, kind='stable')
+    first_by_dex = leftovers.groupby('dex').head(1)
+    first_by_dex = dict(zip(first_by_dex['dex'], first_by_dex.index))
+    for r, (dex, key) in enumerate(zip(go_df['dex'], go_df['form_key'])):
+        if pd.isnull(key) and dex in first_by_dex:
+            matches[r] = first_by_dex[dex]
+    return matches
+
+def mismatch_report(go_df, sources):
+    """Long format report of every stat that differs from a source.
+
+    `sources` is a dict of source name to DataFrame, as returned by
+    `game_master_stats` and `gamepress_stats`.
+    """
+    go_df = go_df.reset_index(drop=True)
+    report = []
+    for source, other_df in sources.items():
+        other_df = other_df.reset_index(drop=True)
+        matches = match_forms(go_df, other_df)
+        found = matches >= 0
+        calc = go_df.loc[found]
+        expected = other_df.loc[matches[found]].reset_index(drop=True)
+        calc = calc.reset_index(drop=True)
+        for stat in GO_STATS:
+            different = calc[stat].values != expected[stat].values
+            report.append(pd.DataFrame({
+                'identifier': calc.loc[different, 'identifier'].values,
+                'dex': calc.loc[different, 'dex'].values,
+                'source': source,
+                'stat': stat,
+                'calc': calc.loc[different, stat].values,
+                'expected': expected.loc[different, stat].values,
+            }))
+    return pd.concat(report, ignore_index=True)[REPORT_COLUMNS].sort_values(by=['dex', 'identifier', 'source', 'stat']).reset_index(drop=True)
+
+def new_mismatches(report, baseline_report):
+    """Mismatches in `report` that are not in `baseline_report` (regressions)."""
+    key = ['identifier', 'source', 'stat', 'calc', 'expected']
+    merged = report.merge(baseline_report[key].drop_duplicates(), on=key, how='left', indicator=True)
+    return merged.loc[merged['_merge']=='left_only', REPORT_COLUMNS].reset_index(drop=True)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Disk cache for derived tables (e.g. `best_pvp_mons`' moveset table).
+
+Entries are keyed by the game master hash plus the formula parameters used to
+build them, and are stored column by column in `.npz` files. The cache has a
+size limit: when it is exceeded, the least recently used entries are evicted
+(file modification times are bumped on every hit). Hit/miss statistics are
+kept in `stats.json`.
+
+Several processes may use the same cache at once: entries are written to a
+temporary file and renamed into place, and the bookkeeping (statistics and
+eviction) is done while holding an exclusive lock on `lock`.
+"""
+
+from __future__ import print_function, division
+
+import contextlib
+import hashlib
+import zipfile
+import pandas as pd
+import numpy as np
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024**2
+ENTRY_EXTENSION = '.npz'
+COLUMNS_KEY = '__columns__'
+NULLS_PREFIX = '__nulls__'
+
+def default_cache_dir(data_dir):
+    return os.path.join(data_dir, 'cache')
+
+def cache_key(game_master_hash, **params):
+    """Key of an entry, from the game master hash and the formula parameters."""
+    description = json.dumps({'version': CACHE_VERSION, 'game_master': game_master_hash, 'params': params}, sort_keys=True)
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+@contextlib.contextmanager
+def cache_lock(cache_dir):
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, 'lock'), 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def read_stats(cache_dir):
+    path = os.path.join(cache_dir, 'stats.json')
+    if not os.path.isfile(path):
+        return {'hits': 0, 'misses': 0, 'evictions': 0}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def update_stats(cache_dir, **increments):
+    """Add to the statistics counters (call while holding the lock)."""
+    stats = read_stats(cache_dir)
+    for name, increment in increments.items():
+        stats[name] = stats.get(name, 0) + increment
+    tmp_path = os.path.join(cache_dir, 'stats.json.{}.tmp'.format(os.getpid()))
+    with open(tmp_path, 'w') as f:
+        json.dump(stats, f)
+    os.replace(tmp_path, os.path.join(cache_dir, 'stats.json'))
+
+def list_entries(cache_dir):
+    """(path, size, last use) of every entry, least recently used first."""
+    entries = []
+    for file_name in os.listdir(cache_dir):
+        if file_name.endswith(ENTRY_EXTENSION):
+            path = os.path.join(cache_dir, file_name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+    return sorted(entries, key=lambda e: e[2])
+
+def evict(cache_dir, max_bytes):
+    """Remove least recently used entries until the cache fits in `max_bytes` (call while holding the lock)."""
+    entries = list_entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    n_evicted = 0
+    for path, size, _ in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        n_evicted += 1
+    return n_evicted
+
+def save_frame(path, df):
+    """Save a DataFrame column by column. Nulls of text columns are kept in a separate mask."""
+    arrays = {COLUMNS_KEY: np.array(df.columns, dtype=str)}
+    for c, col in enumerate(df.columns):
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+            arrays[str(c)] = values.values
+        else:
+            nulls = values.isnull().values
+            arrays[str(c)] = np.where(nulls, '', values.astype(str).values).astype(str)
+            arrays[NULLS_PREFIX + str(c)] = nulls
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+def load_frame(path):
+    with np.load(path, allow_pickle=False) as npz:
+        columns = list(npz[COLUMNS_KEY])
+        data = {}
+        for c, col in enumerate(columns):
+            values = npz[str(c)]
+            if NULLS_PREFIX + str(c) in npz:
+                values = np.where(npz[NULLS_PREFIX + str(c)], None, values.astype(object))
+            data[col] = values
+    return pd.DataFrame(data, columns=columns)
+
+def load(cache_dir, key):
+    """The cached DataFrame for `key`, or None on a miss."""
+    path = os.path.join(cache_dir, key + ENTRY_EXTENSION)
+    try:
+        df = load_frame(path)
+        os.utime(path)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        # Missing (e.g. evicted by another process) or unreadable entries are misses.
+        df = None
+    with cache_lock(cache_dir):
+        update_stats(cache_dir, hits=int(df is not None), misses=int(df is None))
+    return df
+
+def store(cache_dir, key, df, max_bytes=DEFAULT_MAX_BYTES):
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + ENTRY_EXTENSION)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    save_frame(tmp_path, df)
+    os.replace(tmp_path, path)
+    with cache_lock(cache_dir):
+        n_evicted = evict(cache_dir, max_bytes)
+        if n_evicted:
+            update_stats(cache_dir, evictions=n_evicted)
+
+def cached_frame(cache_dir, key, compute, max_bytes=DEFAULT_MAX_BYTES):
+    """Load the DataFrame for `key` from the cache, or compute and store it."""
+    df = load(cache_dir, key)
+    if df is None:
+        df = compute()
+        store(cache_dir, key, df, max_bytes=max_bytes)
+    return df
+
+def cache_info(cache_dir):
+    """Statistics plus the current number of entries and their total size."""
+    info = read_stats(cache_dir)
+    entries = list_entries(cache_dir) if os.path.isdir(cache_dir) else []
+    info['entries'] = len(entries)
+    info['bytes'] = sum(size for _, size, _ in entries)
+    return info
+
+def clear(cache_dir):
+    if not os.path.isdir(cache_dir):
+        return
+    with cache_lock(cache_dir):
+        for path, _, _ in list_entries(cache_dir):
+            os.remove(path)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Counter index: the best attackers against every defending typing.
+
+There are 171 typings (18 single and 153 dual types). For each of them and
+every league, the index keeps the top movesets of the moveset table (see
+`pogo.build_mon_table`), one per species, by their effective damage output:
+the TDO against the reference enemy, with STAB and the type effectiveness of
+the fast and the charged move against the typing.
+
+The scores of every moveset against every typing are a single (typings x
+movesets) matrix, and the index is two compact arrays, `rows` (positions in
+the moveset table) and `scores`, with shape (leagues, typings, size). Finding
+the counters of a pokémon is then a lookup of its typing.
+"""
+
+from __future__ import print_function, division
+
+import pandas as pd
+import numpy as np
+
+from pogokit import effectiveness
+from pogokit import formulas
+from pogokit import meta
+
+DEFAULT_INDEX_SIZE = 25
+
+N_TYPES = len(effectiveness.TYPES)
+# Every typing as (type, type2), with `NO_TYPE` for single types.
+TYPINGS = np.array([(t, effectiveness.NO_TYPE) for t in range(N_TYPES)] +
+    [(t, t2) for t in range(N_TYPES) for t2 in range(t + 1, N_TYPES)], dtype=np.int8)
+# Position of a typing in `TYPINGS`, by (type, type2) in any order (-1 for none).
+TYPING_INDEX = np.full((N_TYPES + 1, N_TYPES + 1), -1, dtype=int)
+TYPING_INDEX[TYPINGS[:,0], TYPINGS[:,1]] = np.arange(len(TYPINGS))
+TYPING_INDEX[TYPINGS[:,1], TYPINGS[:,0]] = np.arange(len(TYPINGS))
+
+def typing_index(type1, type2):
+    """Position in `TYPINGS` of the typing with these type codes."""
+    return TYPING_INDEX[type1, type2]
+
+def calc_counter_scores(mon_table, eff, league):
+    """Effective damage output of every moveset against every typing, shape (typings, movesets)."""
+    a = meta.moveset_arrays(mon_table, league)
+    # Multipliers of every move type against every typing. The effectiveness
+    # matrix has a neutral row for `NO_TYPE`, the type of unknown moves.
+    typing_eff = eff[:,TYPINGS[:,0]] * eff[:,TYPINGS[:,1]]
+    fast_eff = typing_eff[a['fast_type']].T
+    charge_eff = typing_eff[a['charge_type']].T
+    scores = formulas.calc_pokemon_moveset_tdo_ref(a['atk'], a['def'], a['hp'],
+        a['fast_ppt'], a['fast_ept'], a['charge_ppe'],
+        fast_mult=a['fast_stab'] * fast_eff, charge_mult=a['charge_stab'] * charge_eff)
+    # Movesets with unknown moves never make it.
+    return np.where(np.isnan(scores), -np.inf, scores)
+
+def species_codes(mon_table):
+    """Integer code of the species of every moveset."""
+    return pd.factorize(mon_table['dex'].astype(str) + ' ' + mon_table['name'].astype(str))[0]
+
+def top_species(scores, species, size):
+    """Positions of the `size` best scores with a different species each, best first."""
+    order = np.argsort(-scores, kind='stable')
+    _, first = np.unique(species[order], return_index=True)
+    return order[np.sort(first)[:size]]
+
+def build_counter_index(mon_table, eff, leagues, size=DEFAULT_INDEX_SIZE):
+    """Counter index of the moveset table, as a dict with `rows` and `scores` arrays (leagues, typings, size).
+
+    Entries past the number of species are -1 (`rows`) and -inf (`scores`).
+    """
+    species = species_codes(mon_table)
+    rows = np.full((len(leagues), len(TYPINGS), size), -1, dtype=np.int32)
+    scores = np.full((len(leagues), len(TYPINGS), size), -np.inf, dtype=np.float32)
+    for l, league in enumerate(leagues):
+        league_scores = calc_counter_scores(mon_table, eff, league)
+        for t in range(len(TYPINGS)):
+            top = top_species(league_scores[t], species, size)
+            rows[l,t,:len(top)] = top
+            scores[l,t,:len(top)] = league_scores[t,top]
+    return {'leagues': list(leagues), 'rows': rows, 'scores': scores}
+
+def index_to_frame(index):
+    """Long DataFrame version of the index, e.g. for the derived tables cache."""
+    n_leagues, n_typings, size = index['rows'].shape
+    return pd.DataFrame({
+        'league': np.repeat(index['leagues'], n_typings * size),
+        'typing': np.tile(np.repeat(np.arange(n_typings), size), n_leagues),
+        'row': index['rows'].ravel(),
+        'score': index['scores'].ravel(),
+    })
+
+def index_from_frame(df, leagues):
+    size = len(df) // (len(leagues) * len(TYPINGS))
+    shape = (len(leagues), len(TYPINGS), size)
+    return {
+        'leagues': list(leagues),
+        'rows': df['row'].values.astype(np.int32).reshape(shape),
+        'scores': df['score'].values.astype(np.float32).reshape(shape),
+    }
+
+def lookup_counters(index, league, type1, type2):
+    """Rows of the moveset table and scores of the counters of a typing in a league (best first)."""
+    l = index['leagues'].index(league)
+    t = typing_index(type1, type2)
+    rows, scores = index['rows'][l,t], index['scores'][l,t]
+    found = rows >= 0
+    return rows[found], scores[found]
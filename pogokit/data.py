@@ -4,6 +4,7 @@
 from __future__ import print_function, division
 
 import requests
+import hashlib
 import sys
 import os
 
@@ -38,3 +39,11 @@ def download_data(data_dir=get_data_dir(), latest=False):
 	r = requests.get(game_master_url)
 	with open(gm_path, 'wb') as f:
 		f.write(r.content)
+
+def game_master_hash(game_master_path):
+	"""SHA-1 of the game master file, used to tell game master versions apart."""
+	sha1 = hashlib.sha1()
+	with open(game_master_path, 'rb') as f:
+		for block in iter(lambda: f.read(1 << 20), b''):
+			sha1.update(block)
+	return sha1.hexdigest()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SQLite export of the derived tables, for ad hoc queries.
+
+Tables:
+ - species: one row per pokémon (form), with base stats and types;
+ - fast_moves and charged_moves: PvP moves with their derived stats;
+ - movesets: one row per pokémon and moveset (like `best_pvp_mons`' table);
+ - league_movesets: one row per moveset and league, with level, CP and TDO.
+
+Example, the top 20 Water movesets in UL by TDO:
+
+    SELECT m.name, m.fast_name, m.charge_name, l.cp, l.tdo
+    FROM movesets m JOIN league_movesets l ON l.moveset_id = m.id
+    WHERE l.league = 'UL' AND 'Water' IN (m.type, m.type2)
+    ORDER BY l.tdo DESC LIMIT 20
+"""
+
+from __future__ import print_function, division
+
+import pandas as pd
+import numpy as np
+import sqlite3
+import os
+
+INDEXES = [
+    ('species', ['dex']),
+    ('species', ['complete_name']),
+    ('species', ['type', 'type2']),
+    ('fast_moves', ['uniqueId']),
+    ('charged_moves', ['uniqueId']),
+    ('movesets', ['dex']),
+    ('movesets', ['name']),
+    ('movesets', ['type']),
+    ('movesets', ['type2']),
+    ('movesets', ['fast_id', 'charge_id']),
+    ('league_movesets', ['league', 'tdo']),
+    ('league_movesets', ['moveset_id']),
+]
+
+def default_database_path(data_dir):
+    return os.path.join(data_dir, 'pogokit.sqlite')
+
+def sql_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    return 'TEXT'
+
+def write_table(conn, name, df):
+    """Create table `name` from a DataFrame and insert all its rows at once."""
+    columns = list(df.columns)
+    conn.execute('CREATE TABLE {} ({})'.format(name, ', '.join('"{}" {}'.format(c, sql_type(df[c].dtype)) for c in columns)))
+    # Object columns hold python scalars, which is what sqlite3 accepts.
+    values = [df[c].astype(object).where(df[c].notnull(), None).tolist() for c in columns]
+    conn.executemany('INSERT INTO {} VALUES ({})'.format(name, ', '.join('?' * len(columns))), zip(*values))
+
+def league_movesets_table(mon_table, leagues):
+    """Long format league table from the `<league>_lvl/_cp/_tdo` columns of the moveset table."""
+    tables = []
+    for league in leagues:
+        x = league.lower()
+        tables.append(pd.DataFrame({
+            'moveset_id': np.arange(len(mon_table)),
+            'league': league,
+            'lvl': mon_table[x+'_lvl'].values,
+            'cp': mon_table[x+'_cp'].values,
+            'tdo': mon_table[x+'_tdo'].values,
+        }))
+    return pd.concat(tables, ignore_index=True)
+
+def export_database(path, fast_df, charge_df, pok_df, mon_table, leagues):
+    """Write the tables to a new SQLite file at `path` (replacing it)."""
+    def type_names(col):
+        return col.str.replace('POKEMON_TYPE_', '', regex=False).str.title()
+
+    species = pok_df.drop(columns=['quickMoves', 'cinematicMoves']).assign(type=lambda df: type_names(df['type']), type2=lambda df: type_names(df['type2']))
+    fast_moves = fast_df.drop(columns=['type']).rename(columns={'type_name': 'type'})
+    charged_moves = charge_df.drop(columns=['type']).rename(columns={'type_name': 'type'})
+    league_columns = [league.lower()+suffix for league in leagues for suffix in ['_lvl', '_cp', '_tdo']]
+    movesets = mon_table.drop(columns=league_columns).assign(
+        type=lambda df: type_names(df['type']), type2=lambda df: type_names(df['type2']),
+        fast_type=lambda df: type_names(df['fast_type']), charge_type=lambda df: type_names(df['charge_type']))
+    movesets.insert(0, 'id', np.arange(len(movesets)))
+
+    tmp_path = path + '.tmp'
+    if os.path.isfile(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        with conn:
+            write_table(conn, 'species', species)
+            write_table(conn, 'fast_moves', fast_moves)
+            write_table(conn, 'charged_moves', charged_moves)
+            write_table(conn, 'movesets', movesets)
+            write_table(conn, 'league_movesets', league_movesets_table(mon_table, leagues))
+            for table, columns in INDEXES:
+                conn.execute('CREATE INDEX idx_{}_{} ON {} ({})'.format(table, '_'.join(columns), table, ', '.join('"{}"'.format(c) for c in columns)))
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+def run_query(path, query):
+    """Run a query against the database. Returns the column names and the rows."""
+    conn = sqlite3.connect('file:{}?mode=ro'.format(path), uri=True)
+    try:
+        cursor = conn.execute(query)
+        columns = [d[0] for d in cursor.description] if cursor.description else []
+        return columns, cursor.fetchall()
+    finally:
+        conn.close()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Type effectiveness and weather boosts from the game master.
+
+Types are integer coded by their position in `TYPES` (the game's own order,
+the one used by `attackScalar`). `NO_TYPE` codes a missing second type.
+"""
+
+from __future__ import print_function, division
+
+import numpy as np
+import json
+
+TYPES = [
+    'Normal', 'Fighting', 'Flying', 'Poison', 'Ground', 'Rock', 'Bug', 'Ghost', 'Steel',
+    'Fire', 'Water', 'Grass', 'Electric', 'Psychic', 'Ice', 'Dragon', 'Dark', 'Fairy',
+]
+NO_TYPE = len(TYPES)
+TYPE_CODES = dict(('POKEMON_TYPE_' + t.upper(), c) for c, t in enumerate(TYPES))
+
+WEATHER_BOOST_MULTIPLIER = 1.2
+
+def type_code(template_id):
+    """Integer code of a type template id (e.g. POKEMON_TYPE_WATER), `NO_TYPE` if missing."""
+    if template_id is None or template_id != template_id:
+        return NO_TYPE
+    return TYPE_CODES[template_id]
+
+def type_codes(template_ids):
+    return np.array([type_code(t) for t in template_ids], dtype=np.int8)
+
+def load_type_effectiveness(game_master_path):
+    """Matrix of multipliers (attacking type, defending type).
+
+    It has an extra column of ones for `NO_TYPE`, so single type pokémon can be
+    looked up the same way as dual type ones, and an extra row of ones, so
+    moves of unknown type (missing from the game master) are neutral.
+    """
+    with open(game_master_path, 'r') as f:
+        gm = json.load(f)
+    eff = np.ones((len(TYPES) + 1, len(TYPES) + 1))
+    found = False
+    for item in gm['itemTemplates']:
+        if 'typeEffective' in item:
+            te = item['typeEffective']
+            eff[type_code(te['attackType']), :len(TYPES)] = te['attackScalar']
+            found = True
+    if not found:
+        raise ValueError('No type effectiveness in the game master `{}`.'.format(game_master_path))
+    return eff
+
+def type_multiplier(eff, move_types, type1, type2):
+    """Effectiveness of moves against pokémon (arrays of type codes, broadcast together)."""
+    return eff[move_types, type1] * eff[move_types, type2]
+
+def load_weather_affinities(game_master_path):
+    """Map weather names (e.g. "CLEAR") to the array of type codes they boost."""
+    with open(game_master_path, 'r') as f:
+        gm = json.load(f)
+    weathers = {}
+    for item in gm['itemTemplates']:
+        if 'weatherAffinities' in item:
+            wa = item['weatherAffinities']
+            weathers[wa['weatherCondition']] = type_codes(wa['pokemonType'])
+    return weathers
+
+def weather_multiplier(move_types, boosted_types):
+    """Weather boost for each move type, given the types boosted by the current weather."""
+    return np.where(np.isin(move_types, boosted_types), WEATHER_BOOST_MULTIPLIER, 1)
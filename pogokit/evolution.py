@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Evolution graph and post-evolution league ranks.
+
+The graph comes from the `evolutionBranch` of the game master's
+`pokemonSettings`, as a compact adjacency structure over the rows of the
+processed pokémon table (CSR style: the evolutions of row `s` are
+`targets[offsets[s]:offsets[s+1]]`, with their candy costs in `candy`).
+
+Evolving keeps the IVs, so the post-evolution rank and CP of every IV spread
+of a pre-evolution are the evolution's own rank table records, indexed by
+the same `formulas.iv_index`. Projecting a family is then a gather from the
+memory-mapped rank tables (see `pogokit.rank_tables`), stacked over all the
+later evolutions at once.
+"""
+
+from __future__ import print_function, division
+
+import collections
+import numpy as np
+import json
+
+from pogokit import rank_tables
+
+def load_evolution_graph(game_master_path, pok_df):
+    """Evolution graph over the rows (positions) of `pok_df`.
+
+    Returns a dict with the CSR arrays `offsets`, `targets` and `candy`, plus
+    `parents` (position of the previous stage, -1 for none) and `families`
+    (integer code of the family, -1 when unknown).
+    """
+    with open(game_master_path, 'r') as f:
+        gm = json.load(f)
+
+    positions = {}
+    for p, (pokemon_id, form) in enumerate(zip(pok_df['pokemonId'], pok_df['form'])):
+        positions.setdefault(pokemon_id, {}).setdefault(form if isinstance(form, str) else None, p)
+
+    def resolve(pokemon_id, form, source_form):
+        """Position of an evolution, or -1 when there is no such row.
+
+        Without an explicit form, keep the source's form suffix (e.g. _ALOLA).
+        Forms the evolution doesn't have (e.g. Pikachu's costumes) fall back
+        to its normal form, then to its formless row.
+        """
+        forms = positions.get(pokemon_id, {})
+        if form is None and source_form is not None:
+            form = pokemon_id + source_form[source_form.rfind('_'):]
+        for candidate_form in [form, pokemon_id + '_NORMAL', None]:
+            if candidate_form in forms:
+                return forms[candidate_form]
+        return -1
+
+    n = len(pok_df)
+    branches = [[] for _ in range(n)]
+    families = np.full(n, -1, dtype=int)
+    family_codes = {}
+    for item in gm['itemTemplates']:
+        if 'pokemonSettings' not in item:
+            continue
+        pok = item['pokemonSettings']
+        source = resolve(pok['pokemonId'], pok.get('form'), None)
+        source_form = pok_df['form'].iloc[source] if source >= 0 else None
+        if source < 0 or (source_form if isinstance(source_form, str) else None) != pok.get('form'):
+            # Settings of an entry that was filtered out of the table (e.g. the formless one).
+            continue
+        if 'familyId' in pok:
+            families[source] = family_codes.setdefault(pok['familyId'], len(family_codes))
+        for branch in pok.get('evolutionBranch', []):
+            if 'evolution' not in branch:
+                continue
+            target = resolve(branch['evolution'], branch.get('form'), pok.get('form'))
+            if target >= 0:
+                branches[source].append((target, branch.get('candyCost', pok.get('candyToEvolve', 0))))
+
+    offsets = np.concatenate([[0], np.cumsum([len(b) for b in branches])]).astype(int)
+    targets = np.array([t for b in branches for t, _ in b], dtype=int)
+    candy = np.array([c for b in branches for _, c in b], dtype=int)
+    parents = np.full(n, -1, dtype=int)
+    parents[targets] = np.repeat(np.arange(n), np.diff(offsets))
+    return {
+        'offsets': offsets,
+        'targets': targets,
+        'candy': candy,
+        'parents': parents,
+        'families': families,
+    }
+
+def evolutions(graph, s):
+    """Positions of the direct evolutions of row `s`, and their candy costs."""
+    start, stop = graph['offsets'][s], graph['offsets'][s+1]
+    return graph['targets'][start:stop], graph['candy'][start:stop]
+
+def descendants(graph, s):
+    """Every later evolution of row `s` (breadth first), with the total candy to get there."""
+    found, total_candy = [], []
+    seen = set([s])
+    queue = collections.deque([(s, 0)])
+    while queue:
+        source, candy_so_far = queue.popleft()
+        targets, candy = evolutions(graph, source)
+        for target, cost in zip(targets, candy):
+            if target not in seen:
+                seen.add(target)
+                found.append(target)
+                total_candy.append(candy_so_far + cost)
+                queue.append((target, candy_so_far + cost))
+    return np.array(found, dtype=int), np.array(total_candy, dtype=int)
+
+def project_evolutions(graph, tables, names, s):
+    """Post-evolution records of every IV spread of row `s`, for all its later evolutions.
+
+    `names` are the complete names of the rows (the rank tables' keys).
+    Returns the descendants' positions, their candy costs and their records,
+    with shape (descendants, leagues, 4096), indexed by `formulas.iv_index`.
+    """
+    targets, candy = descendants(graph, s)
+    if len(targets) == 0:
+        return targets, candy, np.zeros((0, len(tables['leagues']), rank_tables.N_IVS), dtype=rank_tables.RECORD_DTYPE)
+    records = np.stack([rank_tables.lookup_species(tables, names[t]) for t in targets])
+    return targets, candy, records
@@ -89,8 +89,19 @@ CP_MULTIPLIERS = {
     40: 0.79030001,
 }
 
+# Only reachable as a best buddy (see `VARIANTS`).
+CP_MULTIPLIERS_ABOVE_40 = {
+    40.5: 0.792803968,
+    41: 0.79530001,
+}
+
 lvl_to_cpm = np.vectorize(lambda lvl: CP_MULTIPLIERS[lvl])
 
+def boosted_cpm(lvl, level_boost=0):
+    """CP multiplier at a level plus a level boost (e.g. best buddies)."""
+    lvl = lvl + level_boost
+    return CP_MULTIPLIERS[lvl] if lvl in CP_MULTIPLIERS else CP_MULTIPLIERS_ABOVE_40[lvl]
+
 def calc_cp(attack, defense, stamina, lvl=None, cpm=None):
     """Please include IV on attributes."""
     if cpm is None:
@@ -112,7 +123,7 @@ def calc_pokemon_moveset_tdo(atk_a, def_a, hp_a, fast_ppt_a, fast_ept_a, charge_
     fast_mult_a=1, charge_mult_a=1, fast_mult_b=1, charge_mult_b=1):
     """Calculate a Pokémon's TDO."""
     return ((fast_ppt_a*fast_mult_a + fast_ept_a*charge_ppe_a*charge_mult_a) * atk_a * def_a * hp_a) / \
-        ((fast_ppt_b*fast_mult_b + fast_ept_b*charge_ppe_b*fast_mult_b) * atk_b * def_b)
+        ((fast_ppt_b*fast_mult_b + fast_ept_b*charge_ppe_b*charge_mult_b) * atk_b * def_b)
 
 def calc_pokemon_moveset_tdo_ref(atk, def_, hp, fast_ppt, fast_ept, charge_ppe, fast_mult=1, charge_mult=1):
     """Calculate a Pokémon's TDO against a reference enemy."""
@@ -122,43 +133,127 @@ def calc_pokemon_moveset_tdo_ref(atk, def_, hp, fast_ppt, fast_ept, charge_ppe,
         atk_b, def_b, fast_ppt_b, fast_ept_b, charge_ppe_b,
         fast_mult_a=fast_mult, charge_mult_a=charge_mult)
 
+def calc_pokemon_pair_tdo_ref(atk, def_, hp, fast_ppt, charged_ppt, fast_mult=1, charge_mult=1):
+    """`calc_pokemon_moveset_tdo_ref` with the charged move's damage per turn (EPT * PPE) already computed."""
+    return calc_pokemon_moveset_tdo_ref(atk, def_, hp, fast_ppt, 1, charged_ppt, fast_mult=fast_mult, charge_mult=charge_mult)
+
 def calc_pokemon_moveset_propto_tdo(atk, def_, hp, fast_ppt, fast_ept, charge_ppe, fast_mult=1, charge_mult=1):
     """Calculate something proportional to a Pokémon's TDO"""
     return (fast_ppt*fast_mult + fast_ept*charge_ppe*charge_mult) * atk * def_ * hp
 
-def find_league_pokemon(atks, defs, stas):
-    """Find maximum level pokémon (IV 0) that fit in the leagues."""
-    if type(atks) is np.array:
-        assert len(atks) == len(defs) and len(atks) == len(stas), 'Weird number of elements in arrays'
-        n_pokemon = len(atks)
-    else:
-        n_pokemon = 1
-    levels = np.arange(1, 40.5, 0.5)
-    # cpms = np.array([ CP_MULTIPLIERS[l] for l in levels ])
-    cpms = np.array(list(CP_MULTIPLIERS.values()))
-    cpms_sqr = cpms**2
-    cps = atks * (defs**0.5) * (stas**0.5)
-    cps = np.array(cps) # In case they were pandas series before.
-    cps = cps * cpms_sqr[:,np.newaxis]
-    cps /= 10
-    cps = np.floor(cps).astype(int)
-
-    league_caps = [
-        ('GL', 1500),
-        ('UL', 2500),
-        ('ML', 0),
-    ]
+def calc_go_base_stats(hp, attack, defense, sp_attack, sp_defense, speed):
+    """Calculate Pokémon GO base stats (attack, defense, stamina) from the main series ones.
+
+    New defense and stamina formulas from:
+     - https://www.reddit.com/r/TheSilphRoad/comments/9ofymc/new_defense_stat_formula/
+    """
+    speed_mod = 1 + (speed - 75) / 500
+    scaled_attack = np.round(2 * (7/8*np.maximum(attack, sp_attack) + 1/8*np.minimum(attack, sp_attack)))
+    scaled_defense = np.round(2 * (5/8*np.maximum(defense, sp_defense) + 3/8*np.minimum(defense, sp_defense)))
+    base_attack = np.round(scaled_attack * speed_mod).astype(int)
+    base_defense = np.round(scaled_defense * speed_mod).astype(int)
+    base_stamina = np.floor(hp * 1.75 + 50).astype(int)
+    return base_attack, base_defense, base_stamina
+
+LEAGUE_CAPS = [
+    ('GL', 1500),
+    ('UL', 2500),
+    ('ML', 0),
+]
+
+SHADOW_ATTACK_MULTIPLIER = 1.2
+SHADOW_DEFENSE_MULTIPLIER = 1 / 1.2
+PURIFIED_IV_BONUS = 2
+BEST_BUDDY_LEVEL_BOOST = 1
+
+# Variants of a pokémon. The attack and defense multipliers only apply in
+# battle (CP ignores them), the IV bonus is added to every stat and the level
+# boost to the level the CP and the stats are calculated at.
+VARIANTS = {
+    'normal': {'attack_mult': 1, 'defense_mult': 1, 'iv_bonus': 0, 'level_boost': 0},
+    'shadow': {'attack_mult': SHADOW_ATTACK_MULTIPLIER, 'defense_mult': SHADOW_DEFENSE_MULTIPLIER, 'iv_bonus': 0, 'level_boost': 0},
+    'purified': {'attack_mult': 1, 'defense_mult': 1, 'iv_bonus': PURIFIED_IV_BONUS, 'level_boost': 0},
+    'best_buddy': {'attack_mult': 1, 'defense_mult': 1, 'iv_bonus': 0, 'level_boost': BEST_BUDDY_LEVEL_BOOST},
+}
+
+def iv_combinations():
+    """All the 4096 IV spreads, as three flat arrays (attack, defense, stamina)."""
+    ivs = np.indices((16, 16, 16)).reshape(3, -1)
+    return ivs[0], ivs[1], ivs[2]
+
+def iv_index(atk_iv, def_iv, sta_iv):
+    """Position of an IV spread in the arrays from `iv_combinations`."""
+    return atk_iv*256 + def_iv*16 + sta_iv
+
+def calc_stat_product(attack, defense, stamina, cpm):
+    """Please include IV on attributes."""
+    return (attack * cpm) * (defense * cpm) * np.floor(stamina * cpm)
+
+def calc_iv_rank_table(attack, defense, stamina, league_caps=LEAGUE_CAPS):
+    """Find league level, CP, stat product and rank for every IV spread of a pokémon.
+
+    Returns a dict by league, where arrays are indexed by `iv_index`. Rank 1 is
+    the IV spread with the highest stat product under the league's CP cap.
+    """
+    atk_ivs, def_ivs, sta_ivs = iv_combinations()
+    atks, defs, stas = attack + atk_ivs, defense + def_ivs, stamina + sta_ivs
+    league_d = find_league_pokemon(atks, defs, stas, league_caps=league_caps)
+    d = {}
+    for league, _ in league_caps:
+        stat_products = calc_stat_product(atks, defs, stas, league_d[league]['cpms'])
+        # Rank is one plus the number of IV spreads with a strictly higher stat product.
+        sorted_products = np.sort(stat_products)
+        ranks = len(stat_products) - np.searchsorted(sorted_products, stat_products, side='right') + 1
+        d[league] = {
+            'levels': league_d[league]['levels'],
+            'cps': league_d[league]['cps'],
+            'stat_products': stat_products,
+            'ranks': ranks,
+        }
+    return d
+
+def find_league_pokemon(atks, defs, stas, league_caps=LEAGUE_CAPS, level_boost=0):
+    """Find maximum level pokémon that fit in the leagues.
+
+    Attributes may be scalars or arrays (please include IV on them), and
+    `league_caps` is a list of (league name, CP cap) pairs, where a cap of 0
+    means no cap. Returns a dict by league with the `levels`, `cps` and `cpms`
+    for each pokémon.
+
+    With a `level_boost` (best buddies), CPs and CPMs are the ones of the
+    boosted level, while `levels` are still the pokémon's own.
+    """
+    atks = np.atleast_1d(np.asarray(atks, dtype=float))
+    defs = np.atleast_1d(np.asarray(defs, dtype=float))
+    stas = np.atleast_1d(np.asarray(stas, dtype=float))
+    assert len(atks) == len(defs) and len(atks) == len(stas), 'Weird number of elements in arrays'
+    n_pokemon = len(atks)
+    levels = np.array(list(CP_MULTIPLIERS.keys()))
+    n_levels = len(levels)
+    # Levels go in half level steps.
+    boost = int(round(level_boost * 2))
+    cpms = np.array(list(CP_MULTIPLIERS.values()) + list(CP_MULTIPLIERS_ABOVE_40.values()))[boost:boost+n_levels]
+    cps = np.floor(atks * (defs**0.5) * (stas**0.5) * (cpms**2)[:,np.newaxis] / 10).astype(np.int64)
+
+    # CP never decreases with level, so each pokémon's column is sorted. Shifting
+    # each column by its own offset makes the whole (column major) matrix one
+    # sorted array, and a single searchsorted answers every cap for every pokémon.
+    caps = np.array([cp_cap for _, cp_cap in league_caps], dtype=np.int64)
+    stride = max(cps.max(initial=0), caps.max(initial=0)) + 1
+    caps = np.where(caps > 0, caps, stride - 1)
+    shifts = np.arange(n_pokemon, dtype=np.int64) * stride
+    flat_cps = (cps + shifts).T.ravel()
+    queries = caps[:,np.newaxis] + shifts
+    idxs = np.searchsorted(flat_cps, queries, side='right') - 1 - np.arange(n_pokemon) * n_levels
+    # When not even level 1 fits under the cap, stay at level 1.
+    idxs = np.clip(idxs, 0, n_levels - 1)
+
     d = {}
-    for league, cp_cap in league_caps:
-        capped_cps = cps
-        if cp_cap > 0:
-            capped_cps = np.where(cps<=cp_cap, cps, 0)
-        idxs = capped_cps.argmax(axis=0)
-        max_league_levels = levels[idxs]
-        max_league_cps = cps[[idxs], range(n_pokemon)].flatten()
+    for l, (league, _) in enumerate(league_caps):
         d[league] = {
-            'levels': max_league_levels,
-            'cps': max_league_cps,
+            'levels': levels[idxs[l]],
+            'cps': cps[idxs[l], np.arange(n_pokemon)],
+            'cpms': cpms[idxs[l]],
         }
     return d
 
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Change log of the game master across versions.
+
+Game master versions are parsed in parallel, and only the records that
+changed from one version to the next are kept (deduplicated by their
+canonical JSON). The change log is saved as gzipped JSON lines, one change
+per line, so it can answer "how did move X / species Y change" without parsing
+the game masters again.
+
+The expected directory layout is the one from pokemongo-game-master:
+`versions/<timestamp>/GAME_MASTER.json`.
+"""
+
+from __future__ import print_function, division
+
+import concurrent.futures
+import collections
+import gzip
+import json
+import sys
+import os
+import re
+
+TRACKED_TEMPLATES = ['combatMove', 'moveSettings', 'pokemonSettings']
+
+def default_history_path(data_dir):
+    return os.path.join(data_dir, 'game_master_history.jsonl.gz')
+
+def version_sort_key(version):
+    return (0, int(version), '') if version.isdigit() else (1, 0, version)
+
+def find_game_masters(directory):
+    """Map version names to game master paths (the version is the parent directory name)."""
+    game_masters = {}
+    for root, _, files in os.walk(directory):
+        for file_name in files:
+            if file_name == 'GAME_MASTER.json':
+                game_masters[os.path.basename(root)] = os.path.join(root, file_name)
+    return game_masters
+
+def extract_records(game_master_path):
+    """Canonical JSON of every tracked item template, by template id."""
+    with open(game_master_path, 'r') as f:
+        gm = json.load(f)
+    records = {}
+    for item in gm['itemTemplates']:
+        if any(template in item for template in TRACKED_TEMPLATES):
+            records[item['templateId']] = json.dumps(item, sort_keys=True, separators=(',', ':'))
+    return records
+
+def load_history(path):
+    """Read the change log. Returns the list of versions and the list of changes."""
+    versions, changes = [], []
+    if not os.path.isfile(path):
+        return versions, changes
+    with gzip.open(path, 'rt') as f:
+        header = json.loads(f.readline())
+        versions = header['versions']
+        for line in f:
+            changes.append(json.loads(line))
+    return versions, changes
+
+def save_history(path, versions, changes):
+    history_dir = os.path.dirname(path)
+    if history_dir and not os.path.isdir(history_dir):
+        os.makedirs(history_dir)
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt') as f:
+        f.write(json.dumps({'versions': versions}) + '\n')
+        for change in changes:
+            f.write(json.dumps(change, sort_keys=True) + '\n')
+    os.replace(tmp_path, path)
+
+def replay(changes):
+    """Latest canonical JSON of each template after applying the changes."""
+    state = {}
+    for change in changes:
+        if change['record'] is None:
+            state.pop(change['template_id'], None)
+        else:
+            state[change['template_id']] = json.dumps(change['record'], sort_keys=True, separators=(',', ':'))
+    return state
+
+def ingest(directory, path, jobs=None):
+    """Add the game master versions in `directory` to the change log at `path`.
+
+    Versions already in the change log are not parsed again. Returns the number
+    of new versions and of new changes.
+    """
+    versions, changes = load_history(path)
+    known_versions = set(versions)
+    game_masters = find_game_masters(directory)
+    new_versions = sorted((v for v in game_masters if v not in known_versions), key=version_sort_key)
+    if versions and new_versions and version_sort_key(new_versions[0]) < version_sort_key(versions[-1]):
+        raise ValueError('Version `{}` is older than the latest one in the change log (`{}`).'.format(new_versions[0], versions[-1]))
+
+    if not new_versions:
+        return 0, 0
+
+    state = replay(changes)
+    n_changes = len(changes)
+    # Versions parsed ahead of the one being diffed, so parsed records don't pile up in memory.
+    window = 2 * (jobs or os.cpu_count() or 1)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = collections.deque()
+        for v, version in enumerate(new_versions):
+            while len(pending) < window and v + len(pending) < len(new_versions):
+                pending.append(executor.submit(extract_records, game_masters[new_versions[v + len(pending)]]))
+            # Each version is diffed against the previous one, in order.
+            records = pending.popleft().result()
+            for template_id, record in records.items():
+                if state.get(template_id) != record:
+                    changes.append({'version': version, 'template_id': template_id, 'record': json.loads(record)})
+            for template_id in set(state) - set(records):
+                changes.append({'version': version, 'template_id': template_id, 'record': None})
+            state = records
+            versions.append(version)
+            print('INFO: {} of {} versions.\r'.format(v+1, len(new_versions)), end='', file=sys.stderr)
+    print(file=sys.stderr)
+    save_history(path, versions, changes)
+    return len(new_versions), len(changes) - n_changes
+
+def flatten(record, prefix=''):
+    """Flatten nested dicts into a dict with dotted keys."""
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+def template_pattern(query):
+    """Regex matching the template ids of a move or species name (e.g. "Water Gun", "bulbasaur")."""
+    key = re.sub(r'\W+', '_', query.strip()).upper()
+    return re.compile(r'(^|_)(MOVE|POKEMON)_{}(_FAST)?$'.format(re.escape(key)))
+
+def query_history(changes, query):
+    """Field by field changes of the templates matching `query`.
+
+    Returns a list of (template id, version, {field: (old, new)}) tuples, in
+    version order.
+    """
+    pattern = template_pattern(query)
+    previous = {}
+    result = []
+    for change in changes:
+        template_id = change['template_id']
+        if not pattern.search(template_id):
+            continue
+        old = previous.get(template_id, {})
+        new = flatten(change['record']) if change['record'] is not None else {}
+        diff = {}
+        for field in sorted(set(old) | set(new)):
+            if old.get(field) != new.get(field):
+                diff[field] = (old.get(field), new.get(field))
+        previous[template_id] = new
+        result.append((template_id, change['version'], diff))
+    return result
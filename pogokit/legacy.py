@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Legacy moves, scraped from gamepress' legacy move list.
+
+The page is parsed in a single streaming pass (`html.parser.HTMLParser`,
+without building a tree) that starts at the `sort-table` table and stops
+where it ends. Every move is checked against the blacklist and the game
+master's move names while it's parsed. Gamepress writes some names
+differently (e.g. "Mud-Slap", "X-Scissor"), so names are compared by their
+letters and digits only, and the game master's spelling is kept: the saved
+CSVs have the names the rest of the kit looks up (e.g. "Farfetchd", not
+gamepress' "Farfetch'd"), and `update-legacy` reports every renamed name.
+
+Results are cached in the derived tables cache (see `pogokit.cache`), keyed
+by the hash of the page and of the game master, so a refresh where neither
+changed doesn't parse anything. The page itself is downloaded with the
+validators of the previous download (ETag and Last-Modified), so it isn't
+even transferred when it didn't change.
+"""
+
+from __future__ import print_function, division
+
+from html.parser import HTMLParser
+
+import pandas as pd
+import requests
+import hashlib
+import json
+import sys
+import os
+import re
+
+LEGACY_URL = 'https://pokemongo.gamepress.gg/legacy-pokemon-move-list'
+TABLE_ID = 'sort-table'
+# Seconds to wait for the server (to connect, and between bytes of the response).
+REQUEST_TIMEOUT = 30
+
+# Moves that were never obtainable.
+# https://www.reddit.com/r/TheSilphRoad/comments/92i8yc/list_of_legacy_pok%C3%A9mon_and_their_moves_in_dex/
+BLACK_LIST = frozenset([
+    ('Kyogre', 'Dragon Tail'),
+    ('Zapdos', 'Discharge'),
+    ('Moltres', 'Ember'),
+    ('Moltres', 'Flamethrower'),
+])
+
+FAST_COLUMNS = ['pokemon_name', 'fast_move']
+CHARGE_COLUMNS = ['pokemon_name', 'charge_move']
+MOVES_COLUMNS = ['pokemon_name', 'kind', 'move', 'known', 'page_pokemon_name', 'page_move']
+
+class TableEnd(Exception):
+    pass
+
+class LegacyPageParser(HTMLParser):
+    """Calls `on_move(pokemon_name, kind, move_name)` for every move of the legacy table.
+
+    `kind` is "fast" (second column) or "charge" (third column). The pokémon's
+    name is the first link with a `hreflang` in the first column.
+    """
+
+    def __init__(self, on_move):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.on_move = on_move
+        self.depth = 0
+        self.column = -1
+        self.header = False
+        self.pokemon = None
+        self.moves = []
+        self.link = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.depth == 0:
+            if tag == 'table' and dict(attrs).get('id') == TABLE_ID:
+                self.depth = 1
+            return
+        if tag == 'table':
+            self.depth += 1
+        elif self.depth > 1:
+            # Rows and cells of tables nested in a cell aren't the legacy table's.
+            return
+        elif tag == 'tr':
+            self.column, self.header, self.pokemon, self.moves = -1, False, None, []
+        elif tag == 'th':
+            self.header = True
+        elif tag == 'td':
+            self.column += 1
+        elif tag == 'a' and (self.column in (1, 2) or (self.column == 0 and any(name == 'hreflang' for name, _ in attrs))):
+            self.link = []
+
+    def handle_data(self, data):
+        if self.link is not None:
+            self.link.append(data)
+
+    def handle_endtag(self, tag):
+        if self.depth == 0:
+            return
+        if tag == 'table':
+            self.depth -= 1
+            if self.depth == 0:
+                raise TableEnd()
+        elif self.depth > 1:
+            return
+        elif tag == 'a' and self.link is not None:
+            text = ''.join(self.link).strip()
+            self.link = None
+            if self.column == 0:
+                self.pokemon = self.pokemon or text
+            elif text:
+                self.moves.append(('fast' if self.column == 1 else 'charge', text))
+        elif tag == 'tr':
+            if not self.header and self.pokemon:
+                for kind, move in self.moves:
+                    self.on_move(self.pokemon, kind, move)
+            self.moves = []
+
+def normalize_name(name):
+    return re.sub(r'[^0-9a-z]', '', name.lower())
+
+def parse_legacy_page(page, fast_names, charge_names, pokemon_names):
+    """Legacy moves of the page as a DataFrame (see `MOVES_COLUMNS`) and the number of blacklisted moves.
+
+    Names are matched against the game master's (`fast_names`, `charge_names`
+    and `pokemon_names`) and replaced by them, while `page_pokemon_name` and
+    `page_move` keep the page's spelling. `known` tells whether both the
+    pokémon and the move were found.
+    """
+    indexes = {
+        'fast': dict((normalize_name(n), n) for n in fast_names),
+        'charge': dict((normalize_name(n), n) for n in charge_names),
+        'pokemon': dict((normalize_name(n), n) for n in pokemon_names),
+    }
+    rows = []
+    blacklisted = [0]
+
+    def on_move(pokemon_name, kind, move_name):
+        if (pokemon_name, move_name) in BLACK_LIST:
+            blacklisted[0] += 1
+            return
+        gm_pokemon = indexes['pokemon'].get(normalize_name(pokemon_name))
+        gm_move = indexes[kind].get(normalize_name(move_name))
+        known = gm_pokemon is not None and gm_move is not None
+        rows.append((gm_pokemon or pokemon_name, kind, gm_move or move_name, known, pokemon_name, move_name))
+
+    match = re.search(r'<table[^>]*\bid=["\']?' + TABLE_ID, page)
+    if match is None:
+        raise ValueError('No `{}` table in the legacy page.'.format(TABLE_ID))
+    parser = LegacyPageParser(on_move)
+    try:
+        parser.feed(page[match.start():])
+        parser.close()
+    except TableEnd:
+        pass
+    return pd.DataFrame(rows, columns=MOVES_COLUMNS), blacklisted[0]
+
+def fetch_legacy_page(url, page_path):
+    """Content of the legacy page, downloaded unless it didn't change since it was saved to `page_path`.
+
+    Raises `requests.RequestException` when the download fails or times out.
+    """
+    meta_path = page_path + '.json'
+    headers = {}
+    if os.path.isfile(page_path) and os.path.isfile(meta_path):
+        with open(meta_path, 'r') as f:
+            validators = json.load(f)
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    r = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if r.status_code == 304:
+        print('INFO: The legacy page didn\'t change since the last download.', file=sys.stderr)
+        with open(page_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    r.raise_for_status()
+    page_dir = os.path.dirname(page_path)
+    if page_dir and not os.path.isdir(page_dir):
+        os.makedirs(page_dir)
+    with open(page_path, 'w', encoding='utf-8') as f:
+        f.write(r.text)
+    with open(meta_path, 'w') as f:
+        json.dump({'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified')}, f)
+    return r.text
+
+def page_hash(page):
+    return hashlib.sha1(page.encode('utf-8')).hexdigest()
+
+def split_moves(moves_df):
+    """Fast and charged legacy moves, as saved in `legacy_fast_moves.csv` and `legacy_charge_moves.csv`."""
+    fast = moves_df.loc[moves_df['kind'] == 'fast'].rename(columns={'move': 'fast_move'})
+    charge = moves_df.loc[moves_df['kind'] == 'charge'].rename(columns={'move': 'charge_move'})
+    # Stable, so moves of a pokémon keep the page's order.
+    fast = fast.sort_values(by='pokemon_name', kind='mergesort')[FAST_COLUMNS]
+    charge = charge.sort_values(by='pokemon_name', kind='mergesort')[CHARGE_COLUMNS]
+    return fast, charge
+
+def write_if_changed(df, path):
+    """Save `df` as CSV, unless the file already has that content. Returns whether it was written."""
+    content = df.to_csv(index=False)
+    if os.path.isfile(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+TDO against a weighted meta of opponents, instead of the fixed reference enemy.
+
+The meta is a CSV with the columns `name` (complete name, e.g. "Alolan
+Marowak" is "Marowak Alola"), `weight` and, optionally, `fast` and `charged`
+(move names). Opponents without moves use their best moveset in the league.
+
+The score of a moveset is the weighted mean of its TDO against every meta
+opponent (see `formulas.calc_pokemon_moveset_tdo`), with STAB and type
+effectiveness on both sides. Both the attacker and the opponents are at their
+league level. The (movesets x opponents) matrix is computed in chunks of rows,
+so memory stays bounded no matter the size of the table and of the meta.
+"""
+
+from __future__ import print_function, division
+
+import pandas as pd
+import numpy as np
+import sys
+
+from pogokit import effectiveness
+from pogokit import formulas
+
+DEFAULT_MAX_ELEMENTS = 2**22
+
+def load_meta(path):
+    meta_df = pd.read_csv(path)
+    missing = set(['name', 'weight']) - set(meta_df.columns)
+    if missing:
+        raise ValueError('Meta `{}` is missing the columns: {}.'.format(path, ', '.join(sorted(missing))))
+    weights = pd.to_numeric(meta_df['weight'], errors='coerce').values.astype(float)
+    invalid = ~np.isfinite(weights) | (weights < 0)
+    if invalid.any():
+        raise ValueError('Meta `{}` has invalid weights (they must be numbers >= 0) for: {}.'.format(
+            path, ', '.join(meta_df['name'].astype(str).values[invalid])))
+    if weights.sum() <= 0:
+        raise ValueError('Meta `{}` has no opponent with a weight above 0.'.format(path))
+    meta_df['weight'] = weights
+    for col in ['fast', 'charged']:
+        if col not in meta_df.columns:
+            meta_df[col] = None
+    return meta_df
+
+def find_meta_movesets(mon_table, meta_df, league):
+    """Rows of the moveset table for every meta opponent (-1 when not found)."""
+    x = league.lower()
+    names = mon_table['name'].str.title()
+    rows = []
+    for opponent in meta_df.itertuples():
+        mask = (names == str(opponent.name).strip().title()).values
+        if not pd.isnull(opponent.fast):
+            mask = mask & (mon_table['fast_name'] == str(opponent.fast).strip().title()).values
+        if not pd.isnull(opponent.charged):
+            mask = mask & (mon_table['charge_name'] == str(opponent.charged).strip().title()).values
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            rows.append(-1)
+        else:
+            # Movesets with unknown moves (NaN TDO) are never the best.
+            tdos = mon_table[x+'_tdo'].values[candidates].astype(float)
+            rows.append(candidates[np.argmax(np.where(np.isnan(tdos), -np.inf, tdos))])
+    return np.array(rows, dtype=int)
+
+def moveset_arrays(mon_table, league):
+    """Arrays of the moveset table needed by the TDO, at the league level."""
+    cpms = mon_table[league.lower()+'_lvl'].map(formulas.CP_MULTIPLIERS).values
+    return {
+        'atk': mon_table['attack'].values * cpms,
+        'def': mon_table['defense'].values * cpms,
+        'hp': np.floor(mon_table['stamina'].values * cpms),
+        'type1': effectiveness.type_codes(mon_table['type']),
+        'type2': effectiveness.type_codes(mon_table['type2']),
+        'fast_type': effectiveness.type_codes(mon_table['fast_type']),
+        'charge_type': effectiveness.type_codes(mon_table['charge_type']),
+        'fast_ppt': mon_table['fast_PPT'].values,
+        'fast_ept': mon_table['fast_EPT'].values,
+        'charge_ppe': mon_table['charge_PPE'].values,
+        'fast_stab': mon_table['fast_stab_m'].values,
+        'charge_stab': mon_table['charge_stab_m'].values,
+    }
+
+def calc_meta_tdo(mon_table, eff, opponent_rows, weights, league, max_elements=DEFAULT_MAX_ELEMENTS):
+    """Weighted mean TDO of every moveset against the opponents (rows of the moveset table).
+
+    Rows are processed in chunks, so that at most about `max_elements`
+    (movesets x opponents) values are held at once.
+    """
+    a = moveset_arrays(mon_table, league)
+    opponent_rows = np.asarray(opponent_rows)
+    weights = np.asarray(weights, dtype=float) / np.sum(weights)
+    b = dict((k, v[opponent_rows][np.newaxis,:]) for k, v in a.items())
+
+    scores = np.zeros(len(mon_table))
+    chunk_size = max(1, max_elements // max(1, len(opponent_rows)))
+    for start in range(0, len(mon_table), chunk_size):
+        c = dict((k, v[start:start+chunk_size][:,np.newaxis]) for k, v in a.items())
+        tdo = formulas.calc_pokemon_moveset_tdo(
+            c['atk'], c['def'], c['hp'], c['fast_ppt'], c['fast_ept'], c['charge_ppe'],
+            b['atk'], b['def'], b['fast_ppt'], b['fast_ept'], b['charge_ppe'],
+            fast_mult_a=c['fast_stab'] * effectiveness.type_multiplier(eff, c['fast_type'], b['type1'], b['type2']),
+            charge_mult_a=c['charge_stab'] * effectiveness.type_multiplier(eff, c['charge_type'], b['type1'], b['type2']),
+            fast_mult_b=b['fast_stab'] * effectiveness.type_multiplier(eff, b['fast_type'], c['type1'], c['type2']),
+            charge_mult_b=b['charge_stab'] * effectiveness.type_multiplier(eff, b['charge_type'], c['type1'], c['type2']))
+        scores[start:start+chunk_size] = tdo @ weights
+    return scores
+
+def meta_scores(mon_table, eff, meta_df, leagues, max_elements=DEFAULT_MAX_ELEMENTS):
+    """Add a `<league>_meta_tdo` column to the moveset table for every league."""
+    mon_table = mon_table.copy()
+    for league in leagues:
+        opponent_rows = find_meta_movesets(mon_table, meta_df, league)
+        found = opponent_rows >= 0
+        if not found.all():
+            print('WARNING: Skipping meta opponents that were not found: {}'.format(
+                ', '.join(meta_df['name'].astype(str).values[~found])), file=sys.stderr)
+        if not found.any():
+            raise ValueError('None of the meta opponents were found.')
+        if meta_df['weight'].values[found].sum() <= 0:
+            raise ValueError('The meta opponents that were found all have a weight of 0.')
+        mon_table[league.lower()+'_meta_tdo'] = calc_meta_tdo(mon_table, eff, opponent_rows[found],
+            meta_df['weight'].values[found], league, max_elements=max_elements)
+    return mon_table
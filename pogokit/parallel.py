@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Multi-core execution of per-species computations over shared memory.
+
+Inputs and outputs live in `multiprocessing.shared_memory` blocks owned by a
+`SharedArrays` context. `map_shards` splits the species (first axis of every
+array) in contiguous shards and runs a kernel on each of them in a process
+pool. Workers attach to the blocks by name and write their results in place,
+so nothing but the block names and shard bounds is pickled, and the results
+are read straight from the output blocks.
+
+Kernels are top-level functions `kernel(arrays, **kwargs)`, where `arrays` is
+a dict of the shard's slices (inputs and outputs alike).
+"""
+
+from __future__ import print_function, division
+
+import concurrent.futures
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+class SharedArrays(object):
+    """Named arrays, in shared memory when `shared` is true (otherwise plain arrays).
+
+    Arrays are only valid inside the `with` block: the shared memory is
+    released when it exits.
+    """
+
+    def __init__(self, shared=True):
+        self.shared = shared and shared_memory is not None
+        self.arrays = {}
+        self.specs = {}
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.arrays.clear()
+        for block in self.blocks:
+            try:
+                block.close()
+            except BufferError:
+                # Someone still holds a view: the mapping stays until they drop it.
+                pass
+            block.unlink()
+        self.blocks = []
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def empty(self, name, shape, dtype):
+        dtype = np.dtype(dtype)
+        if not self.shared:
+            self.arrays[name] = np.zeros(shape, dtype=dtype)
+            return self.arrays[name]
+        block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+        self.blocks.append(block)
+        self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        self.specs[name] = (block.name, shape, dtype)
+        return self.arrays[name]
+
+    def share(self, name, array):
+        """Copy an input array into shared memory."""
+        array = np.asarray(array)
+        self.empty(name, array.shape, array.dtype)[...] = array
+        return self.arrays[name]
+
+def attach(block_name):
+    try:
+        return shared_memory.SharedMemory(name=block_name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block again, but pool
+        # workers share our resource tracker, so that's a no-op.
+        return shared_memory.SharedMemory(name=block_name)
+
+def run_shard(kernel, specs, start, stop, kwargs):
+    blocks = [attach(block_name) for block_name, _, _ in specs.values()]
+    arrays = {}
+    for block, (name, (_, shape, dtype)) in zip(blocks, specs.items()):
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)[start:stop]
+    kernel(arrays, **kwargs)
+    arrays.clear()
+    for block in blocks:
+        block.close()
+
+def shard_bounds(n_items, n_shards):
+    """(start, stop) of `n_shards` contiguous shards of about the same size."""
+    edges = np.linspace(0, n_items, n_shards + 1).round().astype(int)
+    return [(start, stop) for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+def map_shards(kernel, shared, n_items, jobs=1, shards_per_job=4, **kwargs):
+    """Run `kernel` over every array of `shared`, split along the first axis.
+
+    With `jobs` of 1 (or arrays that are not in shared memory) the kernel runs
+    once in this process, over the whole arrays.
+    """
+    if jobs <= 1 or not shared.shared:
+        kernel(dict(shared.arrays), **kwargs)
+        return
+    # A few shards per worker balance the load when species cost differently.
+    bounds = shard_bounds(n_items, jobs * shards_per_job)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_shard, kernel, shared.specs, start, stop, kwargs) for start, stop in bounds]
+        for future in futures:
+            future.result()
@@ -5,9 +5,11 @@ from __future__ import print_function, division
 
 import pandas as pd
 import numpy as np
+import requests
 import itertools
 import argparse
 import pprint
+import sqlite3
 import json
 import sys
 import os
@@ -15,6 +17,20 @@ import re
 
 from pogokit import data
 from pogokit import formulas
+from pogokit import base_stats
+from pogokit import history
+from pogokit import effectiveness
+from pogokit import pve
+from pogokit import database
+from pogokit import cache
+from pogokit import rank_tables
+from pogokit import tables
+from pogokit import meta
+from pogokit import sequencing
+from pogokit import evolution
+from pogokit import similarity
+from pogokit import legacy
+from pogokit import counters
 
 try:
     import fuzzywuzzy as fw
@@ -121,7 +137,7 @@ def process_game_master(game_master_path):
 
 def calc_fast_attack_stats(fast_df, zepdoos_c=formulas.ZEPDOOS_C):
     # FIXME: I shouldn't be doing it inplace as well.
-    fast_df['type_name'] = fast_df['type'].apply(type_from_gm_template_id)
+    fast_df['type_name'] = fast_df['type'].str.replace('POKEMON_TYPE_', '', regex=False).str.title()
     fast_df['PPT'] = fast_df['power'] / fast_df['durationTurns']
     fast_df['EPT'] = fast_df['energyDelta'] / fast_df['durationTurns']
     fast_df['ZEPDOOS'] = formulas.calc_zepdoos_score(fast_df['PPT'], fast_df['EPT'], zepdoos_c=zepdoos_c)
@@ -129,7 +145,7 @@ def calc_fast_attack_stats(fast_df, zepdoos_c=formulas.ZEPDOOS_C):
 
 def calc_charged_attack_stats(charged_df):
     # FIXME: I shouldn't be doing it inplace as well.
-    charged_df['type_name'] = charged_df['type'].apply(type_from_gm_template_id)
+    charged_df['type_name'] = charged_df['type'].str.replace('POKEMON_TYPE_', '', regex=False).str.title()
     charged_df['PP100E'] = np.floor(charged_df['power'] / np.abs(charged_df['energyDelta']) * 100).astype(int)
     charged_df['PPE'] = charged_df['power'] / np.abs(charged_df['energyDelta'])
     return charged_df
@@ -176,90 +192,112 @@ def best_pvp_moves(args):
     charged_type_ppe_txt_path = os.path.join(args.save_tables, 'pvp_charged_moves_by_type_and_ppe.txt') if args.save_tables else None
     print_or_save_df(best_charged_type_ppe[CHARGED_MOVE_VISIBLE_COLUMNS], path=charged_type_ppe_txt_path, print_n=0)
 
-def make_combinations(list1, list2):
-    result = []
-    for l1 in list1:
-        for l2 in list2:
-            result.append((l1, l2))
-    return result
+def build_mon_table(fast_df, charge_df, pok_df, league_caps=formulas.LEAGUE_CAPS):
+    """Expand the pokémon into one row per moveset, with league levels, CPs and TDOs."""
+    # TODO: Add legacy moves.
+    fast_table = tables.MoveTable.from_frame(fast_df).calc_fast_stats()
+    charged_table = tables.MoveTable.from_frame(charge_df).calc_charged_stats()
+    species_table = tables.SpeciesTable.from_frame(pok_df, fast_table, charged_table)
+    return build_mon_table_from_tables(fast_table, charged_table, species_table, league_caps=league_caps)
 
-def best_pvp_mons(args):
-    fast_df, charge_df, pok_df = process_game_master(args.game_master)
-    fast_df = calc_fast_attack_stats(fast_df)
-    charge_df = calc_charged_attack_stats(charge_df)
-    legacy_fast_df = pd.read_csv(args.legacy_fast)
-    legacy_charge_df = pd.read_csv(args.legacy_charge)
+def build_pair_table(fast_df, charge_df):
+    """Metrics of every fast/charged move pair (see `tables.PairTable`)."""
+    return tables.PairTable(tables.MoveTable.from_frame(fast_df).calc_fast_stats(), tables.MoveTable.from_frame(charge_df).calc_charged_stats())
 
-    # TODO: Add legacy moves.
-    # DataFrame where each line is a pokemon with a specific moveset.
-    mon_table = []
-    mon_table_col_order = ['dex', 'pokemonId', 'name', 'type', 'type2', 'stamina', 'attack', 'defense', 'fast_id', 'charge_id']
-    for p, pok in pok_df.iterrows():
-        fast_move_ids = pok['quickMoves']
-        charge_move_ids = pok['cinematicMoves']
-
-        combinations = make_combinations(fast_move_ids, charge_move_ids)
-        for fast_id, charge_id in combinations:
-            mon_table.append({
-                'dex': pok['dex'],
-                'pokemonId': pok['pokemonId'],
-                'name': pok['complete_name'],
-                'type': pok['type'],
-                'type2': pok['type2'],
-                'stamina': pok['stamina'],
-                'attack': pok['attack'],
-                'defense': pok['defense'],
-                'fast_id': fast_id,
-                'charge_id': charge_id,
-            })
-        print('INFO: {} of {}.\r'.format(p+1, len(pok_df)), end='', file=sys.stderr)
-    print(file=sys.stderr)
+def build_mon_table_from_tables(fast_table, charged_table, species_table, league_caps=formulas.LEAGUE_CAPS):
+    columns = tables.calc_mon_table(species_table, fast_table, charged_table, league_caps=league_caps)
+    return tables.mon_table_to_frame(columns, species_table, fast_table, charged_table, league_caps=league_caps)
+
+def get_mon_table(args, fast_df=None, charge_df=None, pok_df=None):
+    """Moveset table (see `build_mon_table`), from the derived tables cache when possible."""
+    def compute():
+        if pok_df is None:
+            fast_table, charged_table, species_table = tables.load_game_master_tables(args.game_master)
+            return build_mon_table_from_tables(fast_table, charged_table, species_table, league_caps=args.leagues)
+        return build_mon_table(fast_df, charge_df, pok_df, league_caps=args.leagues)
+
+    if args.no_cache:
+        return compute()
+    # The table only depends on the game master and the leagues. Tables built from
+    # the caller's DataFrames are kept apart from the ones built from the game master.
+    key = cache.cache_key(data.game_master_hash(args.game_master), table='mon_table',
+        leagues=args.leagues, source='game_master' if pok_df is None else 'frames')
+    return cache.cached_frame(cache.default_cache_dir(args.data_dir), key, compute, max_bytes=args.cache_size * 1024**2)
 
-    mon_table = pd.DataFrame(mon_table)[mon_table_col_order]
-    league_d = formulas.find_league_pokemon(mon_table['attack']+0, mon_table['defense']+0, mon_table['stamina']+0)
-    mon_table = pd.merge(mon_table, fast_df.add_prefix('fast_'), how='left', left_on='fast_id', right_on='fast_uniqueId', suffixes=('', '_fast'))
-    mon_table = pd.merge(mon_table, charge_df.add_prefix('charge_'), how='left', left_on='charge_id', right_on='charge_uniqueId', suffixes=('', '_charge'))
-    mon_table.drop(columns=['fast_uniqueId', 'charge_uniqueId', 'fast_type_name', 'charge_type_name',
-        'fast_power', 'fast_energyDelta', 'fast_durationTurns', 'fast_ZEPDOOS',
-        'charge_power', 'charge_energyDelta', 'charge_PP100E'], inplace=True)
-    mon_table['fast_stab_m'] = np.where((mon_table['type']==mon_table['fast_type'])|(mon_table['type2']==mon_table['fast_type']), 1.2, 1)
-    mon_table['charge_stab_m'] = np.where((mon_table['type']==mon_table['charge_type'])|(mon_table['type2']==mon_table['charge_type']), 1.2, 1)
-    for x in ['gl', 'ul', 'ml']:
-        mon_table[x+'_lvl'] = league_d[x.upper()]['levels']
-        mon_table[x+'_cp'] = league_d[x.upper()]['cps']
-        cpms = np.array([formulas.CP_MULTIPLIERS[lvl] for lvl in mon_table[x+'_lvl']])
-        mon_table[x+'_tdo'] = formulas.calc_pokemon_moveset_tdo_ref(
-            (mon_table['attack']+0)*cpms, (mon_table['defense']+0)*cpms, formulas.calc_hp((mon_table['stamina']+0), mon_table[x+'_lvl']),
-            mon_table['fast_PPT'], mon_table['fast_EPT'], mon_table['charge_PPE'],
-            fast_mult=mon_table['fast_stab_m'], charge_mult=mon_table['charge_stab_m'],
-        )
-    cpm_lvl1 = formulas.CP_MULTIPLIERS[1]
-    mon_table['lvl1_tdo'] = formulas.calc_pokemon_moveset_tdo_ref(
-            (mon_table['attack']+0)*cpm_lvl1, (mon_table['defense']+0)*cpm_lvl1, formulas.calc_hp((mon_table['stamina']+0), 1),
-            mon_table['fast_PPT'], mon_table['fast_EPT'], mon_table['charge_PPE'],
-            fast_mult=mon_table['fast_stab_m'], charge_mult=mon_table['charge_stab_m'],
-        )
+def get_variant_columns(args, variants):
+    """League levels, CPs and TDOs of variants of the moveset table's rows (see `tables.calc_variant_columns`)."""
+    fast_table, charged_table, species_table = tables.load_game_master_tables(args.game_master)
+    pair_table = tables.PairTable(fast_table, charged_table)
+    columns = tables.calc_moveset_columns(species_table, fast_table, charged_table)
+    return dict((variant, tables.calc_variant_columns(columns, species_table, pair_table, variant=variant,
+        league_caps=args.leagues)) for variant in variants)
+
+def variant_stats(mon_table, variant):
+    """Attack and defense of a variant's movesets: the base stats times the variant's battle multipliers (shadow).
+
+    Purified IV bonuses and best buddy level boosts aren't part of the base
+    stats, so those variants show the same stats as the normal one.
+    """
+    v = formulas.VARIANTS[variant]
+    return {
+        'attack': np.round(mon_table['attack'].values * float(v['attack_mult']), 1),
+        'defense': np.round(mon_table['defense'].values * float(v['defense_mult']), 1),
+    }
+
+def variants_table(mon_table, variant_columns, visible_columns, score_columns, sort_by, n=None):
+    """Rows of the moveset table for every variant, best `sort_by` first.
+
+    Same as stacking a copy of the table per variant (in the order of
+    `variant_columns`) and sorting it, but only the first `n` rows (all by
+    default) are materialized.
+    """
+    variants = list(variant_columns)
+    scores = np.concatenate([variant_columns[variant][sort_by] for variant in variants])
+    order = np.argsort(-scores, kind='stable')[:n]
+    variant_idxs, rows = np.divmod(order, len(mon_table))
+    table = mon_table.iloc[rows][visible_columns].reset_index(drop=True)
+    table.insert(visible_columns.index('name') + 1, 'variant', np.array(variants, dtype=object)[variant_idxs])
+    for col in score_columns:
+        values = np.empty(len(order), dtype=variant_columns[variants[0]][col].dtype)
+        for v, variant in enumerate(variants):
+            mask = variant_idxs == v
+            values[mask] = variant_columns[variant][col][rows[mask]]
+        table[col] = values
+    return table
+
+def best_pvp_mons(args):
+    mon_table = get_mon_table(args)
+    leagues = [league.lower() for league, _ in args.leagues]
     # with pd.option_context('display.max_rows', None, 'display.max_columns', None):
     #     print("mon_table.head(20):\n{}".format(mon_table.head(20)), file=sys.stderr) #!#
     # exit(3)
     mon_table_visible_columns = ['dex', 'name', 'stamina', 'attack', 'defense', 'fast_name', 'charge_name']
+    if args.variants:
+        variant_columns = {'normal': dict((col, mon_table[col].values) for col in mon_table.columns if col.endswith(('_lvl', '_cp', '_tdo')))}
+        variant_columns.update(get_variant_columns(args, [v for v in args.variants if v != 'normal']))
+        for variant, columns in variant_columns.items():
+            columns.update(variant_stats(mon_table, variant))
+
+    def ranked(score_columns, n=None):
+        """Movesets (of every variant) sorted by the last of `score_columns`."""
+        if args.variants:
+            table = variants_table(mon_table, variant_columns, mon_table_visible_columns, ['attack', 'defense'] + score_columns, score_columns[-1], n=n)
+        else:
+            table = mon_table[mon_table_visible_columns+score_columns].copy()
+            table = table.sort_values(by=[score_columns[-1]], ascending=False)
+        return table.rename(columns=SHORTER_COLUMN_NAMES).reset_index(drop=True)
+
     with pd.option_context(
         'display.max_rows', None,
         'display.max_columns', None,
-        'display.max_colwidth', -1,
+        'display.max_colwidth', None,
         'display.width', 1000):
-        mon_table_lvl1 = mon_table[mon_table_visible_columns+['lvl1_tdo']].copy()
-        mon_table_lvl1.rename(columns=SHORTER_COLUMN_NAMES, inplace=True)
-        mon_table_lvl1 = mon_table_lvl1.sort_values(by=['lvl1_tdo'], ascending=False).reset_index(drop=True)
+        mon_table_lvl1 = ranked(['lvl1_tdo'], n=None if args.save_tables else 30)
         if args.save_tables:
             if not os.path.isdir(args.save_tables):
                 os.makedirs(args.save_tables)
-            for x in ['gl', 'ul', 'ml']:
-                # TODO: Fix CP. The table is showing super weird CP values that are far from the CP caps.
-                # mon_table_league = mon_table[mon_table_visible_columns+[x+'_lvl', x+'_cp', x+'_tdo']].copy()
-                mon_table_league = mon_table[mon_table_visible_columns+[x+'_lvl', x+'_tdo']].copy()
-                mon_table_league.rename(columns=SHORTER_COLUMN_NAMES, inplace=True)
-                mon_table_league = mon_table_league.sort_values(by=[x+'_tdo'], ascending=False).reset_index(drop=True)
+            for x in leagues:
+                mon_table_league = ranked([x+'_lvl', x+'_cp', x+'_tdo'])
                 save_path = os.path.join(args.save_tables, 'best_pvp_mons_{}_by_tdo.txt'.format(x))
                 with open(save_path, 'w') as f:
                     print(mon_table_league, file=f)
@@ -269,7 +307,9 @@ def best_pvp_mons(args):
         print('Best level 1 Pokémon for PvP:')
         print(mon_table_lvl1.head(30))
 
-def show_pvp_pokemon_info(rows, fast_df, charge_df, maximum_movesets=25, legacy_fast_df=None, legacy_charge_df=None):
+def show_pvp_pokemon_info(rows, fast_df, charge_df, maximum_movesets=25, legacy_fast_df=None, legacy_charge_df=None, pair_table=None):
+    if pair_table is None:
+        pair_table = build_pair_table(fast_df, charge_df)
     for row in rows.itertuples():
         complete_type = type_from_gm_template_id(row.type)
         if row.type2:
@@ -318,33 +358,33 @@ def show_pvp_pokemon_info(rows, fast_df, charge_df, maximum_movesets=25, legacy_
             print(' - [{: <4}] [{: <8}] {: <17} (POWER={:<3.0f} ΔE={:<3} PP100E={:<3})'.format(
                 stab_str, move.type_name, move.pretty, move.power, move.energyDelta, move.R_PP100E))
 
-        movesets = []
-        for f, fast in fast_moves.iterrows():
-            for c, charged in charge_moves.iterrows():
-                movesets.append({
-                    'fast_name': fast['pretty'],
-                    'charged_name': charged['pretty'],
-                    'PPT': fast['R_PPT']+charged['R_PPE']*fast['EPT'],
-                    # 'TDO': formulas.calc_pokemon_moveset_tdo_ref(
-                    #     row.attack+15, row.defense+15, max_hp,
-                    #     fast['PPT'], fast['EPT'], charged['PPE'],
-                    #     fast_mult=fast['STAB_M'], charge_mult=charged['STAB_M']),
-                })
-                for league in league_d:
-                    lvl = league_d[league]['levels'][0]
-                    cpm = formulas.CP_MULTIPLIERS[lvl]
-                    movesets[-1]['TDO_'+league] = formulas.calc_pokemon_moveset_tdo_ref(
-                        (row.attack+15)*cpm, (row.defense+15)*cpm, formulas.calc_hp((row.stamina+15), lvl),
-                        fast['PPT'], fast['EPT'], charged['PPE'],
-                        fast_mult=fast['STAB_M'], charge_mult=charged['STAB_M']
-                    )
-        movesets = pd.DataFrame(movesets)
+        # Every (fast, charged) combination, fast moves first. Pair metrics are gathered, STAB applied on top.
+        f = np.repeat(np.arange(len(fast_moves)), len(charge_moves))
+        c = np.tile(np.arange(len(charge_moves)), len(fast_moves))
+        fast_pos = pair_table.fast_table.lookup(fast_moves['uniqueId'])[f]
+        charged_pos = pair_table.charged_table.lookup(charge_moves['uniqueId'])[c]
+        fast_stab_m, charge_stab_m = fast_moves['STAB_M'].values[f], charge_moves['STAB_M'].values[c]
+        fast_ppt = fast_moves['PPT'].values[f]
+        charged_ppt = pair_table.gather('charged_PPT', fast_pos, charged_pos)
+        movesets = pd.DataFrame({
+            'fast_name': fast_moves['pretty'].values[f],
+            'charged_name': charge_moves['pretty'].values[c],
+            'PPT': fast_ppt*fast_stab_m + charged_ppt*charge_stab_m,
+            'TTC': pair_table.gather('turns_to_charge', fast_pos, charged_pos),
+        })
+        for league in league_d:
+            lvl = league_d[league]['levels'][0]
+            cpm = formulas.CP_MULTIPLIERS[lvl]
+            movesets['TDO_'+league] = formulas.calc_pokemon_pair_tdo_ref(
+                (row.attack+15)*cpm, (row.defense+15)*cpm, formulas.calc_hp((row.stamina+15), lvl),
+                fast_ppt, charged_ppt, fast_mult=fast_stab_m, charge_mult=charge_stab_m)
         movesets = movesets.sort_values(by='PPT', ascending=False)
         print('\nBest movesets:')
         for moveset in movesets.iloc[:maximum_movesets].itertuples():
             # print(' - {m.fast_name: >17} - {m.charged_name: <17} (PPT={m.PPT:6.3f}, TDO={m.TDO:7.3f})'.format(m=moveset))
             print((' - {m.fast_name: >17} - {m.charged_name: <17}'
                 ' (PPT={m.PPT:6.3f}'
+                ', TTC={m.TTC:>3.0f}'
                 ', TDO_GL={m.TDO_GL:6.2f}'
                 ', TDO_UL={m.TDO_UL:6.2f}'
                 ', TDO_ML={m.TDO_ML:6.2f})'
@@ -360,6 +400,7 @@ def interactive_pvp_mon_search(args):
     charged_df = calc_charged_attack_stats(charged_df)
     legacy_fast_df = pd.read_csv(args.legacy_fast)
     legacy_charge_df = pd.read_csv(args.legacy_charge)
+    pair_table = build_pair_table(fast_df, charged_df)
 
     # Interactive loop.
     do_quit = False
@@ -377,16 +418,16 @@ def interactive_pvp_mon_search(args):
             dex_number = int(query)
             rows = pok_df.loc[pok_df['dex']==dex_number]
             show_pvp_pokemon_info(rows, fast_df, charged_df,
-                legacy_fast_df=legacy_fast_df, legacy_charge_df=legacy_charge_df)
+                legacy_fast_df=legacy_fast_df, legacy_charge_df=legacy_charge_df, pair_table=pair_table)
         else:
             complete_rows = pok_df.loc[pok_df['complete_name']==query.title()]
             rows = pok_df.loc[pok_df['name']==query.title()]
             if len(rows) > 0:
                 show_pvp_pokemon_info(rows, fast_df, charged_df,
-                    legacy_fast_df=legacy_fast_df, legacy_charge_df=legacy_charge_df)
+                    legacy_fast_df=legacy_fast_df, legacy_charge_df=legacy_charge_df, pair_table=pair_table)
             elif len(complete_rows) > 0:
                 show_pvp_pokemon_info(complete_rows, fast_df, charged_df,
-                    legacy_fast_df=legacy_fast_df, legacy_charge_df=legacy_charge_df)
+                    legacy_fast_df=legacy_fast_df, legacy_charge_df=legacy_charge_df, pair_table=pair_table)
             elif query == 'q' or query == 'quit' or raw_query == '':
                 do_quit = True
             elif query == '':
@@ -401,12 +442,528 @@ def interactive_pvp_mon_search(args):
                 else:
                     print('Couldn\'t find any pokemon named `{}`.'.format(query.title()))
 
+def rank_collection_chunk(chunk, rank_d, evolution_d=None):
+    """Find IV rank, league level, CP and stat product for every row of a chunk.
+
+    With `evolution_d` (see `evolution_lookup`), also find the later evolution
+    with the best rank in each league, and its rank and CP after evolving.
+    """
+    species = chunk['name'].astype(str).str.strip().str.title()
+    iv_cols = ['atk_iv', 'def_iv', 'sta_iv']
+    valid_mask = species.isin(rank_d['index']) & chunk[iv_cols].isin(range(16)).all(axis=1)
+    if not valid_mask.all():
+        print('WARNING: Skipping {} rows with unknown species or invalid IVs: {}'.format(
+            (~valid_mask).sum(), ', '.join(species[~valid_mask].unique())), file=sys.stderr)
+        chunk = chunk.loc[valid_mask].copy()
+        species = species[valid_mask]
+
+    ivs = formulas.iv_index(*[chunk[col].values.astype(int) for col in iv_cols])
+    results = {}
+    for league in rank_d['leagues']:
+        x = league.lower()
+        results[x+'_rank'] = np.zeros(len(chunk), dtype=int)
+        results[x+'_lvl'] = np.zeros(len(chunk))
+        results[x+'_cp'] = np.zeros(len(chunk), dtype=int)
+        results[x+'_sp'] = np.zeros(len(chunk))
+        if evolution_d is not None:
+            results[x+'_evo_name'] = np.full(len(chunk), None, dtype=object)
+            results[x+'_evo_rank'] = np.full(len(chunk), np.nan)
+            results[x+'_evo_cp'] = np.full(len(chunk), np.nan)
+    for name, positions in chunk.groupby(species.values).indices.items():
+        species_records = rank_tables.lookup_species(rank_d, name)
+        for l, league in enumerate(rank_d['leagues']):
+            x = league.lower()
+            records = species_records[l][ivs[positions]]
+            results[x+'_rank'][positions] = records['rank']
+            results[x+'_lvl'][positions] = records['level']
+            results[x+'_cp'][positions] = records['cp']
+            results[x+'_sp'][positions] = records['stat_product']
+        if evolution_d is not None:
+            targets, _, evo_records = evolution.project_evolutions(evolution_d['graph'], rank_d, evolution_d['names'], evolution_d['positions'][name])
+            if len(targets) == 0:
+                continue
+            for l, league in enumerate(rank_d['leagues']):
+                x = league.lower()
+                records = evo_records[:,l][:,ivs[positions]]
+                best = np.argmin(records['rank'], axis=0)
+                cols = np.arange(len(positions))
+                results[x+'_evo_name'][positions] = evolution_d['names'][targets[best]]
+                results[x+'_evo_rank'][positions] = records['rank'][best,cols]
+                results[x+'_evo_cp'][positions] = records['cp'][best,cols]
+    return chunk.assign(**results)
+
+def evolution_lookup(args, pok_df):
+    """Evolution graph plus the names and positions needed to project species from the rank tables."""
+    pok_df = pok_df.reset_index(drop=True)
+    names = pok_df['complete_name'].values
+    positions = {}
+    for p, complete_name in enumerate(pok_df['complete_name']):
+        positions.setdefault(complete_name.title(), p)
+    for p, name in enumerate(pok_df['name']):
+        positions.setdefault(name.title(), p)
+    return {
+        'graph': evolution.load_evolution_graph(args.game_master, pok_df),
+        'names': names,
+        'positions': positions,
+    }
+
+def rank_collection(args):
+    _, _, pok_df = process_game_master(args.game_master)
+    rank_d = rank_tables.get_rank_tables(pok_df, args.game_master, args.data_dir, jobs=args.jobs)
+    evolution_d = evolution_lookup(args, pok_df) if args.evolutions else None
+
+    output_format = args.format
+    if output_format is None:
+        output_format = 'jsonl' if args.output.endswith('.jsonl') else 'csv'
+
+    # Only one chunk is held in memory at a time, no matter how big the collection is.
+    n_rows = 0
+    with open(args.output, 'w') as f:
+        for c, chunk in enumerate(pd.read_csv(args.input, chunksize=args.chunk_size)):
+            chunk = rank_collection_chunk(chunk, rank_d, evolution_d=evolution_d)
+            if output_format == 'jsonl':
+                if len(chunk) > 0:
+                    f.write(chunk.to_json(orient='records', lines=True).rstrip('\n') + '\n')
+            else:
+                chunk.to_csv(f, header=(c == 0), index=False)
+            n_rows += len(chunk)
+            print('INFO: {} rows ranked.\r'.format(n_rows), end='', file=sys.stderr)
+    print(file=sys.stderr)
+
+def evolve_ranks(args):
+    _, _, pok_df = process_game_master(args.game_master)
+    pok_df = pok_df.reset_index(drop=True)
+    rows = find_species(pok_df, args.species)
+    if len(rows) == 0:
+        print('Couldn\'t find any pokemon named `{}`.'.format(args.species), file=sys.stderr)
+        return 1
+    rank_d = rank_tables.get_rank_tables(pok_df, args.game_master, args.data_dir, jobs=args.jobs)
+    evolution_d = evolution_lookup(args, pok_df)
+    names = evolution_d['names']
+
+    for s in rows.index:
+        targets, candy, records = evolution.project_evolutions(evolution_d['graph'], rank_d, names, s)
+        if len(targets) == 0:
+            print('\n{} doesn\'t evolve.'.format(names[s]))
+            continue
+        atk_ivs, def_ivs, sta_ivs = formulas.iv_combinations()
+        for t, target in enumerate(targets):
+            print('\n# {} -> {} ({} candy)'.format(names[s], names[target], candy[t]))
+            rank_frames = []
+            for l, league in enumerate(rank_d['leagues']):
+                if args.ivs:
+                    ivs = np.array([formulas.iv_index(*args.ivs)])
+                else:
+                    ivs = np.argsort(records[t,l]['rank'], kind='stable')[:args.top]
+                rank_frames.append(pd.DataFrame({
+                    'league': league,
+                    'atk_iv': atk_ivs[ivs],
+                    'def_iv': def_ivs[ivs],
+                    'sta_iv': sta_ivs[ivs],
+                    'rank': records[t,l]['rank'][ivs],
+                    'lvl': records[t,l]['level'][ivs],
+                    'cp': records[t,l]['cp'][ivs],
+                }))
+            print(pd.concat(rank_frames).to_string(index=False))
+
+def derive_base_stats(args):
+    missing = base_stats.missing_veekun_files(args.veekun_dir)
+    if missing:
+        print('ERROR: Missing veekun files in `{}`: {}. Download them with `get_data.sh` or pass `--veekun-dir`.'.format(
+            args.veekun_dir, ', '.join(missing)), file=sys.stderr)
+        return 2
+    veekun_df = base_stats.load_veekun_stats(args.veekun_dir)
+    go_df = base_stats.derive_go_stats(veekun_df)
+    sources = {}
+    if os.path.isfile(args.game_master):
+        _, _, pok_df = process_game_master(args.game_master)
+        sources['game_master'] = base_stats.game_master_stats(pok_df)
+    if args.gamepress_json and os.path.isfile(args.gamepress_json):
+        sources['gamepress'] = base_stats.gamepress_stats(args.gamepress_json)
+    if not sources:
+        print('ERROR: Neither the game master nor the gamepress JSON were found.', file=sys.stderr)
+        return 2
+
+    report = base_stats.mismatch_report(go_df, sources)
+    print('Derived base stats for {} Pokémon.'.format(len(go_df)))
+    for source in sources:
+        source_report = report.loc[report['source']==source]
+        counts = ', '.join('{}={}'.format(stat, (source_report['stat']==stat).sum()) for stat in base_stats.GO_STATS)
+        print('Mismatches against {}: {}'.format(source, counts))
+    if args.report:
+        report.to_csv(args.report, index=False)
+    if args.check:
+        regressions = base_stats.new_mismatches(report, pd.read_csv(args.check))
+        if len(regressions) > 0:
+            with pd.option_context('display.max_rows', None, 'display.max_columns', None):
+                print('New mismatches:\n{}'.format(regressions))
+            return 1
+        print('No new mismatches.')
+
+def game_master_history(args):
+    store = args.store or history.default_history_path(args.data_dir)
+    if args.ingest:
+        try:
+            n_versions, n_changes = history.ingest(args.ingest, store, jobs=args.jobs)
+        except ValueError as e:
+            print('ERROR: {}'.format(e), file=sys.stderr)
+            return 1
+        print('Added {} versions ({} changes) to `{}`.'.format(n_versions, n_changes, store))
+    if not args.query:
+        return
+    versions, changes = history.load_history(store)
+    results = history.query_history(changes, ' '.join(args.query))
+    if len(results) == 0:
+        print('No changes found for `{}` in {} versions.'.format(' '.join(args.query), len(versions)))
+    for template_id, version, diff in results:
+        print('\n# {} @ {}'.format(template_id, version))
+        for field, (old, new) in diff.items():
+            print(' - {}: {} -> {}'.format(field, old, new))
+
+def find_species(pok_df, query):
+    """Rows of `pok_df` matching a dex number, a complete name or a name."""
+    query = query.strip()
+    if query.isdigit():
+        return pok_df.loc[pok_df['dex']==int(query)]
+    rows = pok_df.loc[pok_df['complete_name']==query.title()]
+    if len(rows) == 0:
+        rows = pok_df.loc[pok_df['name']==query.title()]
+    return rows
+
+def raid_counters(args):
+    _, _, pok_df = process_game_master(args.game_master)
+    pok_df = pok_df.reset_index(drop=True)
+    moves_df = pve.process_pve_moves(args.game_master)
+    eff = effectiveness.load_type_effectiveness(args.game_master)
+    weather_types = ()
+    if args.weather:
+        weathers = effectiveness.load_weather_affinities(args.game_master)
+        if args.weather.upper() not in weathers:
+            print('ERROR: Unknown weather `{}`. Valid names: {}.'.format(args.weather, ', '.join(sorted(weathers))), file=sys.stderr)
+            return 1
+        weather_types = weathers[args.weather.upper()]
+
+    if not args.boss and not args.all:
+        print('ERROR: Give the raid bosses, or use `--all`.', file=sys.stderr)
+        return 1
+    if args.boss and args.all:
+        print('ERROR: Give the raid bosses or use `--all`, not both.', file=sys.stderr)
+        return 1
+    if args.all:
+        boss_idxs = np.arange(len(pok_df))
+    else:
+        boss_idxs = []
+        for query in args.boss:
+            rows = find_species(pok_df, query)
+            if len(rows) == 0:
+                print('Couldn\'t find any pokemon named `{}`.'.format(query), file=sys.stderr)
+                return 1
+            boss_idxs.extend(rows.index)
+    raid_rows = pve.raid_counters(pok_df, moves_df, eff, boss_idxs, top=args.top, weather_types=weather_types,
+        level=args.level, tier=args.tier, gym_level=args.boss_level if args.gym else None)
+    if args.save:
+        raid_rows.to_csv(args.save, index=False)
+    else:
+        battle = 'level {:g} gym defender'.format(args.boss_level) if args.gym else 'tier {} raid'.format(args.tier)
+        with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 1000):
+            for boss, boss_counters in raid_rows.groupby('boss', sort=False):
+                print('\nBest counters against {} ({}):'.format(boss, battle))
+                print(boss_counters.drop(columns='boss').to_string(index=False))
+
+def meta_pvp_mons(args):
+    mon_table = get_mon_table(args)
+    eff = effectiveness.load_type_effectiveness(args.game_master)
+    leagues = [league for league, _ in args.leagues]
+    try:
+        meta_df = meta.load_meta(args.meta)
+        mon_table = meta.meta_scores(mon_table, eff, meta_df, leagues)
+    except ValueError as e:
+        print('ERROR: {}'.format(e), file=sys.stderr)
+        return 1
+    visible_columns = ['dex', 'name', 'stamina', 'attack', 'defense', 'fast_name', 'charge_name']
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 1000):
+        for x in [league.lower() for league in leagues]:
+            table = mon_table[visible_columns+[x+'_cp', x+'_tdo', x+'_meta_tdo']].rename(columns=SHORTER_COLUMN_NAMES)
+            table = table.sort_values(by=x+'_meta_tdo', ascending=False).reset_index(drop=True)
+            if args.save_tables:
+                if not os.path.isdir(args.save_tables):
+                    os.makedirs(args.save_tables)
+                with open(os.path.join(args.save_tables, 'best_pvp_mons_{}_by_meta_tdo.txt'.format(x)), 'w') as f:
+                    print(table, file=f)
+            print('\nBest Pokémon against the meta in {}:'.format(x.upper()))
+            print(table.head(args.top))
+
+def get_counter_index(args, mon_table, eff):
+    """Counter index (see `counters.build_counter_index`), from the derived tables cache when possible."""
+    leagues = [league for league, _ in args.leagues]
+    def compute():
+        return counters.index_to_frame(counters.build_counter_index(mon_table, eff, leagues))
+    if args.no_cache:
+        return counters.index_from_frame(compute(), leagues)
+    key = cache.cache_key(data.game_master_hash(args.game_master), table='counters', leagues=args.leagues,
+        size=counters.DEFAULT_INDEX_SIZE)
+    df = cache.cached_frame(cache.default_cache_dir(args.data_dir), key, compute, max_bytes=args.cache_size * 1024**2)
+    return counters.index_from_frame(df, leagues)
+
+def pvp_counters(args):
+    mon_table = get_mon_table(args)
+    eff = effectiveness.load_type_effectiveness(args.game_master)
+    query = args.defender.strip()
+    if query.isdigit():
+        mask = mon_table['dex'] == int(query)
+    else:
+        mask = mon_table['name'] == query.title()
+        if not mask.any():
+            mask = mon_table['pokemonId'].str.replace('_', ' ', regex=False).str.title() == query.title()
+    defenders = mon_table.loc[mask].drop_duplicates(subset='name')
+    if len(defenders) == 0:
+        print('Couldn\'t find any pokemon named `{}`.'.format(args.defender), file=sys.stderr)
+        return 1
+    index = get_counter_index(args, mon_table, eff)
+    fast_types = effectiveness.type_codes(mon_table['fast_type'])
+    charge_types = effectiveness.type_codes(mon_table['charge_type'])
+    visible_columns = ['dex', 'name', 'stamina', 'attack', 'defense', 'fast_name', 'charge_name']
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 1000):
+        for defender in defenders.itertuples():
+            type1, type2 = effectiveness.type_code(defender.type), effectiveness.type_code(defender.type2)
+            complete_type = '/'.join(effectiveness.TYPES[t] for t in (type1, type2) if t != effectiveness.NO_TYPE)
+            for league in index['leagues']:
+                x = league.lower()
+                rows, scores = counters.lookup_counters(index, league, type1, type2)
+                rows, scores = rows[:args.top], scores[:args.top]
+                table = mon_table.iloc[rows][visible_columns+[x+'_cp']].rename(columns=SHORTER_COLUMN_NAMES)
+                table['fast_eff'] = effectiveness.type_multiplier(eff, fast_types[rows], type1, type2)
+                table['charge_eff'] = effectiveness.type_multiplier(eff, charge_types[rows], type1, type2)
+                table['score'] = scores
+                print('\nBest counters against {} ({}) in {}:'.format(defender.name, complete_type, x.upper()))
+                print(table.reset_index(drop=True))
+
+def similar_pvp_mons(args):
+    if not args.name and not args.meta:
+        print('ERROR: Give a Pokémon, or a meta with `--meta`.', file=sys.stderr)
+        return 1
+    mon_table = get_mon_table(args)
+    try:
+        if args.types:
+            similarity.type_mask(mon_table, args.types)
+    except ValueError as e:
+        print('ERROR: {}'.format(e), file=sys.stderr)
+        return 1
+    if args.name:
+        query_df = pd.DataFrame([{'name': args.name, 'weight': 1, 'fast': args.fast, 'charged': args.charged}])
+    else:
+        try:
+            query_df = meta.load_meta(args.meta)
+        except ValueError as e:
+            print('ERROR: {}'.format(e), file=sys.stderr)
+            return 1
+    visible_columns = ['dex', 'name', 'stamina', 'attack', 'defense', 'fast_name', 'charge_name']
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 1000):
+        for league, _ in args.leagues:
+            x = league.lower()
+            index = similarity.MovesetIndex(mon_table, league)
+            rows = meta.find_meta_movesets(mon_table, query_df, league)
+            if args.meta:
+                if (rows < 0).any():
+                    print('WARNING: Skipping meta opponents that were not found: {}'.format(
+                        ', '.join(query_df['name'].astype(str).values[rows < 0])), file=sys.stderr)
+                rows = rows[rows >= 0]
+                # Every pair of meta opponents, e.g. for clustering.
+                labels = (mon_table['name'] + ' (' + mon_table['fast_name'] + ', ' + mon_table['charge_name'] + ')').values[rows]
+                distances = pd.DataFrame(similarity.all_pairs(index.features, rows), index=labels, columns=labels)
+                if args.save:
+                    distances.to_csv(args.save.replace('{league}', x))
+                else:
+                    print('\nDistances between the meta movesets in {}:'.format(x.upper()))
+                    print(distances.round(2))
+                continue
+            row = rows[0]
+            if row < 0:
+                print('Couldn\'t find any pokemon named `{}`.'.format(args.name), file=sys.stderr)
+                return 1
+            # Other species only.
+            same_species = (mon_table['name'] == mon_table['name'].iloc[row]).values
+            neighbors, distances = index.query(row, k=args.top, types=args.types, exclude=same_species)
+            table = mon_table.iloc[neighbors][visible_columns+[x+'_cp', x+'_tdo']].rename(columns=SHORTER_COLUMN_NAMES)
+            table.insert(0, 'distance', distances.round(3))
+            print('\nPokémon that play like {} ({}, {}) in {}:'.format(mon_table['name'].iloc[row],
+                mon_table['fast_name'].iloc[row], mon_table['charge_name'].iloc[row], x.upper()))
+            print(table.reset_index(drop=True))
+
+def pvp_sequences(args):
+    fast_df, charge_df, pok_df = process_game_master(args.game_master)
+    fast_df = calc_fast_attack_stats(fast_df).set_index('uniqueId', drop=False)
+    charge_df = calc_charged_attack_stats(charge_df).set_index('uniqueId', drop=False)
+    pok_df = pok_df.reset_index(drop=True)
+    eff = effectiveness.load_type_effectiveness(args.game_master)
+    league, cp_cap = args.league
+
+    defenders = find_species(pok_df, args.defender)
+    if len(defenders) == 0:
+        print('Couldn\'t find any pokemon named `{}`.'.format(args.defender), file=sys.stderr)
+        return 1
+    defender = defenders.iloc[0]
+    if len(defenders) > 1:
+        print('WARNING: `{}` matches {} pokémon, using {}. Give the complete name for another one: {}.'.format(
+            args.defender, len(defenders), defender['complete_name'], ', '.join(defenders['complete_name'].iloc[1:])), file=sys.stderr)
+    if args.attacker:
+        attackers = find_species(pok_df, args.attacker)
+        if len(attackers) == 0:
+            print('Couldn\'t find any pokemon named `{}`.'.format(args.attacker), file=sys.stderr)
+            return 1
+    else:
+        attackers = pok_df
+
+    # Perfect IVs at the league level, for the attackers and the defender alike.
+    league_caps = [(league, cp_cap)]
+    cpms = formulas.find_league_pokemon(attackers['attack']+15, attackers['defense']+15, attackers['stamina']+15, league_caps=league_caps)[league]['cpms']
+    def_cpm = formulas.find_league_pokemon(defender['attack']+15, defender['defense']+15, defender['stamina']+15, league_caps=league_caps)[league]['cpms'][0]
+    def_stat = (defender['defense']+15) * def_cpm
+    def_hp = int(np.floor((defender['stamina']+15) * def_cpm))
+    def_type1, def_type2 = effectiveness.type_code(defender['type']), effectiveness.type_code(defender['type2'])
+
+    def multiplier(move_type, attacker):
+        stab = STAB_MULTIPLIER if move_type in (attacker['type'], attacker['type2']) else 1
+        return stab * effectiveness.type_multiplier(eff, effectiveness.type_code(move_type), def_type1, def_type2)
+
+    # Every (attacker, fast move, pair of charged moves), solved in one batch.
+    fast_moves = fast_df.to_dict('index')
+    charged_moves = charge_df.to_dict('index')
+    pairs = []
+    for a, attacker in enumerate(attackers.to_dict('records')):
+        atk_stat = (attacker['attack']+15) * cpms[a]
+        charged_ids = [m for m in attacker['cinematicMoves'] if m in charged_moves]
+        charged_sets = list(itertools.combinations(charged_ids, 2)) or [tuple(charged_ids)]
+        for fast_id in attacker['quickMoves']:
+            if fast_id not in fast_moves or not charged_ids:
+                continue
+            fast = fast_moves[fast_id]
+            for charged_set in charged_sets:
+                charged = [charged_moves[m] for m in charged_set]
+                pairs.append({
+                    'name': attacker['complete_name'],
+                    'fast_name': fast['name'],
+                    'charged_names': [c['name'] for c in charged],
+                    'fast_damage': sequencing.calc_pvp_damage(fast['power'], atk_stat, def_stat, multiplier(fast['type'], attacker)),
+                    'fast_turns': fast['durationTurns'],
+                    'fast_energy': fast['energyDelta'],
+                    'charged_damage': [sequencing.calc_pvp_damage(c['power'], atk_stat, def_stat, multiplier(c['type'], attacker)) for c in charged],
+                    'charged_cost': [abs(c['energyDelta']) for c in charged],
+                })
+    pairs = pd.DataFrame(pairs, columns=['name', 'fast_name', 'charged_names', 'fast_damage', 'fast_turns', 'fast_energy', 'charged_damage', 'charged_cost'])
+    # Pad single charged move sets with a move that can never be thrown.
+    pad = lambda values, filler: [list(v) + [filler] * (2 - len(v)) for v in values]
+    pairs['turns'] = sequencing.batch_turns_to_faint(pairs['fast_damage'].values, pairs['fast_turns'].values, pairs['fast_energy'].values,
+        np.array(pad(pairs['charged_damage'], 0)).reshape(-1, 2), np.array(pad(pairs['charged_cost'], sequencing.MAX_ENERGY + 1)).reshape(-1, 2),
+        def_hp, shields=args.shields)
+    pairs = pairs.sort_values(by=['turns', 'name'], kind='stable').reset_index(drop=True)
+
+    # Sequences are only worked out for the movesets shown.
+    sequencer = sequencing.Sequencer()
+    results = pairs.head(args.top).copy()
+    sequences = []
+    for pair in results.itertuples():
+        _, sequence = sequencer.solve(pair.fast_damage, pair.fast_turns, pair.fast_energy,
+            list(zip(pair.charged_damage, pair.charged_cost)), def_hp, shields=args.shields)
+        names = dict(enumerate(pair.charged_names))
+        names[sequencing.FAST] = pair.fast_name
+        sequences.append(sequencing.compress_sequence(sequence, names))
+    results['charged_names'] = results['charged_names'].str.join(' + ')
+    results['sequence'] = sequences
+    print('Turns to faint {} ({} HP, {} shields) in {}:'.format(defender['complete_name'], def_hp, args.shields, league))
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.max_colwidth', None, 'display.width', 1000):
+        print(results[['name', 'fast_name', 'charged_names', 'turns', 'sequence']].to_string(index=False))
+
+def export_db(args):
+    fast_df, charge_df, pok_df = process_game_master(args.game_master)
+    fast_df = calc_fast_attack_stats(fast_df)
+    charge_df = calc_charged_attack_stats(charge_df)
+    mon_table = get_mon_table(args, fast_df, charge_df, pok_df)
+    db_path = args.db or database.default_database_path(args.data_dir)
+    database.export_database(db_path, fast_df, charge_df, pok_df, mon_table, [league for league, _ in args.leagues])
+    print('Database saved to `{}`.'.format(db_path))
+
+def sql_query(args):
+    db_path = args.db or database.default_database_path(args.data_dir)
+    if not os.path.isfile(db_path):
+        print('ERROR: No database at `{}`, run `pogo export-db` first.'.format(db_path), file=sys.stderr)
+        return 1
+    try:
+        columns, rows = database.run_query(db_path, ' '.join(args.query))
+    except sqlite3.OperationalError as e:
+        print('ERROR: {}'.format(e), file=sys.stderr)
+        return 1
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 1000):
+        print(pd.DataFrame(rows, columns=columns).to_string(index=False))
+
+def show_cache(args):
+    cache_dir = cache.default_cache_dir(args.data_dir)
+    if args.clear:
+        cache.clear(cache_dir)
+    info = cache.cache_info(cache_dir)
+    total = info['hits'] + info['misses']
+    print('Cache at `{}`: {} entries, {:.1f} MiB.'.format(cache_dir, info['entries'], info['bytes'] / 1024**2))
+    print('Hits: {}  Misses: {}  Hit rate: {:.1%}  Evictions: {}'.format(
+        info['hits'], info['misses'], info['hits'] / total if total else 0, info['evictions']))
+
+def update_legacy(args):
+    if args.page:
+        with open(args.page, 'r', encoding='utf-8') as f:
+            page = f.read()
+    else:
+        try:
+            page = legacy.fetch_legacy_page(args.url, os.path.join(args.data_dir, 'gp_legacy_page.html'))
+        except requests.RequestException as e:
+            print('ERROR: Couldn\'t download the legacy page: {}'.format(e), file=sys.stderr)
+            return 1
+
+    def compute():
+        fast_df, charged_df, pok_df = process_game_master(args.game_master)
+        moves_df, n_blacklisted = legacy.parse_legacy_page(page, fast_df['name'], charged_df['name'], pok_df['name'])
+        print('INFO: Parsed {} legacy moves ({} blacklisted).'.format(len(moves_df), n_blacklisted), file=sys.stderr)
+        return moves_df
+
+    try:
+        if args.no_cache:
+            moves_df = compute()
+        else:
+            key = cache.cache_key(data.game_master_hash(args.game_master), table='legacy_moves',
+                page=legacy.page_hash(page), black_list=sorted(legacy.BLACK_LIST), columns=legacy.MOVES_COLUMNS)
+            moves_df = cache.cached_frame(cache.default_cache_dir(args.data_dir), key, compute, max_bytes=args.cache_size * 1024**2)
+    except ValueError as e:
+        print('ERROR: {}'.format(e), file=sys.stderr)
+        return 1
+
+    # The CSVs use the game master's spelling, which may differ from the page's.
+    renamed = set()
+    for row in moves_df.itertuples():
+        renamed.update((page_name, name) for page_name, name in [(row.page_pokemon_name, row.pokemon_name), (row.page_move, row.move)] if page_name != name)
+    for page_name, name in sorted(renamed):
+        print('INFO: Saving `{}` as `{}` (game master spelling).'.format(page_name, name), file=sys.stderr)
+    unknown = moves_df.loc[~moves_df['known'].astype(bool)]
+    for row in unknown.itertuples():
+        print('WARNING: Not in the game master: {} ({} move {}).'.format(row.pokemon_name, row.kind, row.move), file=sys.stderr)
+    fast, charge = legacy.split_moves(moves_df)
+    changed = False
+    for df, path in [(fast, args.save_fast_moves or args.legacy_fast), (charge, args.save_charge_moves or args.legacy_charge)]:
+        if legacy.write_if_changed(df, path):
+            print('INFO: Saved {} moves to `{}`.'.format(len(df), path), file=sys.stderr)
+            changed = True
+    if not changed:
+        print('INFO: Legacy moves are up to date.', file=sys.stderr)
+
 def prompt_download_data(args):
     data.download_data(args.data_dir, latest=False)
 
 def download_data(args):
     data.download_data(args.data_dir, latest=args.latest)
 
+def parse_league_cap(text):
+    match = re.match(r'^(\w+)=(\d+)$', text)
+    if not match:
+        raise argparse.ArgumentTypeError('Expected NAME=CAP, got `{}`.'.format(text))
+    return (match.group(1).upper(), int(match.group(2)))
+
 def parse_args():
     parser = argparse.ArgumentParser(description='')
     subparsers = parser.add_subparsers(help='Available commands.', dest='command')
@@ -415,6 +972,8 @@ def parse_args():
     common_parser = argparse.ArgumentParser(add_help=False)
     common_parser.add_argument('--data-dir', default=data.get_data_dir())
     common_parser.add_argument('--game-master')
+    common_parser.add_argument('--no-cache', action='store_true', help='Don\'t use the derived tables cache.')
+    common_parser.add_argument('--cache-size', type=float, default=cache.DEFAULT_MAX_BYTES / 1024**2, help='Maximum size of the derived tables cache, in MiB.')
     common_parser.set_defaults(legacy_fast=os.path.join(os.path.dirname(__file__), 'legacy_fast_moves.csv'))
     common_parser.set_defaults(legacy_charge=os.path.join(os.path.dirname(__file__), 'legacy_charge_moves.csv'))
 
@@ -424,25 +983,135 @@ def parse_args():
 
     best_mons_parser = subparsers.add_parser('best_pvp_mons', parents=[common_parser], help='Find the best Pokémon for PvP in the game.')
     best_mons_parser.add_argument('--save-tables')
+    best_mons_parser.add_argument('--league', dest='leagues', action='append', type=parse_league_cap, metavar='NAME=CAP',
+        help='League and its CP cap (0 for no cap), e.g. `--league LC=500`. May be repeated. Default: GL, UL and ML.')
+    best_mons_parser.add_argument('--variant', dest='variants', action='append', choices=sorted(formulas.VARIANTS),
+        help='Also rank this variant of every Pokémon (e.g. shadow). May be repeated. Shadows show their attack and defense with the shadow multipliers.')
     best_mons_parser.set_defaults(func=best_pvp_mons)
 
     pvp_mon_parser = subparsers.add_parser('pokemon', aliases=['pok', 'mon'], parents=[common_parser], help='Show pokemon info.')
     pvp_mon_parser.add_argument('--query')
     pvp_mon_parser.set_defaults(func=interactive_pvp_mon_search)
 
+    collection_parser = subparsers.add_parser('collection', parents=[common_parser], help='Rank a collection of Pokémon (CSV with name, cp, hp, atk_iv, def_iv, sta_iv) in every league.')
+    collection_parser.add_argument('input', help='CSV file with the collection.')
+    collection_parser.add_argument('--output', required=True, help='Where to save the results (CSV or JSONL).')
+    collection_parser.add_argument('--format', choices=['csv', 'jsonl'], help='Output format. Guessed from the output extension by default.')
+    collection_parser.add_argument('--chunk-size', type=int, default=10000, help='Number of rows processed at a time.')
+    collection_parser.add_argument('--evolutions', action='store_true', help='Also rank each Pokémon as its best later evolution.')
+    collection_parser.add_argument('--jobs', type=int, default=1, help='Number of worker processes building the rank tables (species are split across them).')
+    collection_parser.set_defaults(func=rank_collection)
+
+    evolve_parser = subparsers.add_parser('evolve', parents=[common_parser], help='League ranks and CPs of a Pokémon\'s IV spreads after evolving.')
+    evolve_parser.add_argument('species', help='Pre-evolution (name or dex number).')
+    evolve_parser.add_argument('--ivs', type=int, nargs=3, metavar=('ATK', 'DEF', 'STA'), help='Show this IV spread only.')
+    evolve_parser.add_argument('--top', type=int, default=10, help='Number of IV spreads shown per evolution and league.')
+    evolve_parser.add_argument('--jobs', type=int, default=1, help='Number of worker processes building the rank tables (species are split across them).')
+    evolve_parser.set_defaults(func=evolve_ranks)
+
+    base_stats_parser = subparsers.add_parser('base_stats', parents=[common_parser], help='Derive base stats from the main series and compare them with the game master and gamepress.')
+    base_stats_parser.add_argument('--veekun-dir', help='Directory with veekun\'s pokemon.csv, pokemon_stats.csv and stats.csv. Default: the repository\'s `data` dir.')
+    base_stats_parser.add_argument('--gamepress-json', help='Gamepress aggregated JSON. Default: gamepress_data.json in the data dir.')
+    base_stats_parser.add_argument('--report', help='Save the mismatch report (CSV) to this path.')
+    base_stats_parser.add_argument('--check', metavar='BASELINE_REPORT', help='Fail if there are mismatches that are not in this report.')
+    base_stats_parser.set_defaults(func=derive_base_stats)
+
+    history_parser = subparsers.add_parser('history', parents=[common_parser], help='Track how moves and Pokémon changed across game master versions.')
+    history_parser.add_argument('query', nargs='*', help='Move or Pokémon to show the changes of (e.g. `Water Gun`).')
+    history_parser.add_argument('--ingest', metavar='DIR', help='Directory with game master versions (`<version>/GAME_MASTER.json`) to add to the change log.')
+    history_parser.add_argument('--store', help='Change log path. Default: in the data dir.')
+    history_parser.add_argument('--jobs', type=int, help='Number of worker processes parsing the game masters. Default: the number of CPUs.')
+    history_parser.set_defaults(func=game_master_history)
+
+    raid_parser = subparsers.add_parser('raid', parents=[common_parser], help='Find the best raid and gym counters (PvE DPS and TDO).')
+    raid_parser.add_argument('boss', nargs='*', help='Raid bosses (names or dex numbers).')
+    raid_parser.add_argument('--all', action='store_true', help='Use every Pokémon as a boss.')
+    raid_parser.add_argument('--weather', help='Weather condition (e.g. CLEAR, RAINY).')
+    raid_parser.add_argument('--top', type=int, default=20, help='Number of counters per boss.')
+    raid_parser.add_argument('--level', type=float, default=40, help='Level of the attackers (perfect IV).')
+    raid_parser.add_argument('--tier', type=int, default=5, choices=sorted(pve.RAID_TIERS), help='Raid tier of the bosses (sets their CP multiplier and HP).')
+    raid_parser.add_argument('--gym', action='store_true', help='The bosses are gym defenders instead of raid bosses.')
+    raid_parser.add_argument('--boss-level', type=float, default=40, help='Level of the gym defenders (perfect IV), with `--gym`.')
+    raid_parser.add_argument('--save', help='Save the counters as CSV instead of printing them.')
+    raid_parser.set_defaults(func=raid_counters)
+
+    meta_parser = subparsers.add_parser('meta', parents=[common_parser], help='Rank Pokémon by their TDO against a weighted meta of opponents.')
+    meta_parser.add_argument('meta', help='CSV with the opponents: name, weight and optionally fast and charged (move names).')
+    meta_parser.add_argument('--league', dest='leagues', action='append', type=parse_league_cap, metavar='NAME=CAP',
+        help='League and its CP cap (0 for no cap). May be repeated. Default: GL, UL and ML.')
+    meta_parser.add_argument('--top', type=int, default=30, help='Number of movesets shown per league.')
+    meta_parser.add_argument('--save-tables')
+    meta_parser.set_defaults(func=meta_pvp_mons)
+
+    sequence_parser = subparsers.add_parser('sequence', parents=[common_parser], help='Find the fast/charged move sequence that faints a defender the fastest.')
+    sequence_parser.add_argument('defender', help='Defending Pokémon (name or dex number).')
+    sequence_parser.add_argument('--attacker', help='Attacking Pokémon. Default: every Pokémon.')
+    sequence_parser.add_argument('--shields', type=int, default=0, choices=[0, 1, 2], help='Shields of the defender.')
+    sequence_parser.add_argument('--league', type=parse_league_cap, default=('GL', 1500), metavar='NAME=CAP', help='Default: GL=1500.')
+    sequence_parser.add_argument('--top', type=int, default=30, help='Number of movesets shown.')
+    sequence_parser.set_defaults(func=pvp_sequences)
+
+    counters_parser = subparsers.add_parser('counters', parents=[common_parser], help='Find the best attackers against a Pokémon\'s typing.')
+    counters_parser.add_argument('defender', help='Defending Pokémon (name or dex number).')
+    counters_parser.add_argument('--league', dest='leagues', action='append', type=parse_league_cap, metavar='NAME=CAP',
+        help='League and its CP cap (0 for no cap). May be repeated. Default: GL, UL and ML.')
+    counters_parser.add_argument('--top', type=int, default=10, help='Number of counters shown per league (at most {}).'.format(counters.DEFAULT_INDEX_SIZE))
+    counters_parser.set_defaults(func=pvp_counters)
+
+    similar_parser = subparsers.add_parser('similar', parents=[common_parser], help='Find the Pokémon with the closest league stats and move profile.')
+    similar_parser.add_argument('name', nargs='?', help='Complete name of the Pokémon (e.g. `Marowak Alola`).')
+    similar_parser.add_argument('--fast', help='Fast move of the Pokémon. Default: from its best moveset.')
+    similar_parser.add_argument('--charged', help='Charged move of the Pokémon. Default: from its best moveset.')
+    similar_parser.add_argument('--type', dest='types', action='append', help='Only show Pokémon of this type. May be repeated.')
+    similar_parser.add_argument('--league', dest='leagues', action='append', type=parse_league_cap, metavar='NAME=CAP',
+        help='League and its CP cap (0 for no cap). May be repeated. Default: GL, UL and ML.')
+    similar_parser.add_argument('--top', type=int, default=10, help='Number of Pokémon shown per league.')
+    similar_parser.add_argument('--meta', help='Instead, compare every pair of opponents of this meta CSV (see `meta`).')
+    similar_parser.add_argument('--save', help='Save the meta distances as CSV (`{league}` is replaced by the league).')
+    similar_parser.set_defaults(func=similar_pvp_mons)
+
+    export_db_parser = subparsers.add_parser('export-db', parents=[common_parser], help='Export species, moves, movesets and league tables to SQLite.')
+    export_db_parser.add_argument('--db', help='SQLite file. Default: in the data dir.')
+    export_db_parser.add_argument('--league', dest='leagues', action='append', type=parse_league_cap, metavar='NAME=CAP',
+        help='League and its CP cap (0 for no cap). May be repeated. Default: GL, UL and ML.')
+    export_db_parser.set_defaults(func=export_db)
+
+    sql_parser = subparsers.add_parser('sql', parents=[common_parser], help='Run a SQL query against the exported database.')
+    sql_parser.add_argument('query', nargs='+')
+    sql_parser.add_argument('--db', help='SQLite file. Default: in the data dir.')
+    sql_parser.set_defaults(func=sql_query)
+
+    cache_parser = subparsers.add_parser('cache', parents=[common_parser], help='Show statistics of the derived tables cache.')
+    cache_parser.add_argument('--clear', action='store_true', help='Remove every entry.')
+    cache_parser.set_defaults(func=show_cache)
+
+    update_legacy_parser = subparsers.add_parser('update-legacy', parents=[common_parser], help='Update the legacy moves from gamepress\' legacy move list.')
+    update_legacy_parser.add_argument('--url', default=legacy.LEGACY_URL)
+    update_legacy_parser.add_argument('--page', help='Parse this saved copy of the page instead of downloading it.')
+    update_legacy_parser.add_argument('--save-fast-moves', help='Default: the package\'s legacy_fast_moves.csv.')
+    update_legacy_parser.add_argument('--save-charge-moves', help='Default: the package\'s legacy_charge_moves.csv.')
+    update_legacy_parser.set_defaults(func=update_legacy)
+
     download_data_parser = subparsers.add_parser('download', parents=[common_parser], help='Download essential data.')
     download_data_parser.add_argument('--latest', action='store_true', help='Download latest files (e.g. latest game master)')
     download_data_parser.set_defaults(func=download_data)
 
     args = parser.parse_args()
+    if getattr(args, 'leagues', None) is None:
+        args.leagues = formulas.LEAGUE_CAPS
     if args.game_master is None:
         args.game_master = os.path.join(args.data_dir, 'GAME_MASTER.json')
+    if args.command == 'base_stats':
+        if args.veekun_dir is None:
+            args.veekun_dir = base_stats.BUNDLED_DATA_DIR
+        if args.gamepress_json is None:
+            args.gamepress_json = os.path.join(args.data_dir, 'gamepress_data.json')
     return args
 
 def main():
     print('PoGo Kit (@possatti)')
     args = parse_args()
-    args.func(args)
+    sys.exit(args.func(args))
 
 if __name__ == '__main__':
     main()
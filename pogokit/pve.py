@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PvE (raids and gyms) DPS and TDO.
+
+Uses the `moveSettings` templates of the game master, which are the PvE
+versions of the moves (durations in milliseconds, energy gains of up to 100).
+
+The model is a steady state cycle of fast and charged moves. In a cycle the
+attacker spends a fraction `a` of the time on charged moves, which is given by
+the energy balance (gaining 1 energy for every 2 HP of damage taken):
+
+    FEPS * (1 - a) + y / 2 = CEPS * a
+
+where FEPS/CEPS are the energy gained/spent per second by the fast/charged
+move and `y` is the boss' DPS against the attacker. Then:
+
+    DPS = FDPS * (1 - a) + CDPS * a
+    TDO = DPS * HP / y
+
+Bosses attack with their fast moves every `BOSS_ATTACK_DELAY` seconds on top
+of the move duration, and `y` is averaged over all the boss' movesets.
+
+Raid bosses have perfect IVs, and the CP multiplier and HP of their tier
+(`RAID_TIERS`), not the ones of a level. Gym defenders are regular pokémon
+(perfect IVs at a level) with `GYM_HP_MULTIPLIER` times their HP. `TTW`
+(time to win) is the boss' HP over the attacker's DPS, in seconds.
+"""
+
+from __future__ import print_function, division
+
+import pandas as pd
+import numpy as np
+import json
+import re
+
+from pogokit import effectiveness
+from pogokit import formulas
+
+STAB_MULTIPLIER = 1.2
+BOSS_ATTACK_DELAY = 2
+# CP multiplier and HP of raid bosses by tier.
+RAID_TIERS = {
+    1: (0.61, 600),
+    2: (0.67, 1800),
+    3: (0.73, 3600),
+    4: (0.79, 9000),
+    5: (0.79, 15000),
+}
+GYM_HP_MULTIPLIER = 2
+
+PVE_MOVE_COLUMNS = ['uniqueId', 'name', 'type', 'power', 'durationMs', 'damageWindowStartMs', 'damageWindowEndMs', 'energyDelta', 'fast']
+
+def process_pve_moves(game_master_path):
+    """Parse the `moveSettings` templates of the game master."""
+    with open(game_master_path, 'r') as f:
+        gm = json.load(f)
+    moves = []
+    for item in gm['itemTemplates']:
+        if 'moveSettings' in item:
+            ms = item['moveSettings']
+            unique_id = str(ms['movementId'])
+            id_match = re.match(r'(\w+?)(_FAST)?$', unique_id)
+            moves.append({
+                'uniqueId': unique_id,
+                'name': re.sub(r'_', ' ', id_match.group(1)).title(),
+                'type': effectiveness.type_code(ms.get('pokemonType')),
+                'power': ms.get('power', 0),
+                'durationMs': ms['durationMs'],
+                'damageWindowStartMs': ms.get('damageWindowStartMs', 0),
+                'damageWindowEndMs': ms.get('damageWindowEndMs', 0),
+                'energyDelta': ms.get('energyDelta', 0),
+                'fast': id_match.group(2) == '_FAST',
+            })
+    return pd.DataFrame(moves, columns=PVE_MOVE_COLUMNS)
+
+def expand_movesets(pok_df, moves_df):
+    """Every (pokémon, fast move, charged move) combination, as arrays of row positions."""
+    move_positions = dict(zip(moves_df['uniqueId'], range(len(moves_df))))
+    species, fast, charged = [], [], []
+    for s, (quick_moves, cinematic_moves) in enumerate(zip(pok_df['quickMoves'], pok_df['cinematicMoves'])):
+        fast_positions = [move_positions[m] for m in quick_moves if m in move_positions]
+        charged_positions = [move_positions[m] for m in cinematic_moves if m in move_positions]
+        for f in fast_positions:
+            for c in charged_positions:
+                species.append(s)
+                fast.append(f)
+                charged.append(c)
+    return np.array(species, dtype=int), np.array(fast, dtype=int), np.array(charged, dtype=int)
+
+def calc_pve_damage(power, atk, def_, multiplier):
+    """Damage of a single hit."""
+    return np.floor(0.5 * power * atk / def_ * multiplier) + 1
+
+def calc_cycle_dps(fast_dmg, fast_dur, fast_energy, charged_dmg, charged_dur, charged_energy, energy_from_damage=0):
+    """DPS of the fast/charged move cycle (durations in seconds, charged energy as a positive cost)."""
+    feps = fast_energy / fast_dur
+    ceps = charged_energy / charged_dur
+    a = np.clip((feps + energy_from_damage) / (ceps + feps), 0, 1)
+    return fast_dmg / fast_dur * (1 - a) + charged_dmg / charged_dur * a
+
+def raid_boss_stats(pok_df, boss_idxs, tier=5):
+    """Attack, defense and HP of raid bosses of a tier (see `RAID_TIERS`)."""
+    if tier not in RAID_TIERS:
+        raise ValueError('Unknown raid tier `{}`. Valid tiers: {}.'.format(tier, ', '.join(str(t) for t in sorted(RAID_TIERS))))
+    cpm, hp = RAID_TIERS[tier]
+    boss_idxs = np.asarray(boss_idxs)
+    atks = (pok_df['attack'].values[boss_idxs] + 15) * cpm
+    defs = (pok_df['defense'].values[boss_idxs] + 15) * cpm
+    return atks, defs, np.full(len(boss_idxs), hp, dtype=float)
+
+def gym_defender_stats(pok_df, boss_idxs, level=40):
+    """Attack, defense and HP of gym defenders with perfect IVs at `level`."""
+    boss_idxs = np.asarray(boss_idxs)
+    cpm = formulas.CP_MULTIPLIERS[level]
+    atks = (pok_df['attack'].values[boss_idxs] + 15) * cpm
+    defs = (pok_df['defense'].values[boss_idxs] + 15) * cpm
+    hps = GYM_HP_MULTIPLIER * formulas.calc_hp(pok_df['stamina'].values[boss_idxs] + 15, level)
+    return atks, defs, np.asarray(hps, dtype=float)
+
+def calc_raid_matrix(pok_df, moves_df, eff, boss_idxs, boss_stats, weather_types=(), level=40):
+    """DPS and TDO of every moveset (rows) against every boss (columns).
+
+    `pok_df` is the processed game master and `boss_idxs` are positions in it.
+    `boss_stats` are the bosses' attack and defense arrays (see
+    `raid_boss_stats` and `gym_defender_stats`). Attackers have perfect IVs at
+    `level`. Returns the moveset arrays (species, fast and charged move
+    positions) and the DPS and TDO matrices.
+    """
+    species, fast, charged = expand_movesets(pok_df, moves_df)
+    boss_idxs = np.asarray(boss_idxs)
+    cpm = formulas.CP_MULTIPLIERS[level]
+    atks = (pok_df['attack'].values + 15) * cpm
+    defs = (pok_df['defense'].values + 15) * cpm
+    hps = formulas.calc_hp(pok_df['stamina'].values + 15, level)
+    type1 = effectiveness.type_codes(pok_df['type'])
+    type2 = effectiveness.type_codes(pok_df['type2'])
+    boss_atks, boss_defs = boss_stats[0], boss_stats[1]
+
+    move_power = moves_df['power'].values.astype(float)
+    move_type = moves_df['type'].values.astype(int)
+    move_dur = moves_df['durationMs'].values / 1000
+    move_energy = np.abs(moves_df['energyDelta'].values.astype(float))
+    weather_m = effectiveness.weather_multiplier(move_type, weather_types)
+
+    def move_multiplier(moves, attacker_idxs, defender_idxs):
+        stab = np.where((move_type[moves] == type1[attacker_idxs]) | (move_type[moves] == type2[attacker_idxs]), STAB_MULTIPLIER, 1)
+        eff_m = effectiveness.type_multiplier(eff, move_type[moves], type1[defender_idxs], type2[defender_idxs])
+        return stab * eff_m * weather_m[moves]
+
+    # Boss DPS against each attacking species (species x boss), averaged over the boss' movesets.
+    boss_of_ms, boss_fast, boss_charged = expand_movesets(pok_df.iloc[boss_idxs], moves_df)
+    all_species = np.arange(len(pok_df))[:,np.newaxis]
+    boss_species = boss_idxs[boss_of_ms][np.newaxis,:]
+    boss_fast_dmg = calc_pve_damage(move_power[boss_fast], boss_atks[boss_of_ms], defs[all_species], move_multiplier(boss_fast, boss_species, all_species))
+    boss_charged_dmg = calc_pve_damage(move_power[boss_charged], boss_atks[boss_of_ms], defs[all_species], move_multiplier(boss_charged, boss_species, all_species))
+    boss_dps = calc_cycle_dps(
+        boss_fast_dmg, move_dur[boss_fast] + BOSS_ATTACK_DELAY, move_energy[boss_fast],
+        boss_charged_dmg, move_dur[boss_charged] + BOSS_ATTACK_DELAY, move_energy[boss_charged])
+    boss_ms_counts = np.bincount(boss_of_ms, minlength=len(boss_idxs))
+    averaging = np.zeros((len(boss_of_ms), len(boss_idxs)))
+    averaging[np.arange(len(boss_of_ms)), boss_of_ms] = 1 / boss_ms_counts[boss_of_ms]
+    y = boss_dps @ averaging
+
+    # Attacker DPS and TDO (moveset x boss).
+    rows, cols = species[:,np.newaxis], boss_idxs[np.newaxis,:]
+    fast_dmg = calc_pve_damage(move_power[fast][:,np.newaxis], atks[rows], boss_defs[np.newaxis,:], move_multiplier(fast[:,np.newaxis], rows, cols))
+    charged_dmg = calc_pve_damage(move_power[charged][:,np.newaxis], atks[rows], boss_defs[np.newaxis,:], move_multiplier(charged[:,np.newaxis], rows, cols))
+    y = y[species]
+    dps = calc_cycle_dps(
+        fast_dmg, move_dur[fast][:,np.newaxis], move_energy[fast][:,np.newaxis],
+        charged_dmg, move_dur[charged][:,np.newaxis], move_energy[charged][:,np.newaxis],
+        energy_from_damage=y/2)
+    with np.errstate(divide='ignore'):
+        tdo = dps * hps[species][:,np.newaxis] / y
+    return (species, fast, charged), dps, tdo
+
+def raid_counters(pok_df, moves_df, eff, boss_idxs, top=20, weather_types=(), level=40, tier=5, gym_level=None, chunk_size=64):
+    """Best counters for each boss by DPS³·TDO, as a long DataFrame.
+
+    Bosses are raid bosses of `tier`, or gym defenders at `gym_level` when
+    it's given. They are processed in chunks of `chunk_size` to bound memory.
+    """
+    pok_df = pok_df.reset_index(drop=True)
+    boss_idxs = np.asarray(boss_idxs)
+    if gym_level is None:
+        boss_atks, boss_defs, boss_hps = raid_boss_stats(pok_df, boss_idxs, tier=tier)
+    else:
+        boss_atks, boss_defs, boss_hps = gym_defender_stats(pok_df, boss_idxs, level=gym_level)
+    tables = []
+    for start in range(0, len(boss_idxs), chunk_size):
+        chunk = slice(start, start+chunk_size)
+        chunk_idxs = boss_idxs[chunk]
+        (species, fast, charged), dps, tdo = calc_raid_matrix(pok_df, moves_df, eff, chunk_idxs,
+            (boss_atks[chunk], boss_defs[chunk]), weather_types=weather_types, level=level)
+        er = dps**3 * tdo
+        n = min(top, len(species))
+        best = np.argsort(-er, axis=0, kind='stable')[:n]
+        for b, boss_idx in enumerate(chunk_idxs):
+            rows = best[:,b]
+            tables.append(pd.DataFrame({
+                'boss': pok_df['complete_name'].values[boss_idx],
+                'rank': np.arange(1, n+1),
+                'name': pok_df['complete_name'].values[species[rows]],
+                'fast_name': moves_df['name'].values[fast[rows]],
+                'charged_name': moves_df['name'].values[charged[rows]],
+                'DPS': dps[rows,b],
+                'TDO': tdo[rows,b],
+                'DPS3TDO': er[rows,b],
+                'TTW': boss_hps[start+b] / dps[rows,b],
+            }))
+    return pd.concat(tables, ignore_index=True)
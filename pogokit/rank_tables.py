@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Persisted league rank tables.
+
+For every species, league and IV spread we store the league level, CP, stat
+product and rank in a single binary file, built once per game master version.
+The file layout is:
+
+ - 8 bytes of magic (`MAGIC`);
+ - an unsigned 64 bit little endian integer with the size of the header;
+ - the header, as JSON (game master hash, leagues, number of entries, etc);
+ - the species index, an array of `INDEX_DTYPE` (name and record offset);
+ - padding up to a multiple of `ALIGNMENT`;
+ - the records, an array of `RECORD_DTYPE` with shape (species, leagues, 4096).
+
+The records are memory-mapped when the file is opened, so reading a species'
+slice copies nothing.
+"""
+
+from __future__ import print_function, division
+
+import numpy as np
+import struct
+import json
+import sys
+import os
+
+from pogokit import formulas
+from pogokit import parallel
+from pogokit import data
+
+MAGIC = b'POGORNK1'
+ALIGNMENT = 64
+N_IVS = 16**3
+
+INDEX_DTYPE = np.dtype([
+    ('name', 'S48'),
+    ('offset', '<i8'),
+])
+
+RECORD_DTYPE = np.dtype([
+    ('level', '<f4'),
+    ('cp', '<u2'),
+    ('rank', '<u2'),
+    ('stat_product', '<f4'),
+])
+
+def default_rank_tables_path(data_dir, game_master_hash):
+    return os.path.join(data_dir, 'rank_tables_{}.bin'.format(game_master_hash[:16]))
+
+def species_rank_records(attack, defense, stamina, league_caps=formulas.LEAGUE_CAPS):
+    """Records of a single species, with shape (leagues, 4096)."""
+    records = np.zeros((len(league_caps), N_IVS), dtype=RECORD_DTYPE)
+    tables = formulas.calc_iv_rank_table(attack, defense, stamina, league_caps=league_caps)
+    for l, (league, _) in enumerate(league_caps):
+        table = tables[league]
+        records[l]['level'] = table['levels']
+        records[l]['cp'] = table['cps']
+        records[l]['rank'] = table['ranks']
+        records[l]['stat_product'] = table['stat_products']
+    return records
+
+def species_rank_records_kernel(arrays, league_caps):
+    """`parallel` kernel: records of a shard of species."""
+    for s in range(len(arrays['records'])):
+        arrays['records'][s] = species_rank_records(arrays['attack'][s], arrays['defense'][s], arrays['stamina'][s], league_caps=league_caps)
+
+def build_rank_tables(pok_df, path, game_master_hash, league_caps=formulas.LEAGUE_CAPS, jobs=1):
+    """Compute the rank tables of every species in `pok_df` and save them to `path`.
+
+    Species are indexed by their complete name and, when it's not ambiguous, by
+    their plain name too (e.g. "Raichu Alola" and "Raichu"). With `jobs` above
+    1 the species are split across that many processes.
+    """
+    species_df = pok_df.drop_duplicates(subset='complete_name')
+    index = []
+    for s, complete_name in enumerate(species_df['complete_name']):
+        index.append((complete_name.title(), s))
+    complete_names = set(name for name, _ in index)
+    plain_names = {}
+    for s, name in enumerate(species_df['name']):
+        plain_names.setdefault(name.title(), s)
+    for name, s in plain_names.items():
+        if name not in complete_names:
+            index.append((name, s))
+    index = np.array([(name.encode('utf-8'), s * len(league_caps) * N_IVS) for name, s in index], dtype=INDEX_DTYPE)
+
+    header = json.dumps({
+        'game_master': game_master_hash,
+        'leagues': [list(league) for league in league_caps],
+        'n_species': len(species_df),
+        'n_index': len(index),
+    }).encode('utf-8')
+    index_offset = len(MAGIC) + 8 + len(header)
+    data_offset = index_offset + index.nbytes
+    data_offset += -data_offset % ALIGNMENT
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.write(index.tobytes())
+        f.write(b'\0' * (data_offset - index_offset - index.nbytes))
+        if jobs <= 1:
+            for s, pok in enumerate(species_df.itertuples()):
+                f.write(species_rank_records(pok.attack, pok.defense, pok.stamina, league_caps=league_caps).tobytes())
+                print('INFO: {} of {}.\r'.format(s+1, len(species_df)), end='', file=sys.stderr)
+            print(file=sys.stderr)
+        else:
+            with parallel.SharedArrays() as shared:
+                for col in ['attack', 'defense', 'stamina']:
+                    shared.share(col, species_df[col].values)
+                shared.empty('records', (len(species_df), len(league_caps), N_IVS), RECORD_DTYPE)
+                parallel.map_shards(species_rank_records_kernel, shared, len(species_df), jobs=jobs, league_caps=league_caps)
+                # Written straight from shared memory.
+                shared['records'].tofile(f)
+    os.replace(tmp_path, path)
+
+def open_rank_tables(path):
+    """Memory-map a rank tables file.
+
+    Returns a dict with the `header`, the `index` (name to record offset) and the
+    flat memory-mapped `records`.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('`{}` is not a rank tables file.'.format(path))
+        header_size, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_size).decode('utf-8'))
+        index = np.frombuffer(f.read(header['n_index'] * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+    index_offset = len(MAGIC) + 8 + header_size
+    data_offset = index_offset + index.nbytes
+    data_offset += -data_offset % ALIGNMENT
+    n_records = header['n_species'] * len(header['leagues']) * N_IVS
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=data_offset, shape=(n_records,))
+    return {
+        'header': header,
+        'leagues': [league for league, _ in header['leagues']],
+        'index': dict(zip((name.decode('utf-8') for name in index['name']), index['offset'].tolist())),
+        'records': records,
+    }
+
+def get_rank_tables(pok_df, game_master_path, data_dir, jobs=1):
+    """Open the rank tables for a game master, building them first if needed."""
+    gm_hash = data.game_master_hash(game_master_path)
+    path = default_rank_tables_path(data_dir, gm_hash)
+    if not os.path.isfile(path):
+        if not os.path.isdir(data_dir):
+            os.makedirs(data_dir)
+        print('INFO: Building rank tables at `{}`.'.format(path), file=sys.stderr)
+        build_rank_tables(pok_df, path, gm_hash, jobs=jobs)
+    return open_rank_tables(path)
+
+def lookup_species(tables, name, league=None):
+    """Records of a species (a view on the memory-map, nothing is copied).
+
+    The result has shape (leagues, 4096), or (4096,) when `league` is given.
+    Index the IV spreads with `formulas.iv_index`.
+    """
+    offset = tables['index'][name.title()]
+    n_leagues = len(tables['leagues'])
+    species_records = tables['records'][offset:offset + n_leagues * N_IVS].reshape(n_leagues, N_IVS)
+    if league is not None:
+        return species_records[tables['leagues'].index(league)]
+    return species_records
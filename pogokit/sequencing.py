@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Charged move sequencing for PvP.
+
+Given an attacker's fast move and (up to two) charged moves, the damage they
+do to a defender and the defender's HP and shields, find the throw sequence
+that faints the defender in the fewest turns. That's the same as maximizing
+the damage dealt in any given time, and it captures the decisions that the
+blended PPT ignores: which charged move to throw, when to bait shields with a
+cheap move and when to keep farming energy (up to the `MAX_ENERGY` cap).
+
+The defender shields the first charged moves it's hit with, while it has
+shields. Charged moves pause the game, so only fast move turns count.
+
+The state is (energy, defender HP, shields), and every action takes at least
+1 HP, so a memoized search over the states reachable from the start is exact
+(`Sequencer`). Solutions are memoized by the move parameters too, so pairs
+that share them only solve each distinct problem once.
+
+For whole-league runs, `batch_turns_to_faint` finds the turns (not the
+sequences) of many pairs at once. As only fast moves take time, it's the
+same DP with the HP folded into the value: the most damage that can be done
+with `n` fast moves, for every (energy, shields) state, over n = 1, 2, ...
+until it reaches the defender's HP.
+"""
+
+from __future__ import print_function, division
+
+import numpy as np
+import sys
+
+MAX_ENERGY = 100
+SHIELDED_DAMAGE = 1
+PVP_DAMAGE_BONUS = 1.3
+FAST = -1
+
+def calc_pvp_damage(power, atk, def_, multiplier):
+    """Damage of a single PvP hit (multiplier includes STAB and effectiveness)."""
+    return (np.floor(0.5 * power * atk / def_ * multiplier * PVP_DAMAGE_BONUS) + 1).astype(int)
+
+class Sequencer(object):
+    """Memoized solver. Reuse a single instance for many attacker/defender pairs."""
+
+    def __init__(self):
+        self.solutions = {}
+        self.n_states = 0
+
+    def solve(self, fast_damage, fast_turns, fast_energy, charged, hp, shields=0):
+        """Fewest turns to faint the defender, and the action sequence.
+
+        `charged` is a list of (damage, energy cost) pairs. Actions in the
+        sequence are `FAST` or positions in `charged`.
+        """
+        fast_energy = int(min(fast_energy, MAX_ENERGY))
+        charged = tuple((int(damage), max(int(abs(cost)), 1)) for damage, cost in charged)
+        key = (int(fast_damage), int(fast_turns), fast_energy, charged)
+        memo = self.solutions.setdefault(key, {})
+
+        def best(energy, hp, shields):
+            state = (energy, hp, shields)
+            if state in memo:
+                return memo[state]
+            # Fast move.
+            turns = fast_turns + (best(min(energy + fast_energy, MAX_ENERGY), hp - fast_damage, shields)[0] if hp > fast_damage else 0)
+            choice = (turns, FAST)
+            for c, (damage, cost) in enumerate(charged):
+                if energy < cost:
+                    continue
+                if shields > 0:
+                    next_state = (energy - cost, hp - SHIELDED_DAMAGE, shields - 1)
+                else:
+                    next_state = (energy - cost, hp - damage, 0)
+                turns = best(*next_state)[0] if next_state[1] > 0 else 0
+                # Ties go to the cheapest option that was found first (fast moves first).
+                if turns < choice[0]:
+                    choice = (turns, c)
+            memo[state] = choice
+            self.n_states += 1
+            return choice
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 4 * (hp + 100)))
+        try:
+            turns, _ = best(0, hp, shields)
+        finally:
+            sys.setrecursionlimit(limit)
+
+        sequence = []
+        energy, hp_left, shields_left = 0, hp, shields
+        while hp_left > 0:
+            action = memo[(energy, hp_left, shields_left)][1]
+            sequence.append(action)
+            if action == FAST:
+                energy, hp_left = min(energy + fast_energy, MAX_ENERGY), hp_left - fast_damage
+            elif shields_left > 0:
+                energy, hp_left, shields_left = energy - charged[action][1], hp_left - SHIELDED_DAMAGE, shields_left - 1
+            else:
+                energy, hp_left = energy - charged[action][1], hp_left - charged[action][0]
+        return turns, sequence
+
+def batch_turns_to_faint(fast_damage, fast_turns, fast_energy, charged_damage, charged_cost, hp, shields=0):
+    """Fewest turns to faint the defender for many attacker/defender pairs at once.
+
+    Fast move arguments and `hp` are arrays with one value per pair, charged
+    move ones have shape (pairs, charged moves). Use a cost above `MAX_ENERGY`
+    to pad pairs with fewer charged moves.
+    """
+    fast_damage = np.asarray(fast_damage, dtype=float)
+    fast_energy = np.minimum(np.asarray(fast_energy, dtype=int), MAX_ENERGY)
+    charged_damage = np.asarray(charged_damage, dtype=float)
+    # Free charged moves would be thrown forever.
+    charged_cost = np.maximum(np.abs(np.asarray(charged_cost, dtype=int)), 1)
+    n_pairs, n_charged = charged_damage.shape
+    hp = np.broadcast_to(np.asarray(hp, dtype=float), (n_pairs,))
+    if n_pairs == 0:
+        return np.zeros(0, dtype=int)
+
+    # Most damage done so far, by (pair, shields left, energy). Unreachable states are -inf.
+    damage = np.full((n_pairs, shields + 1, MAX_ENERGY + 1), -np.inf)
+    damage[:, shields, 0] = 0
+    n_fast = np.zeros(n_pairs, dtype=int)
+    active = np.arange(n_pairs)
+    # Longest chain of charged moves that can be thrown in a row.
+    max_throws = MAX_ENERGY // charged_cost.min() + 1 if n_charged else 0
+    while len(active) > 0:
+        d = damage[active]
+        # One more fast move, overflowing energy is lost.
+        d = shift_energies(d, fast_energy[active], overflow=True) + fast_damage[active][:,np.newaxis,np.newaxis]
+        n_fast[active] += 1
+        # Then any number of charged moves: relax single throws until nothing improves.
+        for _ in range(max_throws):
+            changed = False
+            for c in range(n_charged):
+                thrown = shift_energies(d, -charged_cost[active,c])
+                for s in range(shields, -1, -1):
+                    hit = SHIELDED_DAMAGE if s > 0 else charged_damage[active,c][:,np.newaxis]
+                    candidate = thrown[:,s] + hit
+                    target = d[:,max(s - 1, 0)]
+                    if (candidate > target).any():
+                        np.maximum(target, candidate, out=target)
+                        changed = True
+            if not changed:
+                break
+        damage[active] = d
+        done = d.reshape(len(active), -1).max(axis=1) >= hp[active]
+        active = active[~done]
+    return n_fast * np.asarray(fast_turns)
+
+def shift_energies(d, shifts, overflow=False):
+    """States (pairs, shields, energy) after changing each pair's energy by `shifts`.
+
+    Energy that would go below 0 is unreachable. Above `MAX_ENERGY` it's
+    unreachable too, unless `overflow`, where it's capped instead.
+    """
+    shifted = np.full_like(d, -np.inf)
+    # Pairs sharing a shift are moved with a single slice.
+    for shift in np.unique(shifts):
+        rows = np.flatnonzero(shifts == shift)
+        if abs(shift) > MAX_ENERGY:
+            continue
+        if shift >= 0:
+            shifted[rows,:,shift:] = d[rows,:,:MAX_ENERGY+1-shift]
+            if overflow and shift > 0:
+                shifted[rows,:,MAX_ENERGY] = d[rows,:,MAX_ENERGY-shift:].max(axis=2)
+        else:
+            shifted[rows,:,:MAX_ENERGY+1+shift] = d[rows,:,-shift:]
+    return shifted
+
+def compress_sequence(sequence, names):
+    """Readable sequence, e.g. "3x Counter, Ice Punch, 5x Counter, Dynamic Punch"."""
+    parts = []
+    for action in sequence:
+        name = names[action]
+        if parts and parts[-1][0] == name:
+            parts[-1][1] += 1
+        else:
+            parts.append([name, 1])
+    return ', '.join(name if n == 1 else '{}x {}'.format(n, name) for name, n in parts)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+"Plays like X": nearest neighbours in stat space.
+
+Every moveset of the moveset table (see `pogo.build_mon_table`) is a point
+with its league level attack, defense and HP plus its move profile (fast
+move PPT and EPT, charged move PPE, with STAB). Features are standardized and
+optionally weighted, so distances are in standard deviations.
+
+The pokémon's typing is one more feature: one column per type, set to
+`TYPING_WEIGHT` for its types. Two pokémon with no type in common are then
+up to 1 standard deviation further apart (two single types are 0.71 apart).
+
+The index (`MovesetIndex`) is built once per table and league. With a few
+thousand movesets in 24 dimensions, a single vectorized scan (with the squared
+norms precomputed) answers a query in about 0.14 ms, which is faster than
+walking a KD-tree from Python. Queries can be restricted to movesets of some
+types, each type filter keeping its own subset of the matrix.
+
+`all_pairs` gives the distance matrix between many movesets at once (e.g.
+one per meta species), for clustering.
+"""
+
+from __future__ import print_function, division
+
+import numpy as np
+
+from pogokit import effectiveness
+from pogokit import meta
+
+FEATURES = ['atk', 'def', 'hp', 'fast_PPT', 'fast_EPT', 'charge_PPE']
+TYPING_WEIGHT = 0.5
+
+def typing_features(type1, type2, weight=TYPING_WEIGHT):
+    """One column per type, `weight` for the pokémon's types and 0 for the others."""
+    one_hot = np.zeros((len(type1), len(effectiveness.TYPES) + 1))
+    one_hot[np.arange(len(type1)), type1] = weight
+    one_hot[np.arange(len(type2)), type2] = weight
+    return one_hot[:,:len(effectiveness.TYPES)]
+
+def moveset_features(mon_table, league, weights=None, typing_weight=TYPING_WEIGHT):
+    """Standardized (and weighted) feature matrix of the moveset table at a league.
+
+    `weights` apply to `FEATURES`, the typing columns come after them.
+    """
+    a = meta.moveset_arrays(mon_table, league)
+    features = np.column_stack([
+        a['atk'], a['def'], a['hp'],
+        a['fast_ppt'] * a['fast_stab'], a['fast_ept'],
+        a['charge_ppe'] * a['charge_stab'],
+    ]).astype(float)
+    # Movesets with unknown moves get the mean (0 once standardized).
+    features = np.where(np.isnan(features), np.nanmean(features, axis=0), features)
+    std = features.std(axis=0)
+    features = (features - features.mean(axis=0)) / np.where(std > 0, std, 1)
+    if weights is not None:
+        features = features * np.asarray(weights, dtype=float)
+    return np.hstack([features, typing_features(a['type1'], a['type2'], weight=typing_weight)])
+
+def type_mask(mon_table, types):
+    """Movesets of pokémon with any of `types` (names, e.g. "Water")."""
+    unknown = [t for t in types if 'POKEMON_TYPE_' + t.upper() not in effectiveness.TYPE_CODES]
+    if unknown:
+        raise ValueError('Unknown types: {}.'.format(', '.join(unknown)))
+    codes = effectiveness.type_codes(['POKEMON_TYPE_' + t.upper() for t in types])
+    return np.isin(effectiveness.type_codes(mon_table['type']), codes) | np.isin(effectiveness.type_codes(mon_table['type2']), codes)
+
+class MovesetIndex(object):
+    """Nearest movesets of a table, optionally filtered by type."""
+
+    def __init__(self, mon_table, league, weights=None):
+        self.mon_table = mon_table
+        self.features = moveset_features(mon_table, league, weights=weights)
+        self.subsets = {}
+
+    def subset(self, types=None):
+        """Rows with any of `types` (all rows by default), their features and squared norms."""
+        key = tuple(sorted(t.upper() for t in types)) if types else None
+        if key not in self.subsets:
+            rows = np.flatnonzero(type_mask(self.mon_table, types)) if types else np.arange(len(self.features))
+            features = np.ascontiguousarray(self.features[rows])
+            self.subsets[key] = (rows, features, (features**2).sum(axis=1))
+        return self.subsets[key]
+
+    def query(self, row, k=10, types=None, exclude=None):
+        """The `k` movesets closest to moveset `row` (closest first) and their distances.
+
+        `exclude` (boolean, one value per row of the table) skips rows, e.g.
+        the movesets of the query's own species.
+        """
+        rows, features, sq_norms = self.subset(types)
+        point = self.features[row]
+        dist2 = sq_norms - 2 * features @ point + point @ point
+        if exclude is not None:
+            dist2[exclude[rows]] = np.inf
+        k = min(k, int(np.isfinite(dist2).sum()))
+        nearest = np.argpartition(dist2, k - 1)[:k] if k > 0 else np.zeros(0, dtype=int)
+        nearest = nearest[np.argsort(dist2[nearest])]
+        # Exact distances for the few that are returned (the expansion above loses precision near 0).
+        return rows[nearest], np.sqrt(((features[nearest] - point)**2).sum(axis=1))
+
+def all_pairs(features, rows=None, chunk_size=1024):
+    """Distance matrix between the given rows (all by default), computed in chunks of rows."""
+    points = features if rows is None else features[rows]
+    sq_norms = (points**2).sum(axis=1)
+    distances = np.empty((len(points), len(points)), dtype=np.float32)
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start:start+chunk_size]
+        dist2 = sq_norms[start:start+chunk_size,np.newaxis] + sq_norms[np.newaxis,:] - 2 * chunk @ points.T
+        distances[start:start+chunk_size] = np.sqrt(np.maximum(dist2, 0))
+    return distances
@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lightweight core tables backed by NumPy structured arrays.
+
+`MoveTable` and `SpeciesTable` hold the same data as the DataFrames from
+`pogo.process_game_master`, but with integer coded types (see
+`pogokit.effectiveness`) and the species' moves as indices into the move
+tables. `PairTable` holds the metrics of every fast/charged move pair.
+
+The hot computations (move stats, moveset expansion, league levels and
+TDOs) run directly on them. This module only imports pandas to convert to
+and from DataFrames, so it can be used without it. The `pogo` command line
+still imports pandas on startup, since most of its commands print
+DataFrames.
+"""
+
+from __future__ import print_function, division
+
+import numpy as np
+import json
+import re
+
+from pogokit import effectiveness
+from pogokit import formulas
+
+STAB_MULTIPLIER = 1.2
+
+MOVE_DTYPE = np.dtype([
+    ('uniqueId', 'U48'),
+    ('name', 'U48'),
+    ('type', 'i1'),
+    ('power', 'f8'),
+    ('energyDelta', 'i4'),
+    ('durationTurns', 'i4'),
+    ('PPT', 'f8'),
+    ('EPT', 'f8'),
+    ('ZEPDOOS', 'f8'),
+    ('PP100E', 'i4'),
+    ('PPE', 'f8'),
+])
+
+SPECIES_DTYPE = np.dtype([
+    ('dex', 'i4'),
+    ('pokemonId', 'U48'),
+    ('complete_name', 'U48'),
+    ('name', 'U48'),
+    ('form', 'U48'),
+    ('type', 'i1'),
+    ('type2', 'i1'),
+    ('stamina', 'i4'),
+    ('attack', 'i4'),
+    ('defense', 'i4'),
+])
+
+TYPE_TEMPLATE_IDS = np.array(['POKEMON_TYPE_' + t.upper() for t in effectiveness.TYPES] + [None], dtype=object)
+TYPE_NAMES = np.array(effectiveness.TYPES + [None], dtype=object)
+
+class MoveTable(object):
+    """Fast or charged moves, with their derived PvP stats."""
+
+    def __init__(self, records):
+        self.records = records
+        self.index = dict((unique_id, i) for i, unique_id in enumerate(records['uniqueId']))
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def from_dicts(cls, moves):
+        records = np.zeros(len(moves), dtype=MOVE_DTYPE)
+        for field in ['uniqueId', 'name', 'power', 'energyDelta']:
+            records[field] = [m[field] for m in moves]
+        records['type'] = effectiveness.type_codes([m['type'] for m in moves])
+        records['durationTurns'] = [m.get('durationTurns', 1) for m in moves]
+        return cls(records)
+
+    @classmethod
+    def from_frame(cls, df):
+        moves = df.to_dict('records')
+        return cls.from_dicts(moves)
+
+    def to_frame(self, columns=None):
+        import pandas as pd
+        df = pd.DataFrame(dict((field, self.records[field]) for field in MOVE_DTYPE.names), columns=list(MOVE_DTYPE.names))
+        df['type_name'] = TYPE_NAMES[self.records['type']]
+        df['type'] = TYPE_TEMPLATE_IDS[self.records['type']]
+        return df[columns] if columns is not None else df
+
+    def lookup(self, unique_ids):
+        """Positions of moves by unique id (-1 for unknown moves)."""
+        return np.array([self.index.get(unique_id, -1) for unique_id in unique_ids], dtype=int)
+
+    def calc_fast_stats(self, zepdoos_c=formulas.ZEPDOOS_C):
+        r = self.records
+        r['PPT'] = r['power'] / r['durationTurns']
+        r['EPT'] = r['energyDelta'] / r['durationTurns']
+        r['ZEPDOOS'] = formulas.calc_zepdoos_score(r['PPT'], r['EPT'], zepdoos_c=zepdoos_c)
+        return self
+
+    def calc_charged_stats(self):
+        r = self.records
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r['PPE'] = r['power'] / np.abs(r['energyDelta'])
+            r['PP100E'] = np.floor(r['PPE'] * 100)
+        return self
+
+class PairTable(object):
+    """Metrics of every (fast move, charged move) pair, as (fast, charged) matrices.
+
+    They only depend on the moves, so they're computed once per game master
+    and gathered for every moveset, with the species' stats and STAB applied
+    on top:
+
+     - `charged_PPT`: damage per turn of the charged move, the energy of the
+       fast move turned into charged move damage (EPT * PPE).
+     - `PPT`: blended damage per turn (fast PPT + EPT * PPE), without STAB.
+     - `fast_moves_to_charge`, `turns_to_charge`: fast moves and turns until
+       the first charged move can be thrown (inf if the fast move gives no
+       energy).
+     - `energy_overflow`: energy left over when it's thrown.
+    """
+
+    def __init__(self, fast_table, charged_table):
+        self.fast_table = fast_table
+        self.charged_table = charged_table
+        f = fast_table.records[:,np.newaxis]
+        c = charged_table.records[np.newaxis,:]
+        cost = np.abs(c['energyDelta']).astype(float)
+        self.charged_PPT = f['EPT'] * c['PPE']
+        self.PPT = f['PPT'] + self.charged_PPT
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.fast_moves_to_charge = np.where(f['energyDelta'] > 0, np.ceil(cost / f['energyDelta']), np.inf)
+        self.turns_to_charge = self.fast_moves_to_charge * f['durationTurns']
+        with np.errstate(invalid='ignore'):
+            self.energy_overflow = np.where(np.isfinite(self.fast_moves_to_charge),
+                self.fast_moves_to_charge * f['energyDelta'] - cost, np.nan)
+
+    def gather(self, field, fast, charged, missing=np.nan):
+        """`field` of the pairs of moves at positions `fast` and `charged`, `missing` where either is -1."""
+        values = getattr(self, field)[fast, charged]
+        return np.where((fast >= 0) & (charged >= 0), values, missing)
+
+class SpeciesTable(object):
+    """Pokémon (one row per form) with their moves as indices into the move tables.
+
+    The fast moves of species `s` are `fast_moves[fast_offsets[s]:fast_offsets[s+1]]`
+    (-1 for moves missing from the fast move table, whose unique ids are still
+    in `fast_move_ids`), and likewise for charged moves.
+    """
+
+    def __init__(self, records, fast_move_ids, fast_moves, fast_offsets, charged_move_ids, charged_moves, charged_offsets):
+        self.records = records
+        self.fast_move_ids = fast_move_ids
+        self.fast_moves = fast_moves
+        self.fast_offsets = fast_offsets
+        self.charged_move_ids = charged_move_ids
+        self.charged_moves = charged_moves
+        self.charged_offsets = charged_offsets
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def from_dicts(cls, pokemons, fast_table, charged_table):
+        records = np.zeros(len(pokemons), dtype=SPECIES_DTYPE)
+        for field in ['dex', 'pokemonId', 'complete_name', 'name', 'stamina', 'attack', 'defense']:
+            records[field] = [p[field] for p in pokemons]
+        records['form'] = [p['form'] or '' for p in pokemons]
+        records['type'] = effectiveness.type_codes([p['type'] for p in pokemons])
+        records['type2'] = effectiveness.type_codes([p['type2'] for p in pokemons])
+        fast_move_ids = [m for p in pokemons for m in p['quickMoves']]
+        charged_move_ids = [m for p in pokemons for m in p['cinematicMoves']]
+        fast_offsets = np.concatenate([[0], np.cumsum([len(p['quickMoves']) for p in pokemons])]).astype(int)
+        charged_offsets = np.concatenate([[0], np.cumsum([len(p['cinematicMoves']) for p in pokemons])]).astype(int)
+        return cls(records,
+            np.array(fast_move_ids, dtype='U48'), fast_table.lookup(fast_move_ids), fast_offsets,
+            np.array(charged_move_ids, dtype='U48'), charged_table.lookup(charged_move_ids), charged_offsets)
+
+    @classmethod
+    def from_frame(cls, df, fast_table, charged_table):
+        pokemons = df.to_dict('records')
+        for p in pokemons:
+            for field in ['form', 'type2']:
+                if p[field] != p[field]:
+                    p[field] = None
+        return cls.from_dicts(pokemons, fast_table, charged_table)
+
+    def to_frame(self):
+        import pandas as pd
+        r = self.records
+        return pd.DataFrame({
+            'dex': r['dex'],
+            'pokemonId': r['pokemonId'],
+            'complete_name': r['complete_name'],
+            'name': r['name'],
+            'form': np.where(r['form'] == '', None, r['form'].astype(object)),
+            'type': TYPE_TEMPLATE_IDS[r['type']],
+            'type2': TYPE_TEMPLATE_IDS[r['type2']],
+            'stamina': r['stamina'],
+            'attack': r['attack'],
+            'defense': r['defense'],
+            'quickMoves': [list(self.fast_move_ids[a:b]) for a, b in zip(self.fast_offsets[:-1], self.fast_offsets[1:])],
+            'cinematicMoves': [list(self.charged_move_ids[a:b]) for a, b in zip(self.charged_offsets[:-1], self.charged_offsets[1:])],
+        })
+
+    def expand_movesets(self):
+        """Every (species, fast move, charged move) combination, fast moves first.
+
+        Returns three arrays of positions: species, and fast and charged moves
+        in `fast_moves`/`charged_moves` (not in the move tables).
+        """
+        n_fast = np.diff(self.fast_offsets)
+        n_charged = np.diff(self.charged_offsets)
+        counts = n_fast * n_charged
+        species = np.repeat(np.arange(len(self.records)), counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(int)
+        k = np.arange(counts.sum()) - np.repeat(starts, counts)
+        n_charged_rows = n_charged[species]
+        fast = self.fast_offsets[species] + k // n_charged_rows
+        charged = self.charged_offsets[species] + k % n_charged_rows
+        return species, fast, charged
+
+def load_game_master_tables(game_master_path):
+    """Parse the game master straight into core tables (fast moves, charged moves and species).
+
+    Same data and filtering as `pogo.process_game_master`, without pandas.
+    """
+    with open(game_master_path, 'r') as f:
+        gm = json.load(f)
+
+    fast_moves, charged_moves, pokemons = [], [], []
+    for item in gm['itemTemplates']:
+        if 'combatMove' in item:
+            cm = item['combatMove']
+            id_match = re.match(r'(\w+?)(_FAST)?$', cm['uniqueId'])
+            move = {
+                'uniqueId': cm['uniqueId'],
+                'name': re.sub(r'_', ' ', id_match.group(1)).title(),
+                'type': cm['type'],
+                'power': cm.get('power', 0),
+                'energyDelta': cm.get('energyDelta', 0),
+            }
+            if id_match.group(2) == '_FAST':
+                move['durationTurns'] = cm.get('durationTurns', 1)
+                fast_moves.append(move)
+            else:
+                charged_moves.append(move)
+        elif 'pokemonSettings' in item:
+            pok = item['pokemonSettings']
+            template_match = re.match(r'V(\d+)_POKEMON_(\w+)$', item['templateId'])
+            pokemons.append({
+                'dex': int(template_match.group(1)),
+                'pokemonId': pok['pokemonId'],
+                'complete_name': re.sub(r'_', ' ', template_match.group(2)).title(),
+                'name': re.sub(r'_', ' ', pok['pokemonId']).title(),
+                'form': pok.get('form'),
+                'type': pok['type'],
+                'type2': pok.get('type2'),
+                'quickMoves': pok['quickMoves'],
+                'cinematicMoves': pok['cinematicMoves'],
+                'stamina': pok['stats']['baseStamina'],
+                'attack': pok['stats']['baseAttack'],
+                'defense': pok['stats']['baseDefense'],
+            })
+
+    # Filter entries for pokémon which have form.
+    dex_has_forms = set(p['dex'] for p in pokemons if p['form'] is not None)
+    pokemons = [p for p in pokemons if p['form'] is not None or p['dex'] not in dex_has_forms]
+
+    fast_table = MoveTable.from_dicts(fast_moves).calc_fast_stats()
+    charged_table = MoveTable.from_dicts(charged_moves).calc_charged_stats()
+    species_table = SpeciesTable.from_dicts(pokemons, fast_table, charged_table)
+    return fast_table, charged_table, species_table
+
+def gather(records, field, idxs, missing):
+    """`records[field][idxs]`, with `missing` where the index is -1."""
+    values = records[field][idxs]
+    return np.where(idxs >= 0, values, missing)
+
+def calc_mon_table(species_table, fast_table, charged_table, league_caps=formulas.LEAGUE_CAPS, pair_table=None, variant='normal'):
+    """Columns of the moveset table (see `pogo.build_mon_table`) as a dict of arrays.
+
+    Movesets are kept as positions (`species`, `fast_slot` and `charged_slot`
+    in the species table, `fast` and `charged` in the move tables) instead of
+    repeating their data on every row. Move pair metrics are gathered from
+    `pair_table` (computed when not given).
+    """
+    if pair_table is None:
+        pair_table = PairTable(fast_table, charged_table)
+    columns = calc_moveset_columns(species_table, fast_table, charged_table)
+    columns.update(calc_variant_columns(columns, species_table, pair_table, variant=variant, league_caps=league_caps))
+    return columns
+
+def calc_moveset_columns(species_table, fast_table, charged_table):
+    """Movesets (as positions) and their STAB multipliers: the columns of `calc_mon_table` shared by every variant."""
+    species, fast_slot, charged_slot = species_table.expand_movesets()
+    fast, charged = species_table.fast_moves[fast_slot], species_table.charged_moves[charged_slot]
+    r = species_table.records
+    fast_type = gather(fast_table.records, 'type', fast, -1)
+    charged_type = gather(charged_table.records, 'type', charged, -1)
+    type1, type2 = r['type'][species], r['type2'][species]
+    fast_stab_m = np.where((type1 == fast_type) | (type2 == fast_type), STAB_MULTIPLIER, 1)
+    charge_stab_m = np.where((type1 == charged_type) | (type2 == charged_type), STAB_MULTIPLIER, 1)
+    return {
+        'species': species,
+        'fast_slot': fast_slot,
+        'charged_slot': charged_slot,
+        'fast': fast,
+        'charged': charged,
+        'fast_stab_m': fast_stab_m,
+        'charge_stab_m': charge_stab_m,
+    }
+
+def calc_variant_columns(columns, species_table, pair_table, variant='normal', league_caps=formulas.LEAGUE_CAPS):
+    """League levels, CPs and TDOs of a variant (see `formulas.VARIANTS`) of the movesets in `columns`.
+
+    The variant is applied to the base stats of the species table while the
+    levels and TDOs are computed, so its rows are never materialized: the
+    result only has the `<league>_lvl`, `<league>_cp`, `<league>_tdo` and
+    `lvl1_tdo` columns, in the same order as `columns`.
+    """
+    v = formulas.VARIANTS[variant]
+    species, fast, charged = columns['species'], columns['fast'], columns['charged']
+    fast_stab_m, charge_stab_m = columns['fast_stab_m'], columns['charge_stab_m']
+    fast_ppt = gather(pair_table.fast_table.records, 'PPT', fast, np.nan)
+    charged_ppt = pair_table.gather('charged_PPT', fast, charged)
+    r = species_table.records
+    attack = r['attack'].astype(float) + v['iv_bonus']
+    defense = r['defense'].astype(float) + v['iv_bonus']
+    stamina = r['stamina'].astype(float) + v['iv_bonus']
+
+    variant_columns = {}
+    # League levels only depend on the species, so they are found once per species and gathered.
+    league_d = formulas.find_league_pokemon(attack, defense, stamina, league_caps=league_caps, level_boost=v['level_boost'])
+    # Battle multipliers don't change the CP, so they're applied after finding the levels.
+    attack, defense, stamina = attack[species] * v['attack_mult'], defense[species] * v['defense_mult'], stamina[species]
+    for league, _ in league_caps:
+        x = league.lower()
+        cpms = league_d[league]['cpms'][species]
+        variant_columns[x+'_lvl'] = league_d[league]['levels'][species]
+        variant_columns[x+'_cp'] = league_d[league]['cps'][species]
+        variant_columns[x+'_tdo'] = formulas.calc_pokemon_pair_tdo_ref(
+            attack*cpms, defense*cpms, np.floor(stamina*cpms),
+            fast_ppt, charged_ppt, fast_mult=fast_stab_m, charge_mult=charge_stab_m)
+    cpm_lvl1 = formulas.boosted_cpm(1, v['level_boost'])
+    variant_columns['lvl1_tdo'] = formulas.calc_pokemon_pair_tdo_ref(
+        attack*cpm_lvl1, defense*cpm_lvl1, np.floor(stamina*cpm_lvl1),
+        fast_ppt, charged_ppt, fast_mult=fast_stab_m, charge_mult=charge_stab_m)
+    return variant_columns
+
+def mon_table_to_frame(columns, species_table, fast_table, charged_table, league_caps=formulas.LEAGUE_CAPS):
+    """DataFrame version of `calc_mon_table`'s result, as used by the CLI."""
+    import pandas as pd
+    species, fast, charged = columns['species'], columns['fast'], columns['charged']
+    s = species_table.records[species]
+    f = fast_table.records[fast]
+    c = charged_table.records[charged]
+    fast_known, charged_known = fast >= 0, charged >= 0
+    data = {
+        'dex': s['dex'].astype(int),
+        'pokemonId': s['pokemonId'].astype(object),
+        'name': s['complete_name'].astype(object),
+        'type': TYPE_TEMPLATE_IDS[s['type']],
+        'type2': TYPE_TEMPLATE_IDS[s['type2']],
+        'stamina': s['stamina'].astype(int),
+        'attack': s['attack'].astype(int),
+        'defense': s['defense'].astype(int),
+        'fast_id': species_table.fast_move_ids[columns['fast_slot']].astype(object),
+        'charge_id': species_table.charged_move_ids[columns['charged_slot']].astype(object),
+        'fast_name': np.where(fast_known, f['name'].astype(object), None),
+        'fast_type': np.where(fast_known, TYPE_TEMPLATE_IDS[f['type']], None),
+        'fast_PPT': np.where(fast_known, f['PPT'], np.nan),
+        'fast_EPT': np.where(fast_known, f['EPT'], np.nan),
+        'charge_name': np.where(charged_known, c['name'].astype(object), None),
+        'charge_type': np.where(charged_known, TYPE_TEMPLATE_IDS[c['type']], None),
+        'charge_PPE': np.where(charged_known, c['PPE'], np.nan),
+        'fast_stab_m': columns['fast_stab_m'],
+        'charge_stab_m': columns['charge_stab_m'],
+    }
+    for league, _ in league_caps:
+        x = league.lower()
+        for suffix in ['_lvl', '_cp', '_tdo']:
+            data[x+suffix] = columns[x+suffix]
+    data['lvl1_tdo'] = columns['lvl1_tdo']
+    return pd.DataFrame(data, columns=list(data.keys()))
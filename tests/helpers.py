@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+Small game master shared by the tests.
+
+Two species, Charmander and Squirtle, with a fast and a charged move each, in
+their PvP (`combatMove`) and PvE (`moveSettings`) versions. Water is super
+effective against Fire, every other multiplier is 1. Squirtle also knows
+`UNRELEASED_FAST`, a fast move that isn't in the game master.
+"""
+
+from __future__ import print_function, division
+
+import argparse
+import unittest
+import tempfile
+import shutil
+import json
+import os
+
+from pogokit import effectiveness
+from pogokit import formulas
+from pogokit import pogo
+
+# uniqueId: type, PvP (power, energy, turns), PvE (power, durationMs, energy)
+MOVES = {
+    'WATER_GUN_FAST': ('WATER', (3.0, 3, 1), (5.0, 500, 5)),
+    'EMBER_FAST': ('FIRE', (6.0, 6, 2), (10.0, 1000, 10)),
+    'HYDRO_PUMP': ('WATER', (130.0, -75, None), (130.0, 3300, -100)),
+    'FLAMETHROWER': ('FIRE', (90.0, -55, None), (70.0, 2200, -50)),
+}
+# dex, pokemonId, type, fast moves, charged moves, (stamina, attack, defense)
+SPECIES = [
+    (4, 'CHARMANDER', 'FIRE', ['EMBER_FAST'], ['FLAMETHROWER'], (118, 116, 93)),
+    (7, 'SQUIRTLE', 'WATER', ['WATER_GUN_FAST', 'UNRELEASED_FAST'], ['HYDRO_PUMP'], (127, 94, 121)),
+]
+WEATHERS = {'SUNNY': ['FIRE'], 'RAINY': ['WATER']}
+
+def game_master_items():
+    items = []
+    for t in effectiveness.TYPES:
+        scalars = [1.6 if (t, d) == ('Water', 'Fire') else 1.0 for d in effectiveness.TYPES]
+        items.append({'templateId': 'POKEMON_TYPE_' + t.upper(),
+            'typeEffective': {'attackType': 'POKEMON_TYPE_' + t.upper(), 'attackScalar': scalars}})
+    for i, (unique_id, (move_type, (power, energy, turns), (pve_power, duration_ms, pve_energy))) in enumerate(sorted(MOVES.items())):
+        combat_move = {'uniqueId': unique_id, 'type': 'POKEMON_TYPE_' + move_type, 'power': power, 'energyDelta': energy}
+        if turns is not None:
+            combat_move['durationTurns'] = turns
+        items.append({'templateId': 'COMBAT_V{:04d}_MOVE_{}'.format(i, unique_id), 'combatMove': combat_move})
+        items.append({'templateId': 'V{:04d}_MOVE_{}'.format(i, unique_id), 'moveSettings': {
+            'movementId': unique_id, 'pokemonType': 'POKEMON_TYPE_' + move_type, 'power': pve_power,
+            'durationMs': duration_ms, 'damageWindowStartMs': duration_ms // 2, 'damageWindowEndMs': duration_ms // 2 + 100,
+            'energyDelta': pve_energy}})
+    for dex, pokemon_id, pokemon_type, fast, charged, stats in SPECIES:
+        items.append({'templateId': 'V{:04d}_POKEMON_{}'.format(dex, pokemon_id), 'pokemonSettings': {
+            'pokemonId': pokemon_id, 'type': 'POKEMON_TYPE_' + pokemon_type, 'familyId': 'FAMILY_' + pokemon_id,
+            'quickMoves': fast, 'cinematicMoves': charged,
+            'stats': {'baseStamina': stats[0], 'baseAttack': stats[1], 'baseDefense': stats[2]}}})
+    for weather, types in sorted(WEATHERS.items()):
+        items.append({'templateId': 'WEATHER_AFFINITY_' + weather, 'weatherAffinities': {
+            'weatherCondition': weather, 'pokemonType': ['POKEMON_TYPE_' + t for t in types]}})
+    return items
+
+def write_game_master(path, items=None):
+    with open(path, 'w') as f:
+        json.dump({'itemTemplates': game_master_items() if items is None else items, 'timestampMs': '1545819471259'}, f)
+
+class GameMasterTestCase(unittest.TestCase):
+    """Writes the game master (`game_master_items`) to `self.game_master`, in a temporary directory."""
+
+    def game_master_items(self):
+        return game_master_items()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.game_master = os.path.join(self.tmp_dir, 'GAME_MASTER.json')
+        write_game_master(self.game_master, self.game_master_items())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+class MonTableTestCase(GameMasterTestCase):
+    """Also builds the moveset table (`self.mon_table`) and the type effectiveness (`self.eff`) of the game master."""
+
+    def setUp(self):
+        GameMasterTestCase.setUp(self)
+        self.mon_table = pogo.get_mon_table(argparse.Namespace(game_master=self.game_master,
+            leagues=formulas.LEAGUE_CAPS, no_cache=True))
+        self.eff = effectiveness.load_type_effectiveness(self.game_master)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+
+import unittest
+
+from pogokit import base_stats
+
+class MismatchReportTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        veekun_df = base_stats.load_veekun_stats(base_stats.BUNDLED_DATA_DIR)
+        cls.go_df = base_stats.derive_go_stats(veekun_df)
+
+    def test_bundled_veekun_files(self):
+        self.assertEqual(base_stats.missing_veekun_files(base_stats.BUNDLED_DATA_DIR), [])
+        self.assertEqual(self.go_df.loc[self.go_df['identifier']=='bulbasaur', ['attack', 'defense', 'stamina']].values.tolist(), [[118, 111, 128]])
+
+    def test_report(self):
+        source_df = self.go_df.copy()
+        source_df.loc[source_df['identifier']=='pikachu', 'attack'] += 1
+        report = base_stats.mismatch_report(self.go_df, {'game_master': source_df})
+        self.assertEqual(report[['identifier', 'source', 'stat']].values.tolist(), [['pikachu', 'game_master', 'attack']])
+
+    def test_new_mismatches(self):
+        source_df = self.go_df.copy()
+        source_df.loc[source_df['identifier']=='pikachu', 'attack'] += 1
+        baseline = base_stats.mismatch_report(self.go_df, {'game_master': source_df})
+        self.assertEqual(len(base_stats.new_mismatches(baseline, baseline)), 0)
+
+        # A new mismatch, and one whose expected value changed, are regressions.
+        source_df.loc[source_df['identifier']=='pikachu', 'attack'] += 1
+        source_df.loc[source_df['identifier']=='raichu', 'defense'] += 1
+        report = base_stats.mismatch_report(self.go_df, {'game_master': source_df})
+        regressions = base_stats.new_mismatches(report, baseline)
+        self.assertEqual(sorted(regressions['identifier']), ['pikachu', 'raichu'])
+        self.assertEqual(list(regressions.columns), base_stats.REPORT_COLUMNS)
+
+        # Fixed mismatches aren't.
+        self.assertEqual(len(base_stats.new_mismatches(baseline.iloc[:0], baseline)), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+
+import multiprocessing
+import pandas as pd
+import numpy as np
+import unittest
+import tempfile
+import shutil
+import os
+
+from pogokit import cache
+
+def frame(n):
+    return pd.DataFrame({'x': np.arange(n, dtype=float), 'name': [None if i % 2 else 'a' for i in range(n)]})
+
+def use_cache(cache_dir, k):
+    """Load or build one of a few entries, in a cache that only fits some of them."""
+    key = cache.cache_key('gm', table='t', k=k % 3)
+    df = cache.cached_frame(cache_dir, key, lambda: frame(1000 + k % 3), max_bytes=40 * 1024)
+    return len(df) == 1000 + k % 3
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = os.path.join(tempfile.mkdtemp(), 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.cache_dir))
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key + cache.ENTRY_EXTENSION)
+
+    def test_key(self):
+        self.assertEqual(cache.cache_key('gm', leagues=[('GL', 1500)], table='t'), cache.cache_key('gm', table='t', leagues=[('GL', 1500)]))
+        self.assertNotEqual(cache.cache_key('gm', table='t', leagues=[('GL', 1500)]), cache.cache_key('gm', table='t', leagues=[('GL', 2500)]))
+        self.assertNotEqual(cache.cache_key('gm', table='t'), cache.cache_key('gm2', table='t'))
+
+    def test_round_trip_and_stats(self):
+        computed = []
+        def compute():
+            computed.append(1)
+            return frame(10)
+        first = cache.cached_frame(self.cache_dir, 'k', compute)
+        second = cache.cached_frame(self.cache_dir, 'k', compute)
+        self.assertEqual(len(computed), 1)
+        pd.testing.assert_frame_equal(first, second)
+        self.assertTrue(second['name'].isnull().values[1])
+        info = cache.cache_info(self.cache_dir)
+        self.assertEqual((info['hits'], info['misses'], info['entries']), (1, 1, 1))
+
+    def test_lru_eviction(self):
+        for key in ['a', 'b', 'c']:
+            cache.store(self.cache_dir, key, frame(100))
+        size = os.path.getsize(self.entry_path('a'))
+        # `a` is the least recently stored, but a hit makes `b` the least recently used.
+        for t, key in enumerate(['b', 'c', 'a']):
+            os.utime(self.entry_path(key), (1000 + t, 1000 + t))
+        cache.store(self.cache_dir, 'd', frame(100), max_bytes=3 * size)
+        self.assertEqual(sorted(f for f in os.listdir(self.cache_dir) if f.endswith(cache.ENTRY_EXTENSION)), ['a.npz', 'c.npz', 'd.npz'])
+        self.assertEqual(cache.cache_info(self.cache_dir)['evictions'], 1)
+
+        cache.load(self.cache_dir, 'c')
+        cache.store(self.cache_dir, 'e', frame(100), max_bytes=2 * size)
+        self.assertEqual(sorted(f for f in os.listdir(self.cache_dir) if f.endswith(cache.ENTRY_EXTENSION)), ['c.npz', 'e.npz'])
+        self.assertIsNone(cache.load(self.cache_dir, 'a'))
+
+    def test_max_bytes(self):
+        for k in range(10):
+            cache.store(self.cache_dir, str(k), frame(200), max_bytes=20 * 1024)
+            self.assertLessEqual(cache.cache_info(self.cache_dir)['bytes'], 20 * 1024)
+
+    def test_concurrent_access(self):
+        n_calls = 48
+        with multiprocessing.Pool(4) as pool:
+            results = pool.starmap(use_cache, [(self.cache_dir, k) for k in range(n_calls)])
+        self.assertTrue(all(results))
+        info = cache.cache_info(self.cache_dir)
+        # No update of the statistics was lost, and no temporary file was left behind.
+        self.assertEqual(info['hits'] + info['misses'], n_calls)
+        self.assertLessEqual(info['bytes'], 40 * 1024)
+        self.assertEqual([f for f in os.listdir(self.cache_dir) if f.endswith('.tmp')], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+
+import numpy as np
+import unittest
+
+from pogokit import effectiveness
+from pogokit import formulas
+from pogokit import counters
+from pogokit import meta
+
+from tests import helpers
+
+FIRE = effectiveness.TYPE_CODES['POKEMON_TYPE_FIRE']
+WATER = effectiveness.TYPE_CODES['POKEMON_TYPE_WATER']
+NORMAL = effectiveness.TYPE_CODES['POKEMON_TYPE_NORMAL']
+
+class TypingTest(unittest.TestCase):
+
+    def test_typings(self):
+        self.assertEqual(len(counters.TYPINGS), 171)
+        self.assertEqual(len(set(map(tuple, counters.TYPINGS))), 171)
+        self.assertEqual(counters.typing_index(FIRE, effectiveness.NO_TYPE), FIRE)
+        self.assertEqual(counters.typing_index(FIRE, WATER), counters.typing_index(WATER, FIRE))
+        self.assertEqual(counters.typing_index(FIRE, FIRE), -1)
+        t = counters.typing_index(FIRE, WATER)
+        self.assertEqual(sorted(counters.TYPINGS[t]), sorted([FIRE, WATER]))
+
+    def test_top_species(self):
+        scores = np.array([5., 9., 7., 8., -np.inf])
+        species = np.array([0, 1, 1, 2, 3])
+        # One moveset per species, its best.
+        self.assertEqual(list(counters.top_species(scores, species, 2)), [1, 3])
+        self.assertEqual(list(counters.top_species(scores, species, 10)), [1, 3, 0, 4])
+
+class CounterIndexTest(helpers.MonTableTestCase):
+
+    def setUp(self):
+        helpers.MonTableTestCase.setUp(self)
+        known = self.mon_table['fast_name'].notnull().values
+        self.charmander = np.flatnonzero(known & (self.mon_table['name'] == 'Charmander').values)[0]
+        self.squirtle = np.flatnonzero(known & (self.mon_table['name'] == 'Squirtle').values)[0]
+
+    def test_unknown_moves_never_make_it(self):
+        scores = counters.calc_counter_scores(self.mon_table, self.eff, 'GL')
+        unknown = self.mon_table['fast_name'].isnull().values
+        self.assertTrue(np.all(scores[:,unknown] == -np.inf))
+        self.assertTrue(np.all(np.isfinite(scores[:,~unknown])))
+
+    def test_scores(self):
+        scores = counters.calc_counter_scores(self.mon_table, self.eff, 'GL')
+        self.assertEqual(scores.shape, (len(counters.TYPINGS), len(self.mon_table)))
+        fire = counters.typing_index(FIRE, effectiveness.NO_TYPE)
+        # Squirtle's Water moves are super effective against Fire, and neutral against Normal.
+        a = meta.moveset_arrays(self.mon_table, 'GL')
+        s = self.squirtle
+        expected = formulas.calc_pokemon_moveset_tdo_ref(a['atk'][s], a['def'][s], a['hp'][s],
+            a['fast_ppt'][s], a['fast_ept'][s], a['charge_ppe'][s], fast_mult=1.2 * 1.6, charge_mult=1.2 * 1.6)
+        self.assertAlmostEqual(scores[fire,s], expected)
+        self.assertAlmostEqual(scores[counters.typing_index(FIRE, NORMAL),s], expected)
+        self.assertLess(scores[counters.typing_index(NORMAL, effectiveness.NO_TYPE),s], expected)
+        # Charmander's Fire moves are neutral against everything.
+        self.assertTrue(np.all(scores[:,self.charmander] == scores[0,self.charmander]))
+
+    def test_index(self):
+        index = counters.build_counter_index(self.mon_table, self.eff, ['GL', 'UL'], size=3)
+        self.assertEqual(index['rows'].shape, (2, len(counters.TYPINGS), 3))
+        # Two species (Squirtle's unknown moveset is never picked), then padding.
+        self.assertTrue(np.all(np.sort(index['rows'][:,:,:2], axis=2) == sorted([self.charmander, self.squirtle])))
+        self.assertTrue(np.all(index['rows'][:,:,2] == -1))
+        self.assertTrue(np.all(index['scores'][:,:,2] == -np.inf))
+
+        restored = counters.index_from_frame(counters.index_to_frame(index), index['leagues'])
+        self.assertEqual(restored['leagues'], ['GL', 'UL'])
+        np.testing.assert_array_equal(restored['rows'], index['rows'])
+        np.testing.assert_array_equal(restored['scores'], index['scores'])
+
+    def test_lookup(self):
+        index = counters.build_counter_index(self.mon_table, self.eff, ['GL'])
+        rows, scores = counters.lookup_counters(index, 'GL', FIRE, effectiveness.NO_TYPE)
+        self.assertEqual(list(self.mon_table['name'].values[rows]), ['Squirtle', 'Charmander'])
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+        # Dual typings are the same in either order.
+        rows, _ = counters.lookup_counters(index, 'GL', FIRE, WATER)
+        self.assertEqual(list(rows), list(counters.lookup_counters(index, 'GL', WATER, FIRE)[0]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+
+from pogokit import evolution
+from pogokit import pogo
+
+from tests import helpers
+
+# dex, pokemonId, family, forms (None for a formless entry), evolutions by form: (pokemonId, form, candy)
+FAMILIES = [
+    (172, 'PICHU', 'PIKACHU', [None], {None: [('PIKACHU', None, 25)]}),
+    (25, 'PIKACHU', 'PIKACHU', [None, 'NORMAL', 'COSTUME_2020'], {
+        None: [('RAICHU', None, 50)], 'NORMAL': [('RAICHU', None, 50)], 'COSTUME_2020': [('RAICHU', None, 50)]}),
+    (26, 'RAICHU', 'PIKACHU', ['NORMAL', 'ALOLA'], {}),
+    (52, 'MEOWTH', 'MEOWTH', ['NORMAL', 'ALOLA', 'GALARIAN'], {
+        'NORMAL': [('PERSIAN', None, 50)], 'ALOLA': [('PERSIAN', None, 50)], 'GALARIAN': [('PERRSERKER', None, 50)]}),
+    (53, 'PERSIAN', 'MEOWTH', ['NORMAL', 'ALOLA'], {}),
+    (863, 'PERRSERKER', 'MEOWTH', [None], {}),
+    (554, 'DARUMAKA', 'DARUMAKA', ['NORMAL', 'GALARIAN'], {
+        'NORMAL': [('DARMANITAN', 'DARMANITAN_STANDARD', 50)], 'GALARIAN': [('DARMANITAN', None, 50)]}),
+    (555, 'DARMANITAN', 'DARUMAKA', ['STANDARD', 'GALARIAN_STANDARD'], {}),
+]
+
+class EvolutionGraphTest(helpers.GameMasterTestCase):
+
+    def game_master_items(self):
+        items = helpers.game_master_items()
+        for dex, pokemon_id, family, forms, branches in FAMILIES:
+            for form in forms:
+                settings = {
+                    'pokemonId': pokemon_id, 'type': 'POKEMON_TYPE_NORMAL', 'familyId': 'FAMILY_' + family,
+                    'quickMoves': ['EMBER_FAST'], 'cinematicMoves': ['FLAMETHROWER'],
+                    'stats': {'baseStamina': 100 + dex % 100, 'baseAttack': 100, 'baseDefense': 100},
+                    'evolutionBranch': [dict([('evolution', e), ('candyCost', c)] + ([('form', f)] if f else []))
+                        for e, f, c in branches.get(form, [])],
+                }
+                template_id = 'V{:04d}_POKEMON_{}'.format(dex, pokemon_id)
+                if form is not None:
+                    settings['form'] = pokemon_id + '_' + form
+                    template_id += '_' + form
+                items.append({'templateId': template_id, 'pokemonSettings': settings})
+        return items
+
+    def setUp(self):
+        helpers.GameMasterTestCase.setUp(self)
+        _, _, pok_df = pogo.process_game_master(self.game_master)
+        self.graph = evolution.load_evolution_graph(self.game_master, pok_df)
+        self.positions = dict((name, p) for p, name in enumerate(pok_df['complete_name']))
+
+    def assertEvolutions(self, source, expected):
+        targets, candy = evolution.evolutions(self.graph, self.positions[source])
+        self.assertEqual([(self.positions[name], cost) for name, cost in expected], list(zip(targets, candy)), source)
+
+    def test_forms(self):
+        # The evolution keeps the source's form when it has it.
+        self.assertEvolutions('Meowth Normal', [('Persian Normal', 50)])
+        self.assertEvolutions('Meowth Alola', [('Persian Alola', 50)])
+        # Otherwise its normal form...
+        self.assertEvolutions('Pikachu Costume 2020', [('Raichu Normal', 50)])
+        self.assertEvolutions('Pichu', [('Pikachu Normal', 25)])
+        # ... or its formless row.
+        self.assertEvolutions('Meowth Galarian', [('Perrserker', 50)])
+        # Explicit forms are followed, and evolutions without a matching row are skipped.
+        self.assertEvolutions('Darumaka Normal', [('Darmanitan Standard', 50)])
+        self.assertEvolutions('Darumaka Galarian', [])
+
+        for name in ['Raichu Alola', 'Darmanitan Galarian Standard', 'Pichu']:
+            self.assertEqual(self.graph['parents'][self.positions[name]], -1, name)
+        self.assertEqual(self.graph['parents'][self.positions['Perrserker']], self.positions['Meowth Galarian'])
+        families = self.graph['families']
+        self.assertEqual(families[self.positions['Pichu']], families[self.positions['Raichu Alola']])
+        self.assertNotEqual(families[self.positions['Pichu']], families[self.positions['Meowth Normal']])
+
+    def test_descendants(self):
+        targets, candy = evolution.descendants(self.graph, self.positions['Pichu'])
+        self.assertEqual(list(targets), [self.positions['Pikachu Normal'], self.positions['Raichu Normal']])
+        self.assertEqual(list(candy), [25, 75])
+        targets, candy = evolution.descendants(self.graph, self.positions['Raichu Normal'])
+        self.assertEqual((len(targets), len(candy)), (0, 0))
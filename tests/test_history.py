@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+
+import unittest
+import tempfile
+import shutil
+import json
+import os
+
+from pogokit import history
+
+def water_gun(power):
+    return {'templateId': 'V0230_MOVE_WATER_GUN_FAST', 'moveSettings': {'movementId': 'WATER_GUN_FAST', 'power': power}}
+
+def squirtle(attack):
+    return {'templateId': 'V0007_POKEMON_SQUIRTLE', 'pokemonSettings': {'pokemonId': 'SQUIRTLE', 'stats': {'baseAttack': attack}}}
+
+# Water Gun gets stronger in version 2, and Squirtle disappears in version 3.
+VERSIONS = [
+    ('1', [water_gun(5), squirtle(94)]),
+    ('2', [water_gun(6), squirtle(94), {'templateId': 'BADGE_DEX', 'badgeSettings': {}}]),
+    ('3', [water_gun(6)]),
+]
+
+class HistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.versions_dir = os.path.join(self.tmp_dir, 'versions')
+        # The store's directory doesn't exist yet, as on a fresh install.
+        self.store = os.path.join(self.tmp_dir, 'data', 'history.jsonl.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_versions(self, versions):
+        for version, items in versions:
+            os.makedirs(os.path.join(self.versions_dir, version))
+            with open(os.path.join(self.versions_dir, version, 'GAME_MASTER.json'), 'w') as f:
+                json.dump({'itemTemplates': items}, f)
+
+    def test_ingest(self):
+        self.write_versions(VERSIONS[:2])
+        self.assertEqual(history.ingest(self.versions_dir, self.store, jobs=1), (2, 3))
+        self.write_versions(VERSIONS[2:])
+        # Only the new version is parsed, against the state replayed from the change log.
+        self.assertEqual(history.ingest(self.versions_dir, self.store, jobs=2), (1, 1))
+        self.assertEqual(history.ingest(self.versions_dir, self.store, jobs=2), (0, 0))
+
+        versions, changes = history.load_history(self.store)
+        self.assertEqual(versions, ['1', '2', '3'])
+        self.assertEqual([(c['version'], c['template_id']) for c in changes], [
+            ('1', 'V0230_MOVE_WATER_GUN_FAST'), ('1', 'V0007_POKEMON_SQUIRTLE'),
+            ('2', 'V0230_MOVE_WATER_GUN_FAST'),
+            ('3', 'V0007_POKEMON_SQUIRTLE'),
+        ])
+        self.assertEqual(history.replay(changes), history.extract_records(os.path.join(self.versions_dir, '3', 'GAME_MASTER.json')))
+
+    def test_older_version(self):
+        self.write_versions(VERSIONS[1:2])
+        history.ingest(self.versions_dir, self.store, jobs=1)
+        self.write_versions(VERSIONS[:1])
+        with self.assertRaises(ValueError):
+            history.ingest(self.versions_dir, self.store, jobs=1)
+
+    def test_query(self):
+        self.write_versions(VERSIONS)
+        history.ingest(self.versions_dir, self.store, jobs=1)
+        _, changes = history.load_history(self.store)
+        self.assertEqual(history.query_history(changes, 'water gun'), [
+            ('V0230_MOVE_WATER_GUN_FAST', '1', {'moveSettings.movementId': (None, 'WATER_GUN_FAST'), 'moveSettings.power': (None, 5),
+                'templateId': (None, 'V0230_MOVE_WATER_GUN_FAST')}),
+            ('V0230_MOVE_WATER_GUN_FAST', '2', {'moveSettings.power': (5, 6)}),
+        ])
+        # Removed templates show every field going to None.
+        _, version, diff = history.query_history(changes, 'Squirtle')[-1]
+        self.assertEqual(version, '3')
+        self.assertEqual(diff['pokemonSettings.stats.baseAttack'], (94, None))
+        self.assertTrue(all(new is None for _, new in diff.values()))
+        self.assertEqual(history.query_history(changes, 'Squirt'), [])
+
+if __name__ == '__main__':
+    unittest.main()
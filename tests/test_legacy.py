@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+
+import unittest
+import tempfile
+import shutil
+import os
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from pogokit import legacy
+
+def pokemon_row(name, fast, charge):
+    links = lambda names: ''.join('<a href="/move">{}</a><br>'.format(n) for n in names)
+    return ('<tr><td><a href="/pokemon/{0}"><img alt="{0}"></a> <a href="/pokemon/{0}" hreflang="en">{0}</a></td>'
+        '<td>{1}</td><td>{2}</td></tr>').format(name, links(fast), links(charge))
+
+PAGE = ''.join([
+    '<html><body>',
+    '<table id="other"><tr><td><a hreflang="en">Mew</a></td><td><a>Pound</a></td><td></td></tr></table>',
+    '<table id="sort-table" class="views-table">',
+    '<thead><tr><th>Pokémon</th><th>Fast</th><th>Charge</th></tr></thead><tbody>',
+    pokemon_row('Arcanine', ['Bite'], ['Bulldoze', 'Flamethrower']),
+    pokemon_row('Farfetch&#039;d', ['Cut'], []),
+    pokemon_row('Moltres', ['Ember'], ['Sky Attack']),
+    # Nested tables don't end the legacy table.
+    '<tr><td><a hreflang="en">Golem</a><table><tr><td>note</td></tr></table></td><td><a>Mud-Slap</a></td><td><a>Ancient Power</a></td></tr>',
+    '</tbody></table>',
+    pokemon_row('Missingno', ['Glitch'], []),
+    '</body></html>',
+])
+
+FAST_NAMES = ['Bite', 'Cut', 'Ember', 'Mud Slap']
+CHARGE_NAMES = ['Bulldoze', 'Flamethrower', 'Sky Attack', 'Ancient Power']
+POKEMON_NAMES = ['Arcanine', 'Farfetchd', 'Moltres', 'Golem']
+
+class ParseLegacyPageTest(unittest.TestCase):
+
+    def test_parse(self):
+        moves_df, n_blacklisted = legacy.parse_legacy_page(PAGE, FAST_NAMES, CHARGE_NAMES, POKEMON_NAMES)
+        self.assertEqual(n_blacklisted, 1)
+        self.assertEqual(list(moves_df.columns), legacy.MOVES_COLUMNS)
+        self.assertEqual(moves_df[['pokemon_name', 'kind', 'move']].values.tolist(), [
+            ['Arcanine', 'fast', 'Bite'],
+            ['Arcanine', 'charge', 'Bulldoze'],
+            ['Arcanine', 'charge', 'Flamethrower'],
+            ['Farfetchd', 'fast', 'Cut'],
+            ['Moltres', 'charge', 'Sky Attack'],
+            ['Golem', 'fast', 'Mud Slap'],
+            ['Golem', 'charge', 'Ancient Power'],
+        ])
+        self.assertTrue(moves_df['known'].all())
+        # The page's spelling is kept apart.
+        renamed = moves_df.loc[(moves_df['page_pokemon_name'] != moves_df['pokemon_name']) | (moves_df['page_move'] != moves_df['move'])]
+        self.assertEqual(renamed[['page_pokemon_name', 'page_move']].values.tolist(), [["Farfetch'd", 'Cut'], ['Golem', 'Mud-Slap']])
+
+    def test_unknown_names(self):
+        moves_df, _ = legacy.parse_legacy_page(PAGE, FAST_NAMES[:-1], CHARGE_NAMES, POKEMON_NAMES)
+        unknown = moves_df.loc[~moves_df['known']]
+        self.assertEqual(unknown[['pokemon_name', 'move']].values.tolist(), [['Golem', 'Mud-Slap']])
+
+    def test_no_table(self):
+        with self.assertRaises(ValueError):
+            legacy.parse_legacy_page('<html><table id="other"></table></html>', FAST_NAMES, CHARGE_NAMES, POKEMON_NAMES)
+
+    def test_split_moves(self):
+        moves_df, _ = legacy.parse_legacy_page(PAGE, FAST_NAMES, CHARGE_NAMES, POKEMON_NAMES)
+        fast, charge = legacy.split_moves(moves_df)
+        self.assertEqual(fast.values.tolist(), [['Arcanine', 'Bite'], ['Farfetchd', 'Cut'], ['Golem', 'Mud Slap']])
+        self.assertEqual(list(charge.columns), legacy.CHARGE_COLUMNS)
+        self.assertEqual(charge['charge_move'].tolist(), ['Bulldoze', 'Flamethrower', 'Ancient Power', 'Sky Attack'])
+
+class FetchLegacyPageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.page_path = os.path.join(self.tmp_dir, 'data', 'page.html')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_validators_and_timeout(self):
+        response = mock.Mock(status_code=200, text=PAGE, headers={'ETag': '"v1"', 'Last-Modified': 'Mon, 19 Oct 2026 00:00:00 GMT'})
+        with mock.patch('requests.get', return_value=response) as get:
+            self.assertEqual(legacy.fetch_legacy_page(legacy.LEGACY_URL, self.page_path), PAGE)
+            self.assertEqual(get.call_args[1]['headers'], {})
+            self.assertEqual(get.call_args[1]['timeout'], legacy.REQUEST_TIMEOUT)
+
+            # An unchanged page isn't transferred again, and the saved copy is used.
+            get.return_value = mock.Mock(status_code=304)
+            self.assertEqual(legacy.fetch_legacy_page(legacy.LEGACY_URL, self.page_path), PAGE)
+            self.assertEqual(get.call_args[1]['headers'], {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 19 Oct 2026 00:00:00 GMT'})
+            self.assertEqual(get.call_args[1]['timeout'], legacy.REQUEST_TIMEOUT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+
+import numpy as np
+import pandas as pd
+import unittest
+import tempfile
+import shutil
+import os
+
+from pogokit import effectiveness
+from pogokit import meta
+
+from tests import helpers
+
+class UnknownMoveTest(helpers.MonTableTestCase):
+
+    def test_unknown_move_is_neutral(self):
+        self.assertEqual(effectiveness.type_code(None), effectiveness.NO_TYPE)
+        self.assertTrue(np.all(effectiveness.type_multiplier(self.eff, effectiveness.NO_TYPE,
+            np.arange(len(effectiveness.TYPES)), effectiveness.NO_TYPE) == 1))
+
+    def test_meta_scores(self):
+        meta_df = pd.DataFrame({'name': ['Charmander', 'Squirtle'], 'weight': [1, 1], 'fast': [None, None], 'charged': [None, None]})
+        mon_table = meta.meta_scores(self.mon_table, self.eff, meta_df, ['GL'])
+        unknown = mon_table['fast_name'].isnull().values
+        self.assertEqual(unknown.sum(), 1)
+        self.assertTrue(np.all(np.isfinite(mon_table['gl_meta_tdo'].values[~unknown])))
+
+class LoadMetaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def load(self, content):
+        path = os.path.join(self.tmp_dir, 'meta.csv')
+        with open(path, 'w') as f:
+            f.write(content)
+        return meta.load_meta(path)
+
+    def test_weights(self):
+        meta_df = self.load('name,weight\nCharmander,0\nSquirtle,2.5\n')
+        self.assertEqual(list(meta_df['weight']), [0, 2.5])
+        self.assertEqual(list(meta_df['fast'].isnull()), [True, True])
+        for content in ['name,weight\nCharmander,0\nSquirtle,0\n', 'name,weight\nCharmander,-1\nSquirtle,2\n',
+                'name,weight\nCharmander,heavy\nSquirtle,2\n', 'name,weight\nCharmander,\nSquirtle,2\n', 'name\nCharmander\n']:
+            with self.assertRaises(ValueError):
+                self.load(content)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+
+import numpy as np
+
+from pogokit import effectiveness
+from pogokit import formulas
+from pogokit import pogo
+from pogokit import pve
+
+from tests import helpers
+
+class RaidTest(helpers.GameMasterTestCase):
+
+    def setUp(self):
+        helpers.GameMasterTestCase.setUp(self)
+        _, _, self.pok_df = pogo.process_game_master(self.game_master)
+        self.pok_df = self.pok_df.reset_index(drop=True)
+        self.moves_df = pve.process_pve_moves(self.game_master)
+        self.eff = effectiveness.load_type_effectiveness(self.game_master)
+        self.charmander, self.squirtle = 0, 1
+
+    def test_boss_stats(self):
+        atks, defs, hps = pve.raid_boss_stats(self.pok_df, [self.charmander], tier=3)
+        self.assertAlmostEqual(atks[0], (116 + 15) * 0.73)
+        self.assertAlmostEqual(defs[0], (93 + 15) * 0.73)
+        self.assertEqual(hps[0], 3600)
+        with self.assertRaises(ValueError):
+            pve.raid_boss_stats(self.pok_df, [self.charmander], tier=7)
+
+        atks, defs, hps = pve.gym_defender_stats(self.pok_df, [self.charmander], level=20)
+        self.assertAlmostEqual(defs[0], (93 + 15) * formulas.CP_MULTIPLIERS[20])
+        self.assertEqual(hps[0], 2 * formulas.calc_hp(118 + 15, 20))
+
+    def test_raid_dps(self):
+        counters = pve.raid_counters(self.pok_df, self.moves_df, self.eff, [self.charmander], tier=1)
+        # Squirtle's unknown fast move is skipped.
+        self.assertEqual(list(counters['name']), ['Squirtle', 'Charmander'])
+        squirtle = counters.iloc[0]
+
+        # Water Gun and Hydro Pump, with STAB and super effective.
+        cpm, boss_cpm = formulas.CP_MULTIPLIERS[40], 0.61
+        atk, boss_def = (94 + 15) * cpm, (93 + 15) * boss_cpm
+        fast_dmg = np.floor(0.5 * 5 * atk / boss_def * 1.2 * 1.6) + 1
+        charged_dmg = np.floor(0.5 * 130 * atk / boss_def * 1.2 * 1.6) + 1
+        # Charmander's Ember (with STAB) every 1 + 2 seconds and Flamethrower every 2.2 + 2 seconds.
+        boss_atk, def_ = (116 + 15) * boss_cpm, (121 + 15) * cpm
+        boss_fast, boss_charged = np.floor(0.5 * 10 * boss_atk / def_ * 1.2) + 1, np.floor(0.5 * 70 * boss_atk / def_ * 1.2) + 1
+        boss_a = (10 / 3) / (50 / 4.2 + 10 / 3)
+        y = boss_fast / 3 * (1 - boss_a) + boss_charged / 4.2 * boss_a
+        a = (5 / 0.5 + y / 2) / (100 / 3.3 + 5 / 0.5)
+        dps = fast_dmg / 0.5 * (1 - a) + charged_dmg / 3.3 * a
+
+        self.assertAlmostEqual(squirtle['DPS'], dps)
+        self.assertAlmostEqual(squirtle['TDO'], dps * formulas.calc_hp(127 + 15, 40) / y)
+        self.assertAlmostEqual(squirtle['DPS3TDO'], dps**3 * squirtle['TDO'])
+        self.assertAlmostEqual(squirtle['TTW'], 600 / dps)
+
+    def test_weather(self):
+        clear = pve.raid_counters(self.pok_df, self.moves_df, self.eff, [self.charmander])
+        rainy = pve.raid_counters(self.pok_df, self.moves_df, self.eff, [self.charmander],
+            weather_types=effectiveness.load_weather_affinities(self.game_master)['RAINY'])
+        self.assertGreater(rainy['DPS'].iloc[0], clear['DPS'].iloc[0])
+        self.assertEqual(rainy['DPS'].iloc[1], clear['DPS'].iloc[1])
+
+    def test_gym(self):
+        raid = pve.raid_counters(self.pok_df, self.moves_df, self.eff, [self.squirtle], tier=5)
+        gym = pve.raid_counters(self.pok_df, self.moves_df, self.eff, [self.squirtle], gym_level=40)
+        # A tier 5 boss and a level 40 defender hit about as hard, but the defender has far less HP.
+        np.testing.assert_allclose(gym['DPS'], raid['DPS'], rtol=0.01)
+        np.testing.assert_allclose(gym['TTW'], 2 * formulas.calc_hp(127 + 15, 40) / gym['DPS'])
+        self.assertTrue(np.all(gym['TTW'] < raid['TTW']))
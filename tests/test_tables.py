@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+
+import pandas as pd
+import numpy as np
+import argparse
+
+from pogokit import effectiveness
+from pogokit import formulas
+from pogokit import tables
+from pogokit import pogo
+
+from tests import helpers
+
+FAST_MOVES = ['WATER_GUN_FAST', 'EMBER_FAST', 'UNRELEASED_FAST']
+CHARGED_MOVES = ['HYDRO_PUMP', 'FLAMETHROWER']
+
+def pandas_mon_table(fast_df, charge_df, pok_df, league_caps=formulas.LEAGUE_CAPS):
+    """Reference moveset table, built with DataFrame operations (one row per species and moves)."""
+    mon_table = pok_df.reset_index(drop=True).rename(columns={'quickMoves': 'fast_id', 'cinematicMoves': 'charge_id'})
+    mon_table = mon_table.explode('fast_id').explode('charge_id').dropna(subset=['fast_id', 'charge_id'])
+    mon_table = mon_table.drop(columns='name').rename(columns={'complete_name': 'name'}).reset_index(drop=True)
+    mon_table = mon_table.merge(fast_df.add_prefix('fast_'), how='left', left_on='fast_id', right_on='fast_uniqueId')
+    mon_table = mon_table.merge(charge_df.add_prefix('charge_'), how='left', left_on='charge_id', right_on='charge_uniqueId')
+    mon_table['fast_stab_m'] = np.where((mon_table['type']==mon_table['fast_type'])|(mon_table['type2']==mon_table['fast_type']), 1.2, 1)
+    mon_table['charge_stab_m'] = np.where((mon_table['type']==mon_table['charge_type'])|(mon_table['type2']==mon_table['charge_type']), 1.2, 1)
+    attack, defense, stamina = [mon_table[stat].values.astype(float) for stat in ['attack', 'defense', 'stamina']]
+    league_d = formulas.find_league_pokemon(attack, defense, stamina, league_caps=league_caps)
+    for league, _ in league_caps:
+        x = league.lower()
+        mon_table[x+'_lvl'] = league_d[league]['levels']
+        mon_table[x+'_cp'] = league_d[league]['cps']
+        cpms = league_d[league]['cpms']
+        mon_table[x+'_tdo'] = formulas.calc_pokemon_moveset_tdo_ref(attack*cpms, defense*cpms, formulas.calc_hp(stamina, mon_table[x+'_lvl']),
+            mon_table['fast_PPT'], mon_table['fast_EPT'], mon_table['charge_PPE'],
+            fast_mult=mon_table['fast_stab_m'], charge_mult=mon_table['charge_stab_m'])
+    cpm = formulas.CP_MULTIPLIERS[1]
+    mon_table['lvl1_tdo'] = formulas.calc_pokemon_moveset_tdo_ref(attack*cpm, defense*cpm, formulas.calc_hp(stamina, 1),
+        mon_table['fast_PPT'], mon_table['fast_EPT'], mon_table['charge_PPE'],
+        fast_mult=mon_table['fast_stab_m'], charge_mult=mon_table['charge_stab_m'])
+    return mon_table
+
+def random_game_master_items():
+    """The shared game master plus random species: dual types, forms and species without moves."""
+    items = helpers.game_master_items()
+    rng = np.random.RandomState(0)
+    types = [t.upper() for t in effectiveness.TYPES]
+    for dex in range(100, 160):
+        # Rows without a form are dropped when the dex has forms.
+        forms = [None, 'NORMAL', 'ALOLA'] if dex % 7 == 0 else [None]
+        for form in forms:
+            pokemon_id = 'MON{}'.format(dex)
+            settings = {
+                'pokemonId': pokemon_id,
+                'type': 'POKEMON_TYPE_' + types[rng.randint(len(types))],
+                'quickMoves': list(rng.choice(FAST_MOVES, rng.randint(0 if dex == 101 else 1, 3), replace=False)),
+                'cinematicMoves': list(rng.choice(CHARGED_MOVES, rng.randint(1, 3), replace=False)),
+                'stats': {'baseStamina': int(rng.randint(40, 400)), 'baseAttack': int(rng.randint(20, 350)), 'baseDefense': int(rng.randint(20, 350))},
+            }
+            if dex % 3 == 0:
+                settings['type2'] = 'POKEMON_TYPE_' + types[rng.randint(len(types))]
+            template_id = 'V{:04d}_POKEMON_{}'.format(dex, pokemon_id)
+            if form is not None:
+                settings['form'] = pokemon_id + '_' + form
+                template_id += '_' + form
+            items.append({'templateId': template_id, 'pokemonSettings': settings})
+    return items
+
+class MonTableTest(helpers.GameMasterTestCase):
+
+    def game_master_items(self):
+        return random_game_master_items()
+
+    def test_same_as_pandas(self):
+        fast_df, charge_df, pok_df = pogo.process_game_master(self.game_master)
+        fast_df, charge_df = pogo.calc_fast_attack_stats(fast_df), pogo.calc_charged_attack_stats(charge_df)
+        expected = pandas_mon_table(fast_df, charge_df, pok_df)
+
+        fast_table, charged_table, species_table = tables.load_game_master_tables(self.game_master)
+        columns = tables.calc_mon_table(species_table, fast_table, charged_table)
+        mon_table = tables.mon_table_to_frame(columns, species_table, fast_table, charged_table)
+
+        self.assertGreater(len(mon_table), 100)
+        self.assertEqual(len(mon_table), len(expected))
+        for col in ['dex', 'pokemonId', 'name', 'type', 'type2', 'stamina', 'attack', 'defense', 'fast_id', 'charge_id',
+                'fast_name', 'fast_type', 'charge_name', 'charge_type', 'gl_lvl', 'ul_lvl', 'ml_lvl', 'gl_cp', 'ul_cp', 'ml_cp']:
+            pd.testing.assert_series_equal(mon_table[col], expected[col], check_dtype=False, obj=col)
+        for col in ['fast_PPT', 'fast_EPT', 'charge_PPE', 'fast_stab_m', 'charge_stab_m', 'gl_tdo', 'ul_tdo', 'ml_tdo', 'lvl1_tdo']:
+            np.testing.assert_allclose(mon_table[col].values.astype(float), expected[col].values.astype(float), err_msg=col)
+
+        # The DataFrame entry point builds the same table.
+        pd.testing.assert_frame_equal(pogo.build_mon_table(fast_df, charge_df, pok_df), mon_table)
+
+class VariantsTableTest(helpers.GameMasterTestCase):
+
+    VARIANTS = ['normal', 'shadow', 'purified', 'best_buddy']
+    VISIBLE_COLUMNS = ['dex', 'name', 'stamina', 'attack', 'defense', 'fast_name', 'charge_name']
+
+    def game_master_items(self):
+        return random_game_master_items()
+
+    def stacked_table(self, score_columns, sort_by):
+        """Reference: a materialized moveset table per variant, stacked and sorted."""
+        fast_table, charged_table, species_table = tables.load_game_master_tables(self.game_master)
+        frames = []
+        for variant in self.VARIANTS:
+            columns = tables.calc_mon_table(species_table, fast_table, charged_table, variant=variant)
+            frame = tables.mon_table_to_frame(columns, species_table, fast_table, charged_table)
+            for col, values in pogo.variant_stats(frame, variant).items():
+                frame[col] = values
+            frame = frame[self.VISIBLE_COLUMNS + [col for col in score_columns if col not in self.VISIBLE_COLUMNS]]
+            frame.insert(self.VISIBLE_COLUMNS.index('name') + 1, 'variant', variant)
+            frames.append(frame)
+        stacked = pd.concat(frames, ignore_index=True)
+        return stacked.sort_values(by=sort_by, ascending=False, kind='stable').reset_index(drop=True)
+
+    def test_same_as_stacked(self):
+        args = argparse.Namespace(game_master=self.game_master, leagues=formulas.LEAGUE_CAPS, no_cache=True)
+        mon_table = pogo.get_mon_table(args)
+        variant_columns = {'normal': dict((col, mon_table[col].values) for col in mon_table.columns if col.endswith(('_lvl', '_cp', '_tdo')))}
+        variant_columns.update(pogo.get_variant_columns(args, self.VARIANTS[1:]))
+        for variant, columns in variant_columns.items():
+            columns.update(pogo.variant_stats(mon_table, variant))
+
+        for score_columns in [['lvl1_tdo'], ['gl_lvl', 'gl_cp', 'gl_tdo'], ['ml_lvl', 'ml_cp', 'ml_tdo']]:
+            expected = self.stacked_table(['attack', 'defense'] + score_columns, score_columns[-1])
+            for n in [None, 25]:
+                table = pogo.variants_table(mon_table, variant_columns, self.VISIBLE_COLUMNS, ['attack', 'defense'] + score_columns, score_columns[-1], n=n)
+                pd.testing.assert_frame_equal(table, expected.iloc[:n].reset_index(drop=True), check_dtype=False, obj=str(score_columns))
+
+        # The variants really differ.
+        shadow = variant_columns['shadow']
+        self.assertTrue(np.allclose(shadow['attack'], np.round(mon_table['attack'].values * formulas.SHADOW_ATTACK_MULTIPLIER, 1)))
+        self.assertFalse(np.allclose(variant_columns['best_buddy']['ml_cp'], variant_columns['normal']['ml_cp']))
+        self.assertFalse(np.allclose(variant_columns['purified']['gl_cp'], variant_columns['normal']['gl_cp']))